@@ -2,47 +2,113 @@ import asyncio
 import logging
 
 from aiogram import Bot, Dispatcher, types
-from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.client.session.aiohttp import AiohttpSession
 from aiogram.enums import ParseMode
 
 from bot import middlewares, handlers, filters
 from bot import config
-from bot.services import commands_setter, admin_notificator, logger
+from bot.services import commands_setter, admin_notificator, logger, state_backend, webhook, metrics, message_state, fast_runtime, event_service, opinion_writer, admission, user_tracker
+from bot.services.loop_monitor import LoopMonitor
+from bot.services.event_cache import event_cache, opinion_matrix
 import database
+import tools
 
 
 async def main():
+    tools.filer.templates.load(hot_reload=config.TEXT_HOT_RELOAD)
     logging.info("Connecting to DB: %s:%s/%s", config.PSQL_HOSTNAME, config.PSQL_PORT, config.PSQL_DB_NAME)
     db = database.implement.AsyncPostgreSQL(
         database_name=config.PSQL_DB_NAME,
         username=config.PSQL_USERNAME,
         password=config.PSQL_PASSWORD,
         hostname=config.PSQL_HOSTNAME,
-        port=5432
+        port=config.PSQL_PORT
     )
 
-    session = await database.manager.create_async_session(db, create_tables=True)
+    session = await database.manager.create_async_session(
+        db,
+        create_tables=True,
+        poolclass=database.manager.TimedAsyncQueuePool,
+        pool_size=config.PSQL_POOL_SIZE,
+        max_overflow=config.PSQL_MAX_OVERFLOW,
+        pool_timeout=config.PSQL_POOL_TIMEOUT,
+        pool_recycle=config.PSQL_POOL_RECYCLE,
+        pool_pre_ping=config.PSQL_POOL_PRE_PING,
+        connect_args={"prepared_statement_cache_size": config.PSQL_STATEMENT_CACHE_SIZE},
+    )
 
-    bot = Bot(token=config.BOT_TOKEN, parse_mode=ParseMode.HTML)
-    storage = MemoryStorage()
-    dp = Dispatcher(storage=storage, session=session)
+    bot_session = AiohttpSession(**fast_runtime.json_kwargs()) if config.FAST_RUNTIME else None
+    bot = Bot(token=config.BOT_TOKEN, parse_mode=ParseMode.HTML, session=bot_session)
+    backend = state_backend.setup(config.REDIS_URL)
+    backend.on_event_changed(event_cache.invalidate)
+    backend.on_opinion_claimed(opinion_matrix.add)
+    backend.on_resubscribed(opinion_matrix.invalidate)
+    await backend.start()
+    dp = Dispatcher(storage=backend.fsm_storage(), session=session)
 
     filters.setup(dp)
     middlewares.setup(dp, session=session, bot=bot)
     handlers.setup(dp)
 
+    metrics_runner = None
+    if config.METRICS_PORT:
+        metrics.register_gauge("bot_db_pool_checked_out", lambda: database.manager.pool_metrics.snapshot()["checked_out"])
+        metrics.register_gauge("bot_db_pool_wait_max_ms", lambda: database.manager.pool_metrics.snapshot()["wait_max_ms"])
+        metrics.register_gauge("bot_db_pool_timeouts", lambda: database.manager.pool_metrics.timeouts)
+        metrics.register_gauge("bot_db_queries_total", lambda: database.manager.query_counter.total)
+        metrics.register_gauge("bot_edits_sent", lambda: message_state.tracker.sent)
+        metrics.register_gauge("bot_edits_suppressed", lambda: message_state.tracker.suppressed)
+        metrics.register_gauge("bot_opinions_pending", lambda: opinion_writer.writer.pending)
+        metrics.register_gauge("bot_opinion_writer_failed_flushes", lambda: opinion_writer.writer.failed_flushes)
+        metrics.register_gauge("bot_admission_queue", lambda: admission.queue.size)
+        metrics.register_gauge("bot_users_pending", lambda: user_tracker.tracker.pending)
+        if config.RUN_MODE == "webhook":
+            # Очередь появляется в webhook.run — до этого 0
+            metrics.register_gauge("bot_webhook_queue", lambda: webhook.queue.size if webhook.queue else 0)
+            metrics.register_gauge("bot_webhook_dropped", lambda: webhook.queue.dropped if webhook.queue else 0)
+        metrics_runner = await metrics.start_server(config.METRICS_HOST, config.METRICS_PORT)
+
+    monitor = LoopMonitor(lag_warn=config.LOOP_LAG_WARN_MS / 1000)
+    if config.LOOP_MONITOR:
+        monitor.start()
+
+    await opinion_writer.writer.check_schema(session)
+    await user_tracker.tracker.check_schema(session)
+    opinion_writer.writer.start(session)
+    await user_tracker.tracker.start(session)
+    # Таймеры раундов, прерванные рестартом, продолжаются с нужной минуты
+    await event_service.restore_round_countdowns(bot, session, tools.filer.read_txt)
+    # Раунд начат в другом процессе — держим его таймер наготове на случай падения владельца
+    backend.on_event_changed(event_service.on_event_changed_restore(bot, session, tools.filer.read_txt))
+    # Рассылки, прерванные остановкой бота, продолжаются с неотправленных получателей
+    await handlers.admins.broadcast.resume_interrupted(bot, session)
+
     await commands_setter.set_bot_commands(bot)
     await admin_notificator.notify(bot)
 
     try:
-        await bot.delete_webhook(True)
-        await dp.start_polling(bot)
+        if config.RUN_MODE == "webhook":
+            await webhook.run(dp, bot)
+        else:
+            await bot.delete_webhook(True)
+            await dp.start_polling(bot)
     finally:
+        await event_service.stop_round_countdowns()
+        await admission.queue.stop()
+        await opinion_writer.writer.stop()
+        await user_tracker.tracker.stop()
+        await monitor.stop()
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
+        await backend.close()
         await dp.storage.close()
         await bot.session.close()
 
 
 if __name__ == '__main__':
+    webhook.check_config()
+    if config.FAST_RUNTIME:
+        fast_runtime.install_event_loop()
     try:
         asyncio.run(main())
     except (KeyboardInterrupt, SystemExit):
@@ -7,12 +7,42 @@ env.read_env()
 BOT_TOKEN = env.str("BOT_TOKEN")
 BOT_ADMINS = env.list("BOT_ADMINS", subcast=int)
 THROTTLE_RATE = env.float("THROTTLE_RATE")
+SEND_RATE = env.float("SEND_RATE", 28)
+SEND_CONCURRENCY = env.int("SEND_CONCURRENCY", 20)
+BROADCAST_RATE = env.float("BROADCAST_RATE", 20)  # потолок рассылок; остаток SEND_RATE — запас для раундов
+BROADCAST_WORKERS = env.int("BROADCAST_WORKERS", 10)
+ROUND_DURATION_SEC = env.int("ROUND_DURATION_SEC", 10 * 60)  # длительность сбора мнений после показа списка
+ADMISSION_WORKERS = env.int("ADMISSION_WORKERS", 8)  # приветствия и подключение опоздавших после регистрации
+ADMISSION_QUEUE_SIZE = env.int("ADMISSION_QUEUE_SIZE", 2000)
+TEXT_HOT_RELOAD = env.bool("TEXT_HOT_RELOAD", False)
+REDIS_URL = env.str("REDIS_URL", None)
+METRICS_HOST = env.str("METRICS_HOST", "0.0.0.0")
+METRICS_PORT = env.int("METRICS_PORT", 0)  # 0 — не поднимать /metrics
+FAST_RUNTIME = env.bool("FAST_RUNTIME", False)  # uvloop + orjson, если установлены (pip install uvloop orjson)
+LOOP_MONITOR = env.bool("LOOP_MONITOR", True)
+LOOP_LAG_WARN_MS = env.int("LOOP_LAG_WARN_MS", 200)
+
+RUN_MODE = env.str("RUN_MODE", "polling")  # polling | webhook
+WEBHOOK_URL = env.str("WEBHOOK_URL", None)  # публичный адрес, например https://bot.example.com/webhook
+WEBHOOK_HOST = env.str("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = env.int("WEBHOOK_PORT", 8080)
+WEBHOOK_PATH = env.str("WEBHOOK_PATH", "/webhook")
+WEBHOOK_SECRET = env.str("WEBHOOK_SECRET", None)
+WEBHOOK_MAX_CONNECTIONS = env.int("WEBHOOK_MAX_CONNECTIONS", 40)
+WEBHOOK_QUEUE_SIZE = env.int("WEBHOOK_QUEUE_SIZE", 1000)
+WEBHOOK_WORKERS = env.int("WEBHOOK_WORKERS", 16)
 
 PSQL_HOSTNAME = env.str("PSQL_HOSTNAME")
 PSQL_PORT = env.int("PSQL_PORT")
 PSQL_USERNAME = env.str("PSQL_USERNAME")
 PSQL_PASSWORD = env.str("PSQL_PASSWORD")
 PSQL_DB_NAME = env.str("PSQL_DB_NAME")
+PSQL_POOL_SIZE = env.int("PSQL_POOL_SIZE", 20)
+PSQL_MAX_OVERFLOW = env.int("PSQL_MAX_OVERFLOW", 20)
+PSQL_POOL_TIMEOUT = env.float("PSQL_POOL_TIMEOUT", 30)
+PSQL_POOL_RECYCLE = env.int("PSQL_POOL_RECYCLE", 1800)
+PSQL_POOL_PRE_PING = env.bool("PSQL_POOL_PRE_PING", True)
+PSQL_STATEMENT_CACHE_SIZE = env.int("PSQL_STATEMENT_CACHE_SIZE", 500)  # 0 — выключить (pgbouncer в режиме transaction)
 
 DIRNAME = os.path.dirname(__file__)
 os.chdir(f"{DIRNAME}//..")
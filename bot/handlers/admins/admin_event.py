@@ -1,9 +1,11 @@
 from datetime import datetime
+import functools
 import logging
 import asyncio
 
 from aiogram import types, Dispatcher, F
 from aiogram.fsm.context import FSMContext
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.filters import StateFilter
 from aiogram.types import Message
 from aiogram.utils.keyboard import InlineKeyboardBuilder, InlineKeyboardButton
@@ -12,9 +14,14 @@ from sqlalchemy import select, update
 import tools
 from bot import keyboards, config, states
 from bot.models.sql import Event, Round, Participant, Opinion
-from bot.services import event_service
+from bot.services import event_service, state_backend, opinion_delivery, message_state, participant_search
+from bot.services.event_cache import event_cache
+from bot.services.keyboard_factory import paginate, page_nav_row
+from bot.services.send_pipeline import pipeline
 
 # Хранение задачи автообновления админки
+ADMIN_TIMER_LOCK = "admin_timer"
+ADMIN_TIMER_LOCK_TTL = 120
 _admin_timer_task = None
 _admin_timer_msg = None  # (chat_id, message_id)
 
@@ -23,21 +30,23 @@ def _admin_menu_markup():
     return keyboards.inline.admin.admin_menu.keyboard.as_markup()
 
 
-def cancel_admin_timer():
-    """Отменить автообновление админского таймера."""
+async def cancel_admin_timer():
+    """Отменить автообновление админского таймера (в том числе запущенное другим процессом)."""
     global _admin_timer_task
     if _admin_timer_task and not _admin_timer_task.done():
         _admin_timer_task.cancel()
     _admin_timer_task = None
+    await state_backend.backend.release_lock(ADMIN_TIMER_LOCK, force=True)
 
 
-async def _admin_timer_countdown(bot, session_factory, event_id: int, round_number: int, chat_id: int, message_id: int):
-    """Автообновление сообщения админа каждую минуту."""
+async def _admin_timer_countdown(bot, session_factory, event_id: int, round_number: int, chat_id: int, message_id: int, deadline):
+    """Автообновление сообщения админа на каждой минутной отметке до дедлайна раунда."""
     global _admin_timer_task, _admin_timer_msg
     from bot.handlers.admins.admin_menu import _admin_panel_text
     
-    for m in range(9, -1, -1):  # 9, 8, 7... 0
-        await asyncio.sleep(60)
+    async for _ in event_service.minute_marks(deadline):
+        if not await state_backend.backend.extend_lock(ADMIN_TIMER_LOCK, ADMIN_TIMER_LOCK_TTL):
+            break  # Таймер отменён, возможно из другого процесса
         # Проверяем что раунд всё ещё активен
         ev = await event_service.get_active_event(session_factory)
         if ev is None or ev.id != event_id:
@@ -49,18 +58,24 @@ async def _admin_timer_countdown(bot, session_factory, event_id: int, round_numb
         # Обновляем сообщение
         msg_text = await _admin_panel_text(session_factory)
         try:
-            await bot.edit_message_text(chat_id=chat_id, message_id=message_id, text=msg_text, reply_markup=_admin_menu_markup())
+            await message_state.edit(bot, chat_id, message_id, msg_text, _admin_menu_markup())
         except Exception:
             pass
     
+    await state_backend.backend.release_lock(ADMIN_TIMER_LOCK)
     _admin_timer_task = None
     _admin_timer_msg = None
 
 
 async def _safe_edit(callback: types.CallbackQuery, text: str, reply_markup=None):
-    """Безопасный edit - если не получится, отправит новое."""
+    """Безопасный edit - если не получится, отправит новое. Повторное нажатие без изменений — ничего не делает."""
+    message_state.forget(callback.message.chat.id, callback.message.message_id)
     try:
         await callback.message.edit_text(text=text, reply_markup=reply_markup)
+    except TelegramBadRequest as e:
+        if "message is not modified" in str(e):
+            return
+        await callback.message.answer(text=text, reply_markup=reply_markup)
     except Exception:
         await callback.message.answer(text=text, reply_markup=reply_markup)
 
@@ -133,6 +148,9 @@ async def confirm_start_cb(callback: types.CallbackQuery, state: FSMContext, ses
         ev = Event(is_started=True, is_ended=False, total_rounds=n, current_round=0)
         open_session.add(ev)
         await open_session.commit()
+    event_cache.set_active_event(ev)
+    event_cache.set_current_round(ev.id, None)
+    await state_backend.backend.notify_event_changed()
 
     await state.clear()
     await _safe_edit(
@@ -161,7 +179,7 @@ async def start_round_cb(callback: types.CallbackQuery, state: FSMContext, sessi
 
 async def next_round_cb(callback: types.CallbackQuery, state: FSMContext, session):
     await callback.answer()
-    cancel_admin_timer()  # Останавливаем автообновление
+    await cancel_admin_timer()  # Останавливаем автообновление
     
     ev = await event_service.get_active_event(session)
     if ev is None:
@@ -204,7 +222,7 @@ async def round_name_msg(message: Message, state: FSMContext, session, bot):
             r = await open_session.execute(select(Round).where(Round.event_id == ev.id, Round.ended_at.is_(None)).limit(1))
             prev = r.scalars().first()
             if prev:
-                event_service.cancel_round_countdowns(ev.id, prev.number)
+                await event_service.cancel_round_countdowns(ev.id, prev.number)
                 prev.ended_at = datetime.utcnow()
             num = ev.current_round + 1
         else:
@@ -215,6 +233,9 @@ async def round_name_msg(message: Message, state: FSMContext, session, bot):
         ev_obj.current_round = num
         ev_obj.round_started_at = datetime.utcnow()
         await open_session.commit()
+    event_cache.set_active_event(ev_obj)
+    event_cache.set_current_round(ev_obj.id, row)
+    await state_backend.backend.notify_event_changed()
 
     await state.clear()
     participants = await event_service.get_participants(session, ev.id)
@@ -250,8 +271,10 @@ async def end_round_cb(callback: types.CallbackQuery, state: FSMContext, session
         r = await open_session.get(Round, cur.id)
         r.list_shown_at = datetime.utcnow()
         await open_session.commit()
+    event_cache.set_current_round(ev.id, r)
+    await state_backend.backend.notify_event_changed()
 
-    await event_service.finish_round_show_list(callback.bot, session, ev.id, cur.number, tools.filer.read_txt)
+    await event_service.finish_round_show_list(callback.bot, session, r, tools.filer.read_txt)
     
     # Показываем админу статус с таймером
     from bot.handlers.admins.admin_menu import _admin_panel_text
@@ -259,16 +282,21 @@ async def end_round_cb(callback: types.CallbackQuery, state: FSMContext, session
     await _safe_edit(callback, msg_text, _admin_menu_markup())
     
     # Запускаем автообновление таймера для админа
-    cancel_admin_timer()
+    await cancel_admin_timer()
+    if not await state_backend.backend.acquire_lock(ADMIN_TIMER_LOCK, ADMIN_TIMER_LOCK_TTL):
+        return  # Таймер админа уже ведёт другой процесс
     _admin_timer_msg = (callback.message.chat.id, callback.message.message_id)
     _admin_timer_task = asyncio.create_task(
-        _admin_timer_countdown(callback.bot, session, ev.id, cur.number, callback.message.chat.id, callback.message.message_id)
+        _admin_timer_countdown(
+            callback.bot, session, ev.id, cur.number, callback.message.chat.id, callback.message.message_id,
+            event_service.round_deadline(r),
+        )
     )
 
 
 async def end_event_cb(callback: types.CallbackQuery, state: FSMContext, session):
     await callback.answer()
-    cancel_admin_timer()  # Останавливаем автообновление
+    await cancel_admin_timer()  # Останавливаем автообновление
     
     ev = await event_service.get_active_event(session)
     if ev is None:
@@ -279,44 +307,108 @@ async def end_event_cb(callback: types.CallbackQuery, state: FSMContext, session
         e.is_ended = True
         cur = await event_service.get_current_round(session, ev.id)
         if cur:
-            event_service.cancel_round_countdowns(ev.id, cur.number)
+            await event_service.cancel_round_countdowns(ev.id, cur.number)
             r = await open_session.get(Round, cur.id)
             r.ended_at = datetime.utcnow()
         await open_session.commit()
+    event_cache.invalidate()
+    await state_backend.backend.notify_event_changed()
 
     # Уведомляем всех участников о завершении
     participants = await event_service.get_participants(session, ev.id)
     notify_text = """Мероприятие завершено, спасибо за участие! Скоро здесь появятся мнения других участников о Вас, ожидайте!
 
 А пока подпишитесь на наш телеграм-канал, чтобы прийти на другие форматы для знакомств (френдинги, детективно-ролевые игры): https://t.me/+Bjifa2n2IAs0OThi"""
+    results = await pipeline.run(
+        (p.user_id, functools.partial(callback.bot.send_message, chat_id=p.user_id, text=notify_text))
+        for p in participants
+    )
     notified = 0
-    for p in participants:
-        try:
-            await callback.bot.send_message(chat_id=p.user_id, text=notify_text)
+    for p, res in zip(participants, results):
+        if isinstance(res, Exception):
+            logging.error("end_event notify %s: %s", p.user_id, res)
+        else:
             notified += 1
-        except Exception as e:
-            logging.exception("end_event notify %s: %s", p.user_id, e)
 
     await _safe_edit(callback, "Мероприятие завершено. Уведомлено участников: {}/{}.".format(notified, len(participants)), _admin_menu_markup())
 
 
 # ---- Список участников ----
 
-async def list_participants_cb(callback: types.CallbackQuery, state: FSMContext, session):
-    await callback.answer()
+_ADMIN_LISTS = {
+    # префикс callback'ов -> (callback входа, заголовок, callback кнопки участника)
+    "lp": ("list_participants", "Участников: {}. Выберите для просмотра:", "admin_participant_{}"),
+    "lo": ("look_opinions", "Выберите участника ({}):", "look_opinions_{}"),
+}
+
+
+async def _admin_list_view(state: FSMContext, session, kind: str, page: int = 0):
+    """Страница списка участников для админа: (текст, клавиатура). Поиск хранится в данных FSM."""
+    entry, title, item_cb = _ADMIN_LISTS[kind]
     ev = await event_service.get_active_event(session) or await event_service.get_latest_event(session)
     if ev is None:
-        return await _safe_edit(callback, "Нет мероприятия.", _admin_menu_markup())
-
-    participants = await event_service.get_participants(session, ev.id)
+        return "Нет мероприятия.", _admin_menu_markup()
+    participants = await event_service.get_participant_index(session, ev.id)
     if not participants:
-        return await _safe_edit(callback, "Нет участников.", _admin_menu_markup())
+        return "Нет участников.", _admin_menu_markup()
 
+    data = await state.get_data()
+    search = data.get("search") if data.get("search_list") == kind else None
+    if search:
+        # Порядок search_ids — по убыванию похожести
+        by_id = {p.user_id: p for p in participants}
+        participants = [by_id[uid] for uid in data.get("search_ids") or () if uid in by_id]
+
+    items, page, pages = paginate(participants, page)
     kb = InlineKeyboardBuilder()
-    for p in participants:
-        kb.row(InlineKeyboardButton(text=p.full_name, callback_data="admin_participant_{}".format(p.user_id)))
+    for p in items:
+        kb.row(InlineKeyboardButton(text=p.full_name, callback_data=item_cb.format(p.user_id)))
+    if pages > 1:
+        kb.row(*page_nav_row(page, pages, kind))
+    kb.row(InlineKeyboardButton(text="🔎 Поиск", callback_data="{}:search".format(kind)))
+    if search:
+        kb.row(InlineKeyboardButton(text="✖️ Сбросить поиск", callback_data=entry))
     kb.row(InlineKeyboardButton(text="◀️ Назад", callback_data="admin_refresh"))
-    await _safe_edit(callback, "Участников: {}. Выберите для просмотра:".format(len(participants)), kb.as_markup())
+
+    text = title.format(len(participants))
+    if search:
+        text = "Поиск: «{}». {}".format(search, text if participants else "Ничего не найдено.")
+    return text, kb.as_markup()
+
+
+async def list_participants_cb(callback: types.CallbackQuery, state: FSMContext, session):
+    await callback.answer()
+    await state.update_data(search=None, search_ids=None, search_list=None)
+    await _safe_edit(callback, *await _admin_list_view(state, session, "lp"))
+
+
+async def admin_list_page_cb(callback: types.CallbackQuery, state: FSMContext, session):
+    """Листание списков участников: callback_data 'lp:<страница>' / 'lo:<страница>'."""
+    await callback.answer()
+    kind, page = callback.data.split(":", 1)
+    await _safe_edit(callback, *await _admin_list_view(state, session, kind, int(page)))
+
+
+async def admin_search_cb(callback: types.CallbackQuery, state: FSMContext, session):
+    await callback.answer()
+    kind = callback.data.split(":", 1)[0]
+    await state.update_data(search_list=kind)
+    await state.set_state(states.admin_state.SearchParticipantsStates.query)
+    await _safe_edit(callback, await tools.filer.read_txt("admin_search_participants"))
+
+
+async def admin_search_msg(message: Message, state: FSMContext, session):
+    query = (message.text or "").strip()
+    if not query:
+        return await message.answer(await tools.filer.read_txt("admin_search_participants"))
+    data = await state.get_data()
+    kind = data.get("search_list") if data.get("search_list") in _ADMIN_LISTS else "lp"
+    await state.set_state(None)
+    ev = await event_service.get_active_event(session) or await event_service.get_latest_event(session)
+    found = await participant_search.search_participants(session, ev.id, query) if ev else []
+    await state.update_data(search=query, search_ids=[p.user_id for p in found], search_list=kind)
+    text, kb = await _admin_list_view(state, session, kind)
+    await message.answer(text=text, reply_markup=kb)
 
 
 async def admin_participant_cb(callback: types.CallbackQuery, state: FSMContext, session):
@@ -343,7 +435,7 @@ async def admin_participant_cb(callback: types.CallbackQuery, state: FSMContext,
         lines.append("✈️ Telegram: @{}".format(part.telegram.lstrip("@")))
 
     kb = InlineKeyboardBuilder()
-    kb.row(InlineKeyboardButton(text="◀️ К списку", callback_data="list_participants"))
+    kb.row(InlineKeyboardButton(text="◀️ К списку", callback_data="lp:0"))
     await _safe_edit(callback, "\n".join(lines), kb.as_markup())
 
 
@@ -351,18 +443,8 @@ async def admin_participant_cb(callback: types.CallbackQuery, state: FSMContext,
 
 async def look_opinions_cb(callback: types.CallbackQuery, state: FSMContext, session):
     await callback.answer()
-    ev = await event_service.get_active_event(session) or await event_service.get_latest_event(session)
-    if ev is None:
-        return await _safe_edit(callback, "Нет мероприятия.", _admin_menu_markup())
-    participants = await event_service.get_participants(session, ev.id)
-    if not participants:
-        return await _safe_edit(callback, "Нет участников.", _admin_menu_markup())
-
-    kb = InlineKeyboardBuilder()
-    for p in participants:
-        kb.row(InlineKeyboardButton(text=p.full_name, callback_data="look_opinions_{}".format(p.user_id)))
-    kb.row(InlineKeyboardButton(text="◀️ Назад", callback_data="admin_refresh"))
-    await _safe_edit(callback, "Выберите участника:", kb.as_markup())
+    await state.update_data(search=None, search_ids=None, search_list=None)
+    await _safe_edit(callback, *await _admin_list_view(state, session, "lo"))
 
 
 async def look_opinions_user_cb(callback: types.CallbackQuery, state: FSMContext, session):
@@ -390,7 +472,7 @@ async def look_opinions_user_cb(callback: types.CallbackQuery, state: FSMContext
         by_round.setdefault(o.round_number, []).append((o.text, author_name))
     
     kb = InlineKeyboardBuilder()
-    kb.row(InlineKeyboardButton(text="◀️ Назад", callback_data="look_opinions"))
+    kb.row(InlineKeyboardButton(text="◀️ Назад", callback_data="lo:0"))
     
     if not by_round:
         return await _safe_edit(callback, "У участника {} нет мнений.".format(name), kb.as_markup())
@@ -406,42 +488,32 @@ async def look_opinions_user_cb(callback: types.CallbackQuery, state: FSMContext
 # ---- Отправить мнения ----
 
 async def send_opinions_cb(callback: types.CallbackQuery, state: FSMContext, session):
-    import random
-    
     await callback.answer()
     ev = await event_service.get_latest_event(session)
     if ev is None or not ev.is_ended:
         return await _safe_edit(callback, "Сначала завершите мероприятие.", _admin_menu_markup())
 
-    participants = await event_service.get_participants(session, ev.id)
     t_intro = await tools.filer.read_txt("your_opinions_intro")
-
-    sent_count = 0
-    for p in participants:
-        opinions = await event_service.get_opinions_about(session, ev.id, p.user_id)
-        if not opinions:
-            try:
-                await callback.bot.send_message(chat_id=p.user_id, text="У вас пока нет мнений.")
-                sent_count += 1
-            except Exception as e:
-                logging.exception("send_opinions to %s: %s", p.user_id, e)
-            continue
-        
-        # Перемешиваем мнения для анонимности
-        texts = [o.text for o in opinions]
-        random.shuffle(texts)
-        
-        lines = [t_intro, ""]
-        for i, txt in enumerate(texts, 1):
-            lines.append("{}. {}".format(i, txt))
-        
+    bot = callback.bot
+    chat_id, message_id = callback.message.chat.id, callback.message.message_id
+
+    async def report(done: int, failed: int, total: int, finished: bool):
+        if finished:
+            text = "Мнения отправлены ({}/{}).".format(done, total)
+            if failed:
+                text += "\nНе доставлено: {}. Нажмите «Отправить мнения» ещё раз, чтобы дослать.".format(failed)
+        else:
+            text = "Отправка мнений: {}/{}...".format(done, total)
+            if failed:
+                text += "\nОшибок: {}.".format(failed)
         try:
-            await callback.bot.send_message(chat_id=p.user_id, text="\n".join(lines))
-            sent_count += 1
-        except Exception as e:
-            logging.exception("send_opinions to %s: %s", p.user_id, e)
+            await message_state.edit(bot, chat_id, message_id, text, _admin_menu_markup() if finished else None)
+        except Exception:
+            pass
 
-    await _safe_edit(callback, "Мнения отправлены ({}/{}).".format(sent_count, len(participants)), _admin_menu_markup())
+    # Отправка идёт в фоне, чтобы не упираться в таймаут callback'а
+    if not await opinion_delivery.start(bot, session, ev.id, t_intro, report):
+        return await _safe_edit(callback, "Отправка мнений уже идёт.", _admin_menu_markup())
 
 
 def setup(dp: Dispatcher):
@@ -462,5 +534,8 @@ def setup(dp: Dispatcher):
     ]:
         dp.callback_query.register(cb, F.data == data, F.from_user.id.in_(config.BOT_ADMINS))
 
+    dp.callback_query.register(admin_list_page_cb, F.data.regexp(r"^(lp|lo):\d+$"), F.from_user.id.in_(config.BOT_ADMINS))
+    dp.callback_query.register(admin_search_cb, F.data.in_({"lp:search", "lo:search"}), F.from_user.id.in_(config.BOT_ADMINS))
+    dp.message.register(admin_search_msg, StateFilter(states.admin_state.SearchParticipantsStates.query), F.from_user.id.in_(config.BOT_ADMINS))
     dp.callback_query.register(admin_participant_cb, F.data.startswith("admin_participant_"), F.from_user.id.in_(config.BOT_ADMINS))
     dp.callback_query.register(look_opinions_user_cb, F.data.startswith("look_opinions_"), F.from_user.id.in_(config.BOT_ADMINS))
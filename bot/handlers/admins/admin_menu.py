@@ -1,4 +1,4 @@
-from datetime import datetime
+import asyncio
 
 from aiogram.fsm.context import FSMContext
 from aiogram.types import Message
@@ -6,7 +6,8 @@ from aiogram import types, Dispatcher, F
 from aiogram.filters import Command
 
 from bot import keyboards, config
-from bot.services import event_service
+from bot.services import event_service, message_state, metrics
+import database
 
 
 async def _admin_panel_text(session) -> str:
@@ -28,8 +29,7 @@ async def _admin_panel_text(session) -> str:
     )
     if cur:
         if cur.list_shown_at:
-            elapsed = (datetime.utcnow() - cur.list_shown_at).total_seconds() / 60
-            remaining = max(0, int(10 - elapsed))
+            remaining = event_service.remaining_minutes(cur)
             msg_text += "\nФаза: сбор мнений. ⏱ Осталось {} мин.".format(remaining)
         else:
             msg_text += "\nФаза: общение."
@@ -51,13 +51,47 @@ async def admin_menu_handler(message: Message, state: FSMContext, session):
 async def admin_refresh_cb(callback: types.CallbackQuery, state: FSMContext, session):
     msg_text = await _admin_panel_text(session)
     try:
-        await callback.message.edit_text(text=msg_text, reply_markup=_admin_markup())
-        await callback.answer("Обновлено")
+        if await message_state.edit(callback.bot, callback.message.chat.id, callback.message.message_id, msg_text, _admin_markup()):
+            await callback.answer("Обновлено")
+        else:
+            await callback.answer("Данные актуальны")
     except Exception:
         # Текст не изменился — просто показываем уведомление
         await callback.answer("Данные актуальны")
 
 
+async def stats_handler(message: Message, state: FSMContext):
+    """Сводка метрик: самые затратные обработчики, Bot API, пул БД, правки сообщений."""
+    lines = ["<b>Обработчики</b> (вызовов, p50/p95 мс, запросов к БД):"]
+    for name, count, p50, p95, db in metrics.top_handlers():
+        lines.append("{}: {}, {:.0f}/{:.0f}, {:.1f}".format(name, count, p50 * 1000, p95 * 1000, db))
+    lines.append("\n<b>Bot API</b> (запросов, p50/p95 мс, ошибок):")
+    errors = metrics.telegram_errors.stats()
+    for method, (count, _) in sorted(metrics.telegram_latency.stats().items(), key=lambda x: -x[1][1])[:10]:
+        lines.append("{}: {}, {:.0f}/{:.0f}, {:.0f}".format(
+            method, count,
+            metrics.telegram_latency.quantile(method, 0.5) * 1000,
+            metrics.telegram_latency.quantile(method, 0.95) * 1000,
+            errors.get(method, 0),
+        ))
+    throttled = metrics.throttled.stats()
+    if throttled:
+        lines.append("\n<b>Троттлинг</b> (отклонено): " + ", ".join(
+            "{}: {:.0f}".format(name, count) for name, count in sorted(throttled.items())
+        ))
+    pool = database.manager.pool_metrics.snapshot()
+    lines.append("\n<b>Пул БД</b>: занято {checked_out}/{size}, ожидание avg {wait_avg_ms:.1f} мс, max {wait_max_ms:.0f} мс, "
+                 "таймаутов {timeouts}".format(**pool))
+    lines.append("Запросов к БД всего: {}".format(database.manager.query_counter.total))
+    lines.append("\n<b>Цикл событий</b>: задержка p95 {:.0f} мс, задач {}".format(
+        metrics.loop_lag.quantile("main", 0.95) * 1000, len(asyncio.all_tasks()),
+    ))
+    edits = message_state.tracker.stats()
+    lines.append("\n<b>Правки сообщений</b>: отправлено {sent}, пропущено {suppressed}, ошибок {failed}".format(**edits))
+    await message.answer("\n".join(lines))
+
+
 def setup(dp: Dispatcher):
     dp.message.register(admin_menu_handler, Command("admin"), F.from_user.id.in_(config.BOT_ADMINS))
+    dp.message.register(stats_handler, Command("stats"), F.from_user.id.in_(config.BOT_ADMINS))
     dp.callback_query.register(admin_refresh_cb, F.data == "admin_refresh", F.from_user.id.in_(config.BOT_ADMINS))
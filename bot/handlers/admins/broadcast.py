@@ -3,12 +3,31 @@ from aiogram import types, Dispatcher, F
 from aiogram.filters import Command
 # from magic_filter import F as magic_filter
 from bot import keyboards
+import asyncio
+import logging
 import typing
+from bot.services import broadcaster as broadcasts, user_tracker
 from bot.services.broadcaster import BaseBroadcaster
-from bot import models, filters, states
+from bot import models, filters, states, config
 from sqlalchemy import select
 
 
+_tasks: typing.Set[asyncio.Task] = set()  # идущие рассылки: ссылка держит задачу от сборщика мусора
+
+
+def _task_done(task: asyncio.Task):
+    _tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logging.error("broadcast task failed", exc_info=task.exception())
+
+
+def _start_task(coro) -> asyncio.Task:
+    task = asyncio.create_task(coro)
+    _tasks.add(task)
+    task.add_done_callback(_task_done)
+    return task
+
+
 async def broadcast_start_handler(callback: types.CallbackQuery, state: FSMContext):
     await callback.answer()
     await callback.message.answer(
@@ -29,13 +48,13 @@ async def getting_msg(message: types.Message, state: FSMContext):
         "[2/2] Начать рассылку?",
         reply_markup=keyboards.inline.admin.admin_broadcast.keyboard.as_markup(),
     )
-    await state.update_data(dict(message=message))
+    # В FSM только JSON-совместимые данные — хранилище может быть общим (Redis)
+    await state.update_data(message=message.model_dump(mode="json", exclude_none=True, by_alias=True))
     await state.set_state(states.admin_state.BroadcastStates.broadcast)
 
 
 async def start_broadcast(callback: types.CallbackQuery, state: FSMContext, session):
     state_data = await state.get_data()
-    message: types.Message = state_data.get("message")
 
     await state.clear()
     await callback.answer()
@@ -43,17 +62,125 @@ async def start_broadcast(callback: types.CallbackQuery, state: FSMContext, sess
     if callback.data == "cancel":
         return await callback.message.answer("Рассылка отменена.")
 
+    message = types.Message.model_validate(state_data.get("message")).as_(callback.bot)
+
+    await user_tracker.tracker.flush()  # Недавно пришедшие пользователи тоже получат рассылку
     async with session() as open_session:
         users: typing.List[int] = await open_session.execute(select(models.sql.User.id))
         users = users.scalars().all()
 
-    await callback.message.answer("Рассылка началась.")
+    broadcast_id = await broadcasts.create_broadcast(session, message, users)
+    await broadcasts.claim(broadcast_id)
+    broadcaster = await broadcasts.load_broadcaster(callback.bot, session, broadcast_id)
+    await callback.message.answer(
+        "Рассылка #{} началась. Получателей: {}.".format(broadcast_id, len(broadcaster.chats_id)),
+        reply_markup=keyboards.inline.admin.admin_broadcast.control_keyboard(broadcast_id),
+    )
+    _start_task(_run_broadcast(broadcaster, callback.bot, [callback.message.chat.id]))
+
 
-    broadcaster = BaseBroadcaster(chats_id=users, message=message)
+async def _run_broadcast(broadcaster: BaseBroadcaster, bot, chat_ids: typing.List[int]):
+    """Рассылка идёт в фоне; по окончании или паузе — итог админу (после перезапуска — всем админам)."""
     success_count = await broadcaster.run()
+    report = await broadcasts.broadcast_report(broadcaster.session_factory, broadcaster.broadcast_id)
+    if report.get("pending"):
+        text = "Рассылка #{} на паузе.\nОтправлено: {}, ошибок: {}, осталось: {}.".format(
+            broadcaster.broadcast_id, report.get("sent", 0), report.get("failed", 0), report["pending"]
+        )
+        markup = keyboards.inline.admin.admin_broadcast.control_keyboard(broadcaster.broadcast_id, paused=True)
+    else:
+        text = "Рассылка успешно выполнена.\nОтправлено: {} из {}".format(
+            report.get("sent", success_count), sum(report.values())
+        )
+        markup = None
+    for chat_id in chat_ids:
+        try:
+            await bot.send_message(chat_id, text, reply_markup=markup)
+        except Exception as e:
+            logging.error("broadcast #%s: report to %s failed: %s", broadcaster.broadcast_id, chat_id, e)
+
+
+async def resume_interrupted(bot, session):
+    """При старте продолжить рассылки, прерванные остановкой бота (status=running, никем не ведутся)."""
+    for broadcast_id in await broadcasts.get_interrupted(session):
+        if not await broadcasts.claim(broadcast_id):
+            continue  # Её ведёт другой процесс
+        broadcaster = await broadcasts.load_broadcaster(bot, session, broadcast_id)
+        logging.info("broadcast #%s: resuming after restart, %s left", broadcast_id, len(broadcaster.chats_id))
+        for admin in config.BOT_ADMINS:
+            try:
+                await bot.send_message(
+                    admin,
+                    "Рассылка #{} продолжается после перезапуска. Осталось: {}.".format(broadcast_id, len(broadcaster.chats_id)),
+                    reply_markup=keyboards.inline.admin.admin_broadcast.control_keyboard(broadcast_id),
+                )
+            except Exception as e:
+                logging.error("broadcast #%s: notify %s failed: %s", broadcast_id, admin, e)
+        _start_task(_run_broadcast(broadcaster, bot, list(config.BOT_ADMINS)))
+
+
+def _broadcast_id(callback: types.CallbackQuery, prefix: str) -> typing.Optional[int]:
+    try:
+        return int(callback.data.replace(prefix, ""))
+    except ValueError:
+        return None
+
+
+async def broadcast_pause_cb(callback: types.CallbackQuery, session):
+    broadcast_id = _broadcast_id(callback, "broadcast_pause_")
+    if broadcast_id is None:
+        return await callback.answer()
+    broadcaster = broadcasts.get_running(broadcast_id)
+    if broadcaster is not None:
+        broadcaster.pause()
+        return await callback.answer("Ставлю на паузу...")
+    if await broadcasts.get_status(session, broadcast_id) != "running":
+        return await callback.answer("Рассылка не идёт.", show_alert=True)
+    await broadcasts.request_pause(session, broadcast_id)
+    if not await broadcasts.claim(broadcast_id):
+        # Её ведёт другой процесс — он остановится, увидев паузу в БД
+        return await callback.answer("Ставлю на паузу...")
+    # Никто не ведёт: бот остановился посреди рассылки
+    await broadcasts.release(broadcast_id)
+    await callback.answer()
+    report = await broadcasts.broadcast_report(session, broadcast_id)
+    await callback.message.answer(
+        "Рассылка #{} была прервана.\nОтправлено: {}, ошибок: {}, осталось: {}.".format(
+            broadcast_id, report.get("sent", 0), report.get("failed", 0), report.get("pending", 0)
+        ),
+        reply_markup=keyboards.inline.admin.admin_broadcast.control_keyboard(broadcast_id, paused=True),
+    )
+
+
+async def broadcast_resume_cb(callback: types.CallbackQuery, session):
+    broadcast_id = _broadcast_id(callback, "broadcast_resume_")
+    if broadcast_id is None:
+        return await callback.answer()
+    if not await broadcasts.claim(broadcast_id):
+        return await callback.answer("Рассылка уже идёт.", show_alert=True)
+    broadcaster = await broadcasts.load_broadcaster(callback.bot, session, broadcast_id)
+    if broadcaster is None or not broadcaster.chats_id:
+        await broadcasts.release(broadcast_id)
+        return await callback.answer("Продолжать нечего.", show_alert=True)
+    await callback.answer()
     await callback.message.answer(
-        "Рассылка успешно выполнена.\n"
-        "Отправлено: {} из {}".format(success_count, len(users))
+        "Рассылка #{} продолжается. Осталось: {}.".format(broadcast_id, len(broadcaster.chats_id)),
+        reply_markup=keyboards.inline.admin.admin_broadcast.control_keyboard(broadcast_id),
+    )
+    _start_task(_run_broadcast(broadcaster, callback.bot, [callback.message.chat.id]))
+
+
+async def broadcast_report_cb(callback: types.CallbackQuery, session):
+    broadcast_id = _broadcast_id(callback, "broadcast_report_")
+    if broadcast_id is None:
+        return await callback.answer()
+    report = await broadcasts.broadcast_report(session, broadcast_id)
+    status = "идёт" if broadcasts.get_running(broadcast_id) else "остановлена"
+    await callback.answer(
+        "Рассылка #{} ({}): отправлено {}, ошибок {}, осталось {}.".format(
+            broadcast_id, status, report.get("sent", 0), report.get("failed", 0), report.get("pending", 0)
+        ),
+        show_alert=True,
     )
 
 
@@ -70,3 +197,6 @@ def setup(dp: Dispatcher):
         start_broadcast,
         states.admin_state.BroadcastStates.broadcast,
     )
+    dp.callback_query.register(broadcast_pause_cb, F.data.startswith("broadcast_pause_"), F.from_user.id.in_(config.BOT_ADMINS))
+    dp.callback_query.register(broadcast_resume_cb, F.data.startswith("broadcast_resume_"), F.from_user.id.in_(config.BOT_ADMINS))
+    dp.callback_query.register(broadcast_report_cb, F.data.startswith("broadcast_report_"), F.from_user.id.in_(config.BOT_ADMINS))
@@ -1,16 +1,18 @@
-from datetime import datetime
-import asyncio
+import functools
+import logging
 
 from aiogram import types, Dispatcher, F
 from aiogram.fsm.context import FSMContext
 from aiogram.filters import StateFilter
-from sqlalchemy.exc import IntegrityError
 
 import tools
 from bot import keyboards, states
-from bot.models.sql import Participant, RoundMessage
-from bot.services import event_service
+from bot.models.sql import RoundMessage
+from bot.services import event_service, admission
 from bot.services import registration_validators as v
+from bot.services.keyboard_factory import participants_keyboards
+from bot.services.send_pipeline import pipeline
+from database.manager import insert_ignore
 
 
 async def _ensure_event_and_open(state: FSMContext, session, user_id: int):
@@ -103,10 +105,9 @@ async def _finish_registration(message: types.Message, state: FSMContext, sessio
                 pass
         return await message.answer("Ошибка. Начните с /start.")
 
-    ev = await event_service.get_event_by_id(session, event_id)
-    ok, err = event_service.ensure_registration_open(ev)
+    ok, err = await event_service.register_participant(session, event_id, user_id, full_name, data.get("telegram"))
+    await state.clear()
     if not ok:
-        await state.clear()
         text = err or "Регистрация недоступна."
         if edit:
             try:
@@ -115,94 +116,46 @@ async def _finish_registration(message: types.Message, state: FSMContext, sessio
                 pass
         return await message.answer(text)
 
-    if await event_service.get_participant(session, event_id, user_id) is not None:
-        await state.clear()
-        text = "Вы уже зарегистрированы на это мероприятие."
-        if edit:
-            try:
-                return await message.edit_text(text)
-            except Exception:
-                pass
-        return await message.answer(text)
+    # Приветствие и подключение к раунду — через очередь допуска, обработчик их не ждёт
+    await admission.queue.submit(functools.partial(_admit, message, session, event_id, user_id, bot, edit))
 
-    async with session() as open_session:
-        p = Participant(
-            event_id=event_id,
-            user_id=user_id,
-            full_name=full_name,
-            telegram=data.get("telegram"),
-        )
-        open_session.add(p)
-        try:
-            await open_session.commit()
-        except IntegrityError:
-            await open_session.rollback()
-            await state.clear()
-            text = "Вы уже зарегистрированы на это мероприятие."
-            if edit:
-                try:
-                    return await message.edit_text(text)
-                except Exception:
-                    pass
-            return await message.answer(text)
 
-    await state.clear()
-    
+async def _admit(message: types.Message, session, event_id: int, user_id: int, bot=None, edit: bool = False):
+    """Сообщение после регистрации: опоздавшим — текущий раунд, остальным — registration_done."""
     # Проверяем есть ли активный раунд - подключаем опоздавших
     cur = await event_service.get_current_round(session, event_id)
     if cur is not None and bot is not None:
         # Есть активный раунд - подключаем участника
         if cur.list_shown_at is None:
             # Фаза общения - отправляем round_announce
-            text_tpl = await tools.filer.read_txt("round_announce")
-            text_tpl = text_tpl.format(n=cur.number, round_name=cur.name or "Раунд")
-            try:
-                msg = await bot.send_message(chat_id=user_id, text=text_tpl)
-                # Сохраняем RoundMessage для этого участника
-                async with session() as open_session:
-                    rm = RoundMessage(
-                        event_id=event_id, round_number=cur.number,
-                        user_id=user_id, chat_id=user_id, message_id=msg.message_id,
-                    )
-                    open_session.add(rm)
-                    await open_session.commit()
-            except Exception:
-                pass
+            t = (await tools.filer.read_txt("round_announce")).format(n=cur.number, round_name=cur.name or "Раунд")
+            kb = None
         else:
             # Фаза сбора мнений - отправляем список участников
-            elapsed = (datetime.utcnow() - cur.list_shown_at).total_seconds() / 60
-            remaining = max(0, int(10 - elapsed))
-            
-            if remaining > 0:
-                t = (await tools.filer.read_txt("round_list")).format(m=remaining)
-            else:
-                t = await tools.filer.read_txt("round_list_timeout")
-            
-            participants = await event_service.get_participants(session, event_id, exclude_user_id=user_id)
+            t = await event_service.round_list_text(cur, tools.filer.read_txt)
+            participants = await event_service.get_participant_index(session, event_id)
             already_written = await event_service.get_written_opinion_targets(session, event_id, cur.number, user_id)
-            kb = event_service.build_participants_kb(participants, user_id, already_written)
-            
-            try:
-                msg = await bot.send_message(chat_id=user_id, text=t, reply_markup=kb)
-                # Сохраняем RoundMessage
-                async with session() as open_session:
-                    rm = RoundMessage(
-                        event_id=event_id, round_number=cur.number,
-                        user_id=user_id, chat_id=user_id, message_id=msg.message_id,
-                    )
-                    open_session.add(rm)
-                    await open_session.commit()
-                
-                # Запускаем countdown task для этого участника
-                if remaining > 0:
-                    key = (event_id, cur.number, user_id)
-                    event_service._round_view[key] = "list"
-                    task = asyncio.create_task(
-                        event_service._countdown_task(bot, session, event_id, cur.number, user_id, user_id, msg.message_id, tools.filer.read_txt)
-                    )
-                    event_service._countdown_tasks[key] = task
-            except Exception:
-                pass
+            kb = participants_keyboards.markup(event_id, cur.number, participants, user_id, already_written)
+        try:
+            msg = await pipeline.call(user_id, functools.partial(bot.send_message, chat_id=user_id, text=t, reply_markup=kb))
+        except Exception as e:
+            logging.error("late join: send to %s failed: %s", user_id, e)
+            return
+        # Сохраняем RoundMessage для этого участника. Если регистрация совпала с анонсом раунда,
+        # строку уже записал notify_round_start — за таймером остаётся его сообщение
+        async with session() as open_session:
+            r = await open_session.execute(
+                insert_ignore(session, RoundMessage, ("event_id", "round_number", "user_id")).values(
+                    event_id=event_id, round_number=cur.number, user_id=user_id, chat_id=user_id, message_id=msg.message_id,
+                )
+            )
+            await open_session.commit()
+        if r.rowcount == 0:
+            return
+        # Подключаем участника к общему таймеру раунда
+        if cur.list_shown_at is not None and event_service.remaining_minutes(cur) > 0:
+            await event_service.set_round_view(event_id, cur.number, user_id, "list")
+            await event_service.track_round_message(event_id, cur.number, user_id, user_id, msg.message_id)
         return  # Не показываем стандартное сообщение registration_done
     
     # Нет активного раунда - стандартное сообщение
@@ -212,7 +165,7 @@ async def _finish_registration(message: types.Message, state: FSMContext, sessio
             return await message.edit_text(t)
         except Exception:
             pass
-    await message.answer(t)
+    await pipeline.call(message.chat.id, functools.partial(message.answer, t))
 
 
 def _not_command():
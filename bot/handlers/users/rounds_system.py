@@ -1,4 +1,4 @@
-from datetime import datetime
+import asyncio
 
 from aiogram import types, Dispatcher, F
 from aiogram.fsm.context import FSMContext
@@ -6,12 +6,8 @@ from aiogram.filters import StateFilter
 
 import tools
 from bot import states
-from bot.models.sql import Opinion
-from bot.services import event_service
-
-
-def _key(event_id: int, round_number: int, user_id: int):
-    return (event_id, round_number, user_id)
+from bot.services import event_service, message_state
+from bot.services.keyboard_factory import participants_keyboards, NOOP_CALLBACK
 
 
 def _format_participant_info(part) -> str:
@@ -43,16 +39,15 @@ async def opinion_about_cb(callback: types.CallbackQuery, state: FSMContext, ses
         await callback.answer("Вы уже оставили мнение об этом участнике", show_alert=True)
         return
 
-    rm = await event_service.get_round_message(session, ev.id, cur.number, callback.from_user.id)
-    if rm is None:
+    target = await event_service.get_round_target(session, ev.id, cur.number, callback.from_user.id)
+    if target is None:
         return await callback.message.answer("Ошибка: сообщение раунда не найдено.")
 
-    part = await event_service.get_participant(session, ev.id, about_user_id)
+    part = await event_service.find_participant(session, ev.id, about_user_id)
     about_name = part.full_name if part else str(about_user_id)
-    elapsed = (datetime.utcnow() - cur.list_shown_at).total_seconds() / 60
-    remaining = max(0, 10 - elapsed)
+    remaining = event_service.remaining_minutes(cur)
 
-    event_service._round_view[_key(ev.id, cur.number, callback.from_user.id)] = ("writing", about_user_id, about_name)
+    await event_service.set_round_view(ev.id, cur.number, callback.from_user.id, ("writing", about_user_id, about_name))
     await state.update_data(about_user_id=about_user_id, event_id=ev.id, round_number=cur.number)
     await state.set_state(states.user_state.OpinionStates.writing)
 
@@ -65,11 +60,11 @@ async def opinion_about_cb(callback: types.CallbackQuery, state: FSMContext, ses
     if remaining <= 0:
         t = "{}\n\n⏱ Время вышло. Вы можете отправить мнение или нажать Отмена.".format(info)
     else:
-        t = "{}\n\n✍️ Напишите мнение об этом участнике.\n⏱ Осталось {} мин.".format(info, int(remaining))
+        t = "{}\n\n✍️ Напишите мнение об этом участнике.\n⏱ Осталось {} мин.".format(info, remaining)
     
     kb = event_service.build_cancel_kb()
     try:
-        await callback.bot.edit_message_text(chat_id=rm.chat_id, message_id=rm.message_id, text=t, reply_markup=kb)
+        await message_state.edit(callback.bot, target[0], target[1], t, kb)
     except Exception:
         pass
 
@@ -93,33 +88,32 @@ async def opinion_writing_msg(message: types.Message, state: FSMContext, session
     if not text:
         return await message.answer("Напишите текст мнения.")
 
-    async with session() as open_session:
-        o = Opinion(event_id=event_id, round_number=round_number, from_user_id=message.from_user.id, about_user_id=about_user_id, text=text)
-        open_session.add(o)
-        await open_session.commit()
+    # Запись в БД — пачкой в фоне (opinion_writer), обработчик её не ждёт
+    saved = await event_service.save_opinion(session, event_id, round_number, message.from_user.id, about_user_id, text)
 
-    event_service._round_view[_key(event_id, round_number, message.from_user.id)] = "list"
+    await event_service.set_round_view(event_id, round_number, message.from_user.id, "list")
     await state.clear()
 
-    rm = await event_service.get_round_message(session, event_id, round_number, message.from_user.id)
-    if rm is None:
-        return await message.answer(await tools.filer.read_txt("opinion_saved"))
-    r = await event_service.get_round_by_number(session, event_id, round_number)
-    remaining = 0
-    if r and r.list_shown_at:
-        elapsed = (datetime.utcnow() - r.list_shown_at).total_seconds() / 60
-        remaining = max(0, int(10 - elapsed))
+    saved_txt = await tools.filer.read_txt("opinion_saved") if saved else "Вы уже оставили мнение об этом участнике"
+    target = await event_service.get_round_target(session, event_id, round_number, message.from_user.id)
+    if target is None:
+        return await message.answer(saved_txt)
+    # Раунд, участники и мнения — из кэшей (мнение уже отмечено в opinion_matrix при сохранении)
+    r, participants, matrix = await asyncio.gather(
+        event_service.get_current_round(session, event_id),
+        event_service.get_participant_index(session, event_id),
+        event_service.get_round_opinion_matrix(session, event_id, round_number),
+    )
+    if r is None or r.number != round_number:
+        r = await event_service.get_round_by_number(session, event_id, round_number)
     
     # Показываем подтверждение + возвращаем список участников (без тех, о ком уже написали)
-    saved_txt = await tools.filer.read_txt("opinion_saved")
-    list_txt = (await tools.filer.read_txt("round_list")).format(m=remaining) if remaining > 0 else await tools.filer.read_txt("round_list_timeout")
-    t = "✅ {}\n\n{}".format(saved_txt, list_txt)
+    list_txt = await event_service.round_list_text(r, tools.filer.read_txt)
+    t = "{} {}\n\n{}".format("✅" if saved else "ℹ️", saved_txt, list_txt)
     
-    participants = await event_service.get_participants(session, event_id, exclude_user_id=message.from_user.id)
-    already_written = await event_service.get_written_opinion_targets(session, event_id, round_number, message.from_user.id)
-    kb = event_service.build_participants_kb(participants, message.from_user.id, already_written)
+    kb = participants_keyboards.markup(event_id, round_number, participants, message.from_user.id, matrix.get(message.from_user.id))
     try:
-        await bot.edit_message_text(chat_id=rm.chat_id, message_id=rm.message_id, text=t, reply_markup=kb)
+        await message_state.edit(bot, target[0], target[1], t, kb)
     except Exception:
         await message.answer(saved_txt)
 
@@ -133,53 +127,64 @@ async def opinion_cancel_cb(callback: types.CallbackQuery, state: FSMContext, se
     cur = await event_service.get_current_round(session, ev.id)
     if cur is None:
         return
-    rm = await event_service.get_round_message(session, ev.id, cur.number, callback.from_user.id)
-    if rm is None:
+    target = await event_service.get_round_target(session, ev.id, cur.number, callback.from_user.id)
+    if target is None:
         return
 
-    event_service._round_view[_key(ev.id, cur.number, callback.from_user.id)] = "list"
-    remaining = 0
-    if cur.list_shown_at:
-        elapsed = (datetime.utcnow() - cur.list_shown_at).total_seconds() / 60
-        remaining = max(0, int(10 - elapsed))
-    t = (await tools.filer.read_txt("round_list")).format(m=remaining) if remaining > 0 else await tools.filer.read_txt("round_list_timeout")
-    participants = await event_service.get_participants(session, ev.id, exclude_user_id=callback.from_user.id)
+    await event_service.set_round_view(ev.id, cur.number, callback.from_user.id, "list")
+    t = await event_service.round_list_text(cur, tools.filer.read_txt)
+    participants = await event_service.get_participant_index(session, ev.id)
     already_written = await event_service.get_written_opinion_targets(session, ev.id, cur.number, callback.from_user.id)
-    kb = event_service.build_participants_kb(participants, callback.from_user.id, already_written)
+    kb = participants_keyboards.markup(ev.id, cur.number, participants, callback.from_user.id, already_written)
     try:
-        await callback.bot.edit_message_text(chat_id=rm.chat_id, message_id=rm.message_id, text=t, reply_markup=kb)
+        await message_state.edit(callback.bot, target[0], target[1], t, kb)
     except Exception:
         pass
 
 
-async def refresh_timer_cb(callback: types.CallbackQuery, state: FSMContext, session):
-    """Обновить таймер и список участников."""
-    await callback.answer("Обновлено")
+async def _show_round_list(callback: types.CallbackQuery, session, page=None):
+    """Перерисовать сообщение раунда: таймер и страница списка участников (None — текущая)."""
     ev = await event_service.get_active_event(session)
     if ev is None:
         return
     cur = await event_service.get_current_round(session, ev.id)
     if cur is None or cur.list_shown_at is None:
         return
-    rm = await event_service.get_round_message(session, ev.id, cur.number, callback.from_user.id)
-    if rm is None:
+    target = await event_service.get_round_target(session, ev.id, cur.number, callback.from_user.id)
+    if target is None:
         return
 
-    elapsed = (datetime.utcnow() - cur.list_shown_at).total_seconds() / 60
-    remaining = max(0, int(10 - elapsed))
-    if remaining > 0:
-        t = (await tools.filer.read_txt("round_list")).format(m=remaining)
-    else:
-        t = await tools.filer.read_txt("round_list_timeout")
-    participants = await event_service.get_participants(session, ev.id, exclude_user_id=callback.from_user.id)
+    t = await event_service.round_list_text(cur, tools.filer.read_txt)
+    participants = await event_service.get_participant_index(session, ev.id)
     already_written = await event_service.get_written_opinion_targets(session, ev.id, cur.number, callback.from_user.id)
-    kb = event_service.build_participants_kb(participants, callback.from_user.id, already_written)
+    kb = participants_keyboards.markup(ev.id, cur.number, participants, callback.from_user.id, already_written, page)
     try:
-        await callback.bot.edit_message_text(chat_id=rm.chat_id, message_id=rm.message_id, text=t, reply_markup=kb)
+        await message_state.edit(callback.bot, target[0], target[1], t, kb)
     except Exception:
         pass
 
 
+async def refresh_timer_cb(callback: types.CallbackQuery, state: FSMContext, session):
+    """Обновить таймер и список участников."""
+    await callback.answer("Обновлено")
+    await _show_round_list(callback, session)
+
+
+async def participants_page_cb(callback: types.CallbackQuery, state: FSMContext, session):
+    """Листание списка участников: callback_data 'pp:<страница>'."""
+    await callback.answer()
+    try:
+        page = int(callback.data.split(":", 1)[1])
+    except ValueError:
+        return
+    await _show_round_list(callback, session, page)
+
+
+async def noop_cb(callback: types.CallbackQuery):
+    """Номер страницы «n/N» в листании (и у участников, и у админов) — просто закрыть «часики»."""
+    await callback.answer()
+
+
 async def done_round_cb(callback: types.CallbackQuery, state: FSMContext, session):
     await callback.answer()
     await state.clear()
@@ -189,18 +194,14 @@ async def done_round_cb(callback: types.CallbackQuery, state: FSMContext, sessio
     cur = await event_service.get_current_round(session, ev.id)
     if cur is None:
         return await callback.message.answer("Нет активного раунда.")
-    rm = await event_service.get_round_message(session, ev.id, cur.number, callback.from_user.id)
-    if rm is None:
+    target = await event_service.get_round_target(session, ev.id, cur.number, callback.from_user.id)
+    if target is None:
         return await callback.message.answer(await tools.filer.read_txt("round_finished"))
 
-    key = (ev.id, cur.number, callback.from_user.id)
-    event_service._round_view[key] = "done"
-    task = event_service._countdown_tasks.pop(key, None)
-    if task and not task.done():
-        task.cancel()
+    await event_service.set_round_view(ev.id, cur.number, callback.from_user.id, "done")
     t = await tools.filer.read_txt("round_finished")
     try:
-        await callback.bot.edit_message_text(chat_id=rm.chat_id, message_id=rm.message_id, text=t, reply_markup=None)
+        await message_state.edit(callback.bot, target[0], target[1], t)
     except Exception:
         pass
 
@@ -230,5 +231,7 @@ def setup(dp: Dispatcher):
     dp.message.register(opinion_writing_msg, StateFilter(states.user_state.OpinionStates.writing))
     dp.callback_query.register(opinion_cancel_cb, F.data == "opinion_cancel")
     dp.callback_query.register(refresh_timer_cb, F.data == "refresh_timer")
+    dp.callback_query.register(participants_page_cb, F.data.startswith("pp:"))
+    dp.callback_query.register(noop_cb, F.data == NOOP_CALLBACK)
     dp.callback_query.register(done_round_cb, F.data == "done_round")
     dp.callback_query.register(opinions_round_cb, F.data.startswith("opinions_round_"))
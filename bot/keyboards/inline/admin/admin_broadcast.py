@@ -9,3 +9,13 @@ btn_cancel = InlineKeyboardButton(
 )
 keyboard.row(btn_start)
 keyboard.row(btn_cancel)
+
+
+def control_keyboard(broadcast_id: int, paused: bool = False):
+    builder = InlineKeyboardBuilder()
+    if paused:
+        builder.row(InlineKeyboardButton(text="▶️ Продолжить", callback_data=f"broadcast_resume_{broadcast_id}"))
+    else:
+        builder.row(InlineKeyboardButton(text="⏸ Пауза", callback_data=f"broadcast_pause_{broadcast_id}"))
+    builder.row(InlineKeyboardButton(text="📊 Отчёт", callback_data=f"broadcast_report_{broadcast_id}"))
+    return builder.as_markup()
@@ -1,19 +1,29 @@
 from typing import Any
 
-from .throttling import MessageThrottlingMiddleware, CallbackThrottlingMiddleware
+from .throttling import MessageThrottlingMiddleware, CallbackThrottlingMiddleware, ENABLED as THROTTLING_ENABLED
 from .database import DatabaseMiddleware
 from .bot import BotMiddleware
+from .metrics import MetricsMiddleware, TelegramMetricsMiddleware
+from .user_tracking import UserTrackingMiddleware
 from aiogram import Dispatcher
 
 
 def setup(dp: Dispatcher, *, session: Any = None, bot: Any = None):
+    # На всех апдейтах, до троттлинга: аудитория рассылок
+    dp.update.outer_middleware(UserTrackingMiddleware())
+    # Первой, чтобы в замер попали остальные middleware
+    metrics = MetricsMiddleware()
+    dp.message.middleware(metrics)
+    dp.callback_query.middleware(metrics)
     if session is not None:
         db = DatabaseMiddleware(session)
         dp.message.middleware(db)
         dp.callback_query.middleware(db)
     if bot is not None:
+        bot.session.middleware(TelegramMetricsMiddleware())
         bm = BotMiddleware(bot)
         dp.message.middleware(bm)
         dp.callback_query.middleware(bm)
-    dp.message.middleware(MessageThrottlingMiddleware())
-    dp.callback_query.middleware(CallbackThrottlingMiddleware())
+    if THROTTLING_ENABLED:
+        dp.message.middleware(MessageThrottlingMiddleware())
+        dp.callback_query.middleware(CallbackThrottlingMiddleware())
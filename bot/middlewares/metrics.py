@@ -0,0 +1,47 @@
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.types import TelegramObject
+
+from bot.services import metrics
+from database.manager import query_counter
+
+
+class MetricsMiddleware(BaseMiddleware):
+    """Время обработчика и число SQL-запросов на апдейт, по имени обработчика."""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        handler_object = data.get("handler")
+        name = getattr(getattr(handler_object, "callback", None), "__name__", type(event).__name__)
+        started = time.perf_counter()
+        with query_counter.scope() as queries:
+            try:
+                return await handler(event, data)
+            except Exception:
+                metrics.handler_errors.inc(name)
+                raise
+            finally:
+                metrics.handler_latency.observe(name, time.perf_counter() - started)
+                metrics.handler_db_queries.observe(name, queries[0])
+
+
+class TelegramMetricsMiddleware(BaseRequestMiddleware):
+    """Время запросов к Bot API по методу (bot.session.middleware)."""
+
+    async def __call__(self, make_request, bot, method):
+        name = type(method).__name__
+        started = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        except Exception:
+            metrics.telegram_errors.inc(name)
+            raise
+        finally:
+            metrics.telegram_latency.observe(name, time.perf_counter() - started)
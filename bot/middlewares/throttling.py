@@ -1,58 +1,93 @@
+import logging
+import typing
+from abc import abstractmethod
 from typing import Any, Awaitable, Callable, Dict
 
-from aiogram import BaseMiddleware, Dispatcher
+from aiogram import BaseMiddleware
 from aiogram.types import Update, Message, CallbackQuery
-from cachetools import TTLCache
 from bot import config
-from aiogram.types import InputFile
+from bot.services import metrics, state_backend
 
-THROTTLE_RATE_L2 = 1
 
+class Budget(typing.NamedTuple):
+    rate: float  # токенов в секунду
+    burst: int  # сколько действий подряд можно сделать сразу
 
-class MessageThrottlingMiddleware(BaseMiddleware):
-    def __init__(self):
-        self.cache_l1 = TTLCache(maxsize=10_000, ttl=config.THROTTLE_RATE)
-        self.cache_l2 = TTLCache(maxsize=10_000, ttl=THROTTLE_RATE_L2)
 
-    async def __call__(
-        self,
-        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
-        event: Message,
-        data: Dict[str, Any],
-    ) -> Any:
+# THROTTLE_RATE <= 0 — троттлинг выключен (middleware не подключаются)
+ENABLED = config.THROTTLE_RATE > 0
+# Сообщения и обычные кнопки: в среднем одно действие в THROTTLE_RATE секунд, но не больше burst подряд
+DEFAULT_BUDGET = Budget(1 / config.THROTTLE_RATE if ENABLED else float("inf"), 3)
+# Бюджеты кнопок по префиксу callback_data; первый совпавший
+CALLBACK_BUDGETS: typing.Tuple[typing.Tuple[str, str, Budget], ...] = (
+    ("opinion", "opinion_", Budget(2, 6)),  # выбрать участника → отмена → выбрать снова
+    ("pages", "pp:", Budget(2, 6)),
+    ("refresh", "refresh_timer", Budget(0.2, 2)),
+)
+ADMIN_BUDGET = Budget(5, 20)  # любые действия админов
+WARN_BUDGET = Budget(1, 1)  # «Don't spam!» — не чаще раза в секунду
 
-        if event.from_user.id in self.cache_l1:
-            if event.from_user.id in self.cache_l2:
-                return
 
-            self.cache_l2[event.from_user.id] = None
-            await event.answer(text="Don't spam!")
-            return
+def callback_budget(data: typing.Optional[str], user_id: int) -> typing.Tuple[str, Budget]:
+    if user_id in config.BOT_ADMINS:
+        return "admin", ADMIN_BUDGET
+    for name, prefix, budget in CALLBACK_BUDGETS:
+        if data and data.startswith(prefix):
+            return name, budget
+    return "callback", DEFAULT_BUDGET
 
-        self.cache_l1[event.from_user.id] = None
 
-        return await handler(event, data)
+async def _take(name: str, user_id: int, budget: Budget) -> bool:
+    try:
+        return await state_backend.backend.take_token("throttle:{}:{}".format(name, user_id), budget.rate, budget.burst)
+    except Exception as e:
+        # Хранилище недоступно — лучше пропустить апдейт, чем потерять его
+        logging.warning("throttling: bucket %s unavailable: %s", name, e)
+        return True
 
 
-class CallbackThrottlingMiddleware(BaseMiddleware):
-    def __init__(self):
-        self.cache_l1 = TTLCache(maxsize=10_000, ttl=config.THROTTLE_RATE)
-        self.cache_l2 = TTLCache(maxsize=10_000, ttl=THROTTLE_RATE_L2)
+class TokenBucketThrottlingMiddleware(BaseMiddleware):
+    """
+    Ограничение частоты по ведру токенов: своё ведро на пользователя и бюджет.
+    Вёдра живут в state_backend (общие для воркеров при Redis), отказы считаются в metrics.throttled.
+    """
+
+    @abstractmethod
+    def budget(self, event) -> typing.Tuple[str, Budget]:
+        """Имя ведра и бюджет для апдейта."""
+
+    @abstractmethod
+    async def warn(self, event):
+        """Предупредить пользователя, что он упёрся в лимит."""
 
     async def __call__(
         self,
         handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
-        event: CallbackQuery,
+        event: typing.Union[Message, CallbackQuery],
         data: Dict[str, Any],
     ) -> Any:
-        if event.from_user.id in self.cache_l1:
-            if event.from_user.id in self.cache_l2:
-                return
+        name, budget = self.budget(event)
+        user_id = event.from_user.id
+        if await _take(name, user_id, budget):
+            return await handler(event, data)
+        metrics.throttled.inc(name)
+        if await _take("warn", user_id, WARN_BUDGET):
+            await self.warn(event)
+
+
+class MessageThrottlingMiddleware(TokenBucketThrottlingMiddleware):
+    def budget(self, event: Message):
+        if event.from_user.id in config.BOT_ADMINS:
+            return "admin", ADMIN_BUDGET
+        return "message", DEFAULT_BUDGET
+
+    async def warn(self, event: Message):
+        await event.answer(text="Don't spam!")
 
-            self.cache_l2[event.from_user.id] = None
-            await event.answer(text="Don't spam!", show_alert=True)
-            return
 
-        self.cache_l1[event.from_user.id] = None
+class CallbackThrottlingMiddleware(TokenBucketThrottlingMiddleware):
+    def budget(self, event: CallbackQuery):
+        return callback_budget(event.data, event.from_user.id)
 
-        return await handler(event, data)
+    async def warn(self, event: CallbackQuery):
+        await event.answer(text="Don't spam!", show_alert=True)
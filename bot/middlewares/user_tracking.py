@@ -0,0 +1,21 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from bot.services import user_tracker
+
+
+class UserTrackingMiddleware(BaseMiddleware):
+    """Отметить отправителя апдейта в user_tracker (запись в БД — пачкой в фоне)."""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        user = data.get("event_from_user")
+        if user is not None:
+            user_tracker.tracker.seen(user)
+        return await handler(event, data)
@@ -4,4 +4,7 @@ from .event import Event
 from .round import Round
 from .round_message import RoundMessage
 from .participant import Participant
-from .opinion import Opinion
\ No newline at end of file
+from .opinion import Opinion
+from .opinion_delivery import OpinionDelivery
+from .broadcast import Broadcast
+from .broadcast_recipient import BroadcastRecipient
\ No newline at end of file
@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime
+from datetime import datetime
+
+from .base import Base
+
+
+class Broadcast(Base):
+    __tablename__ = "broadcast"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    message = Column(Text, nullable=False)  # JSON исходного сообщения для PreparedMessage
+    status = Column(String(16), nullable=False, default="running")  # running | paused | done
+    total = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime, default=None)
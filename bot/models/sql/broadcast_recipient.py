@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, BigInteger, String, Text, DateTime, ForeignKey, UniqueConstraint, Index
+
+from .base import Base
+
+
+class BroadcastRecipient(Base):
+    __tablename__ = "broadcast_recipient"
+    __table_args__ = (
+        UniqueConstraint("broadcast_id", "chat_id", name="uq_broadcast_recipient"),
+        Index("ix_broadcast_recipient_status", "broadcast_id", "status"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    broadcast_id = Column(Integer, ForeignKey("broadcast.id"), nullable=False)
+    chat_id = Column(BigInteger, nullable=False)
+    status = Column(String(16), nullable=False, default="pending")  # pending | sent | failed
+    error = Column(Text, default=None)
+    updated_at = Column(DateTime, default=None)
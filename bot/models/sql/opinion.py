@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, BigInteger, Text, DateTime, SmallInteger, ForeignKey
+from sqlalchemy import Column, Integer, BigInteger, Text, DateTime, SmallInteger, ForeignKey, Index, UniqueConstraint
 from datetime import datetime
 
 from .base import Base
@@ -6,6 +6,13 @@ from .base import Base
 
 class Opinion(Base):
     __tablename__ = "opinion"
+    __table_args__ = (
+        # Одно мнение об участнике за раунд (ON CONFLICT в opinion_writer);
+        # заодно index-only scan для мнений раунда (get_round_opinion_matrix)
+        UniqueConstraint("event_id", "round_number", "from_user_id", "about_user_id", name="uq_opinion"),
+        # get_opinions_about
+        Index("ix_opinion_event_about", "event_id", "about_user_id"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     event_id = Column(Integer, ForeignKey("event.id"), nullable=False)
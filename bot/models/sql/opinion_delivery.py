@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, BigInteger, DateTime, ForeignKey, UniqueConstraint
+from datetime import datetime
+
+from .base import Base
+
+
+class OpinionDelivery(Base):
+    """Кому уже отправлены мнения о нём — чтобы после сбоя не слать повторно."""
+    __tablename__ = "opinion_delivery"
+    __table_args__ = (UniqueConstraint("event_id", "user_id", name="uq_opinion_delivery"),)
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    event_id = Column(Integer, ForeignKey("event.id"), nullable=False)
+    user_id = Column(BigInteger, nullable=False)
+    delivered_at = Column(DateTime, default=datetime.utcnow)
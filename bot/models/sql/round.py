@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, SmallInteger, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, SmallInteger, ForeignKey, Index, text
 from datetime import datetime
 
 from .base import Base
@@ -6,6 +6,10 @@ from .base import Base
 
 class Round(Base):
     __tablename__ = "round"
+    __table_args__ = (
+        # get_current_round: только незавершённые раунды
+        Index("ix_round_event_open", "event_id", "number", postgresql_where=text("ended_at IS NULL")),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     event_id = Column(Integer, ForeignKey("event.id"), nullable=False)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, BigInteger
+from sqlalchemy import Column, Integer, String, DateTime, BigInteger, UniqueConstraint
 from datetime import datetime
 
 from .base import Base
@@ -6,6 +6,8 @@ from .base import Base
 
 class User(Base):
     __tablename__ = "user"
+    # Один пользователь — одна строка (ON CONFLICT в user_tracker)
+    __table_args__ = (UniqueConstraint("id", name="uq_user_id"),)
 
     index = Column(Integer, primary_key=True)
     id = Column(BigInteger)
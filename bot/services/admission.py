@@ -0,0 +1,71 @@
+import asyncio
+import logging
+import typing
+
+from bot import config
+
+Job = typing.Callable[[], typing.Awaitable[typing.Any]]
+
+
+class AdmissionQueue:
+    """
+    Очередь допуска после регистрации: приветствие и подключение опоздавших к текущему раунду.
+    Обработчик кладёт задание и сразу отвечает Telegram, а workers исполнителей разбирают очередь
+    через общий send_pipeline — всплеск регистраций на старте не превращается во всплеск запросов к Bot API.
+    Полная очередь (maxsize) придерживает обработчики: обратное давление вместо неограниченного роста.
+    """
+
+    def __init__(self, workers: int, maxsize: int):
+        self.workers = workers
+        self.maxsize = maxsize
+        self.done = 0
+        self.failed = 0
+        self._queue: typing.Optional[asyncio.Queue] = None
+        self._tasks: typing.List[asyncio.Task] = []
+
+    @property
+    def size(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def start(self):
+        if self._queue is None:
+            self._queue = asyncio.Queue(self.maxsize)
+        self._tasks = [t for t in self._tasks if not t.done()]
+        while len(self._tasks) < self.workers:
+            self._tasks.append(asyncio.create_task(self._worker()))
+
+    async def submit(self, job: Job):
+        """Поставить задание в очередь (исполнители запускаются при первом задании)."""
+        if len(self._tasks) < self.workers:
+            self.start()
+        await self._queue.put(job)
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                await job()
+                self.done += 1
+            except Exception as e:
+                self.failed += 1
+                logging.error("admission: job failed: %s", e)
+            finally:
+                self._queue.task_done()
+
+    async def join(self):
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def stop(self, timeout: float = 10):
+        """Дождаться очереди (не дольше timeout) и остановить исполнителей."""
+        try:
+            await asyncio.wait_for(self.join(), timeout)
+        except asyncio.TimeoutError:
+            logging.warning("admission: stopped with %s jobs left", self.size)
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+
+queue = AdmissionQueue(config.ADMISSION_WORKERS, config.ADMISSION_QUEUE_SIZE)
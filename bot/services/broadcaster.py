@@ -1,41 +1,250 @@
 from aiogram.types import Message
 from aiogram.exceptions import TelegramRetryAfter
+from datetime import datetime
+from sqlalchemy import select, insert, update, func
 import asyncio
+import functools
+import json
 import logging
 import typing
-from bot.services.sender import CopySender
+from bot import config
+from bot.models.sql import Broadcast, BroadcastRecipient
+from bot.services import state_backend
+from bot.services.send_pipeline import pipeline
+from bot.services.sender import PreparedMessage
+
+FLUSH_EVERY = 200
+INSERT_CHUNK = 5000
+LOCK_TTL = 60  # рассылку ведёт один процесс; продлевается каждые LOCK_TTL / 3
+
+_running: typing.Dict[int, "BaseBroadcaster"] = {}  # broadcast_id -> идущая рассылка
+_claimed: typing.Set[int] = set()  # рассылки, взятые этим процессом (claim), — от claim до конца run()
 
 
 class BaseBroadcaster:
-    def __init__(self, chats_id: typing.List[int], message: Message, *args, **kwargs):
+    """
+    Рассылка копии сообщения пулом из workers отправителей через полосу рассылок send_pipeline (bulk):
+    общая пауза на флуд-лимит с раундами, своя адаптивная скорость, и анонсы/правки раундов идут вперёд.
+    С broadcast_id и session_factory итог по каждому чату пишется в broadcast_recipient,
+    поэтому рассылку можно поставить на паузу и продолжить, в том числе после перезапуска.
+    """
+
+    def __init__(
+            self,
+            chats_id: typing.List[int],
+            message: Message,
+            *args,
+            broadcast_id: typing.Optional[int] = None,
+            session_factory=None,
+            workers: int = config.BROADCAST_WORKERS,
+            **kwargs,
+    ):
         self.chats_id = chats_id
         self.message = message
-        self.args = args
-        self.kwargs = kwargs
+        self.prepared = PreparedMessage(message, *args, **kwargs)
+        self.broadcast_id = broadcast_id
+        self.session_factory = session_factory
+        self.workers = workers
+        self.sent = 0
+        self.failed = 0
+        self._paused = False
+        self._results: typing.List[typing.Tuple[int, bool, typing.Optional[str]]] = []
+
+    @property
+    def persistent(self) -> bool:
+        return self.broadcast_id is not None and self.session_factory is not None
 
-    async def _send(self, chat_id: int):
+    def pause(self):
+        """Остановить после текущих отправок; неотправленные остаются pending."""
+        self._paused = True
+
+    async def _send(self, chat_id: int) -> typing.Tuple[bool, typing.Optional[str]]:
         try:
-            await CopySender(self.message).send_copy(chat_id=chat_id, *self.args, **self.kwargs)
-        except TelegramRetryAfter as e:
-            logging.error(f"Target [ID:{chat_id}]: Flood limit is exceeded. Sleep {e.retry_after} seconds.")
-            await asyncio.sleep(e.retry_after)
-            await self.message.send_copy(chat_id=chat_id, *self.args, **self.kwargs)
+            # Полоса рассылок pipeline: BROADCAST_RATE с адаптивным снижением, раунды — вне очереди
+            await pipeline.call(chat_id, functools.partial(self.prepared.send, chat_id), bulk=True)
+        except TelegramRetryAfter:
+            return False, "Flood limit is exceeded"
         except Exception as e:
-            logging.error(e)
-            logging.exception(f"Target [ID:{chat_id}]: failed")
-        else:
-            logging.info(f"Target [ID:{chat_id}]: success")
-            return True
-        return False
+            logging.error(f"Target [ID:{chat_id}]: failed: {e}")
+            return False, str(e)[:500]
+        logging.info(f"Target [ID:{chat_id}]: success")
+        return True, None
+
+    async def _flush(self):
+        results, self._results = self._results, []
+        if not results or not self.persistent:
+            return
+        now = datetime.utcnow()
+        sent = [chat_id for chat_id, ok, _ in results if ok]
+        failed: typing.Dict[str, typing.List[int]] = {}
+        for chat_id, ok, error in results:
+            if not ok:
+                failed.setdefault(error, []).append(chat_id)
+        async with self.session_factory() as s:
+            if sent:
+                await s.execute(
+                    update(BroadcastRecipient)
+                    .where(BroadcastRecipient.broadcast_id == self.broadcast_id, BroadcastRecipient.chat_id.in_(sent))
+                    .values(status="sent", error=None, updated_at=now)
+                )
+            for error, chats in failed.items():
+                await s.execute(
+                    update(BroadcastRecipient)
+                    .where(BroadcastRecipient.broadcast_id == self.broadcast_id, BroadcastRecipient.chat_id.in_(chats))
+                    .values(status="failed", error=error, updated_at=now)
+                )
+            await s.commit()
+
+    async def _worker(self, queue: asyncio.Queue):
+        while not self._paused:
+            try:
+                chat_id = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            ok, error = await self._send(chat_id)
+            if ok:
+                self.sent += 1
+            else:
+                self.failed += 1
+            self._results.append((chat_id, ok, error))
+            if len(self._results) >= FLUSH_EVERY:
+                await self._flush()
+
+    async def _set_status(self, status: str):
+        if not self.persistent:
+            return
+        async with self.session_factory() as s:
+            await s.execute(
+                update(Broadcast).where(Broadcast.id == self.broadcast_id).values(
+                    status=status, finished_at=datetime.utcnow() if status == "done" else None,
+                )
+            )
+            await s.commit()
+
+    async def _hold_lock(self):
+        """Продлевать блокировку; пауза, поставленная из другого процесса (status=paused в БД), — тоже здесь."""
+        name = _lock_name(self.broadcast_id)
+        while await state_backend.backend.extend_lock(name, LOCK_TTL):
+            await asyncio.sleep(LOCK_TTL / 3)
+            if await get_status(self.session_factory, self.broadcast_id) == "paused":
+                self.pause()
+                return
+        logging.warning("broadcast #%s: lock lost, pausing", self.broadcast_id)
+        self.pause()
 
     async def run(self) -> int:
-        count = 0
+        """Для сохранённой рассылки блокировку сначала берёт claim(); run() продлевает её и отпускает в конце."""
+        queue = asyncio.Queue()
+        for chat_id in self.chats_id:
+            queue.put_nowait(chat_id)
+        holder = None
         try:
-            for chat_id in self.chats_id:
-                if await self._send(chat_id):
-                    count += 1
-                await asyncio.sleep(.05)
+            if self.persistent:
+                _running[self.broadcast_id] = self
+                await self._set_status("running")
+                holder = asyncio.create_task(self._hold_lock())
+            await asyncio.gather(*(self._worker(queue) for _ in range(min(self.workers, len(self.chats_id)) or 1)))
         finally:
-            logging.info(f"{count} messages successful sent.")
+            await self._flush()
+            if holder is not None:
+                holder.cancel()
+            if self.persistent:
+                _running.pop(self.broadcast_id, None)
+                # Очередь не разобрана — пауза или ошибка: рассылку можно продолжить
+                await self._set_status("done" if queue.empty() else "paused")
+                await release(self.broadcast_id)
+            logging.info(f"{self.sent} messages successful sent.")
+
+        return self.sent
+
+
+def _lock_name(broadcast_id: int) -> str:
+    return "broadcast:{}".format(broadcast_id)
+
+
+async def claim(broadcast_id: int) -> bool:
+    """Взять рассылку в работу этим процессом. False — её уже ведёт другой процесс (или этот)."""
+    if broadcast_id in _claimed or not await state_backend.backend.acquire_lock(_lock_name(broadcast_id), LOCK_TTL):
+        return False
+    _claimed.add(broadcast_id)
+    return True
+
+
+async def create_broadcast(session_factory, message: Message, chats_id: typing.List[int]) -> int:
+    """Сохранить рассылку и её получателей (все pending)."""
+    chats_id = list(dict.fromkeys(chats_id))
+    async with session_factory() as s:
+        b = Broadcast(
+            message=json.dumps(message.model_dump(mode="json", exclude_none=True, by_alias=True), ensure_ascii=False),
+            status="running",
+            total=len(chats_id),
+        )
+        s.add(b)
+        await s.flush()
+        for i in range(0, len(chats_id), INSERT_CHUNK):
+            await s.execute(
+                insert(BroadcastRecipient),
+                [dict(broadcast_id=b.id, chat_id=chat_id, status="pending") for chat_id in chats_id[i:i + INSERT_CHUNK]],
+            )
+        await s.commit()
+        return b.id
+
+
+async def load_broadcaster(bot, session_factory, broadcast_id: int) -> typing.Optional[BaseBroadcaster]:
+    """Рассылка по ещё не обработанным получателям — для продолжения после паузы или перезапуска."""
+    async with session_factory() as s:
+        b = await s.get(Broadcast, broadcast_id)
+        if b is None:
+            return None
+        r = await s.execute(
+            select(BroadcastRecipient.chat_id).where(
+                BroadcastRecipient.broadcast_id == broadcast_id, BroadcastRecipient.status == "pending"
+            )
+        )
+        chats_id = list(r.scalars().all())
+    message = Message.model_validate(json.loads(b.message)).as_(bot)
+    return BaseBroadcaster(chats_id=chats_id, message=message, broadcast_id=broadcast_id, session_factory=session_factory)
+
+
+async def broadcast_report(session_factory, broadcast_id: int) -> typing.Dict[str, int]:
+    """Сколько получателей в каждом статусе: pending / sent / failed."""
+    async with session_factory() as s:
+        r = await s.execute(
+            select(BroadcastRecipient.status, func.count()).where(
+                BroadcastRecipient.broadcast_id == broadcast_id
+            ).group_by(BroadcastRecipient.status)
+        )
+        return {status: count for status, count in r.all()}
+
+
+async def release(broadcast_id: int):
+    """Отпустить рассылку, взятую claim(), если запускать её не стали."""
+    _claimed.discard(broadcast_id)
+    await state_backend.backend.release_lock(_lock_name(broadcast_id))
+
+
+async def request_pause(session_factory, broadcast_id: int):
+    """Пауза рассылки, которую ведёт другой процесс: он увидит status=paused при продлении блокировки."""
+    async with session_factory() as s:
+        await s.execute(
+            update(Broadcast).where(Broadcast.id == broadcast_id, Broadcast.status == "running").values(status="paused")
+        )
+        await s.commit()
+
+
+async def get_status(session_factory, broadcast_id: int) -> typing.Optional[str]:
+    async with session_factory() as s:
+        b = await s.get(Broadcast, broadcast_id)
+        return b.status if b is not None else None
+
+
+async def get_interrupted(session_factory) -> typing.List[int]:
+    """Рассылки со статусом running, которые сейчас никто не ведёт (процесс остановился посреди рассылки)."""
+    async with session_factory() as s:
+        r = await s.execute(select(Broadcast.id).where(Broadcast.status == "running").order_by(Broadcast.id))
+        ids = list(r.scalars().all())
+    return [broadcast_id for broadcast_id in ids if broadcast_id not in _claimed]
+
 
-        return count
+def get_running(broadcast_id: int) -> typing.Optional[BaseBroadcaster]:
+    return _running.get(broadcast_id)
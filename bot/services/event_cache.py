@@ -0,0 +1,109 @@
+import time
+import typing
+
+from bot.models.sql import Event, Round, Participant
+
+MISSING = object()  # значение ещё не загружено из БД
+
+
+class EventStateCache:
+    """
+    Активное мероприятие и текущий раунд в памяти процесса.
+    Меняются только действиями админа (admin_event), которые обновляют кэш сразу после коммита,
+    поэтому обработчики читают их без запросов к БД.
+    """
+
+    def __init__(self):
+        self._event: typing.Any = MISSING
+        self._rounds: typing.Dict[int, typing.Optional[Round]] = {}
+
+    @property
+    def active_event(self) -> typing.Any:
+        """Event, None (активного нет) или MISSING."""
+        return self._event
+
+    def set_active_event(self, ev: typing.Optional[Event]):
+        if self._event is MISSING or self._event is None or ev is None or self._event.id != ev.id:
+            self._rounds.clear()
+        self._event = ev
+
+    def current_round(self, event_id: int) -> typing.Any:
+        """Round, None (раунд не идёт) или MISSING."""
+        return self._rounds.get(event_id, MISSING)
+
+    def set_current_round(self, event_id: int, rnd: typing.Optional[Round]):
+        self._rounds[event_id] = rnd
+
+    def invalidate(self):
+        self._event = MISSING
+        self._rounds.clear()
+
+
+event_cache = EventStateCache()
+
+
+class OpinionMatrixCache:
+    """
+    Кто о ком уже написал в раунде: (event_id, round_number) -> {from_user_id: set about_user_id}.
+    Загружается из БД один раз (при показе списка или на первом промахе) и дополняется
+    при каждом сохранённом мнении, поэтому проверки в обработчиках идут без запросов.
+    Хранятся только последние MAX_ROUNDS раундов.
+    """
+
+    MAX_ROUNDS = 4
+
+    def __init__(self):
+        self._rounds: typing.Dict[typing.Tuple[int, int], typing.Dict[int, typing.Set[int]]] = {}
+
+    def get(self, event_id: int, round_number: int) -> typing.Any:
+        """Матрица раунда или MISSING."""
+        return self._rounds.get((event_id, round_number), MISSING)
+
+    def set(self, event_id: int, round_number: int, matrix: typing.Dict[int, typing.Set[int]]):
+        key = (event_id, round_number)
+        self._rounds.pop(key, None)
+        self._rounds[key] = matrix
+        while len(self._rounds) > self.MAX_ROUNDS:
+            del self._rounds[next(iter(self._rounds))]
+
+    def add(self, event_id: int, round_number: int, from_user_id: int, about_user_id: int):
+        matrix = self._rounds.get((event_id, round_number))
+        if matrix is not None:
+            matrix.setdefault(from_user_id, set()).add(about_user_id)
+
+    def invalidate(self):
+        self._rounds.clear()
+
+
+opinion_matrix = OpinionMatrixCache()
+
+
+class ParticipantIndexCache:
+    """
+    Участники мероприятия, отсортированные по full_name, — для клавиатур и постраничных списков.
+    Сбрасывается при регистрации в этом процессе; регистрации в других процессах
+    становятся видны не позже чем через ttl секунд.
+    """
+
+    def __init__(self, ttl: float = 30):
+        self.ttl = ttl
+        self._events: typing.Dict[int, typing.Tuple[float, typing.List[Participant]]] = {}
+
+    def get(self, event_id: int) -> typing.Any:
+        """Список участников или MISSING."""
+        cached = self._events.get(event_id)
+        if cached is None or cached[0] < time.monotonic():
+            return MISSING
+        return cached[1]
+
+    def set(self, event_id: int, participants: typing.List[Participant]):
+        self._events = {event_id: (time.monotonic() + self.ttl, participants)}
+
+    def invalidate(self, event_id: typing.Optional[int] = None):
+        if event_id is None:
+            self._events.clear()
+        else:
+            self._events.pop(event_id, None)
+
+
+participant_index = ParticipantIndexCache()
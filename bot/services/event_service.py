@@ -1,33 +1,119 @@
 import asyncio
+import functools
 import logging
+import math
 import typing
-from datetime import datetime
+from datetime import datetime, timedelta
 
-from sqlalchemy import select
+from aiogram.types import InlineKeyboardMarkup
+from sqlalchemy import select, literal, BigInteger, DateTime, String
+from sqlalchemy.exc import IntegrityError
 
+from bot import config
 from bot.models.sql import Event, Round, RoundMessage, Participant, Opinion
+from bot.services import state_backend, message_state, opinion_writer
+from bot.services.event_cache import event_cache, opinion_matrix, participant_index, MISSING
+from bot.services.keyboard_factory import participants_keyboards, participant_rows, PARTICIPANTS_KB_FOOTER, CANCEL_KB
+from bot.services.send_pipeline import pipeline
+from database.manager import insert_ignore
 
-ROUND_DURATION_SEC = 10 * 60
+ROUND_DURATION_SEC = config.ROUND_DURATION_SEC
 
-_round_view = {}  # (event_id, round_number, user_id) -> 'list' | ('writing', about_user_id, about_name) | 'done'
-_countdown_tasks = {}  # (event_id, round_number, user_id) -> asyncio.Task
+TICKER_LOCK_TTL = 30
+TICKER_HEARTBEAT_SEC = 10  # владелец продлевает блокировку, остальные процессы пытаются её перехватить
 
+_round_tickers = {}  # (event_id, round_number) -> asyncio.Task, один таймер на весь раунд
 
-def cancel_round_countdowns(event_id: int, round_number: int):
-    to_cancel = [k for k in list(_countdown_tasks.keys()) if k[0] == event_id and k[1] == round_number]
-    for k in to_cancel:
-        t = _countdown_tasks.pop(k, None)
-        if t and not t.done():
-            t.cancel()
+
+def _ticker_lock(event_id: int, round_number: int) -> str:
+    return "round_ticker:{}:{}".format(event_id, round_number)
+
+
+def round_deadline(rnd: typing.Optional[Round]) -> typing.Optional[datetime]:
+    """Конец сбора мнений: list_shown_at + ROUND_DURATION_SEC. None — список ещё не показан."""
+    if rnd is None or rnd.list_shown_at is None:
+        return None
+    return rnd.list_shown_at + timedelta(seconds=ROUND_DURATION_SEC)
+
+
+def _minutes_left(deadline: datetime, now: typing.Optional[datetime] = None) -> int:
+    left = (deadline - (now or datetime.utcnow())).total_seconds()
+    return max(0, math.ceil(left / 60))
+
+
+def remaining_minutes(rnd: typing.Optional[Round], now: typing.Optional[datetime] = None) -> int:
+    """Сколько минут сбора мнений осталось, с округлением вверх — как на минутных отметках таймера. 0 — время вышло."""
+    deadline = round_deadline(rnd)
+    return 0 if deadline is None else _minutes_left(deadline, now)
+
+
+async def round_list_text(rnd: typing.Optional[Round], read_txt) -> str:
+    """Текст над списком участников: round_list с оставшимися минутами или round_list_timeout."""
+    m = remaining_minutes(rnd)
+    return (await read_txt("round_list")).format(m=m) if m > 0 else await read_txt("round_list_timeout")
+
+
+async def minute_marks(deadline: datetime):
+    """
+    Дождаться каждой минутной отметки до deadline и отдать число оставшихся минут: ..., 2, 1, 0.
+    Отметки считаются от дедлайна, а не от момента запуска, поэтому таймер, поднятый после рестарта,
+    продолжает с правильной минуты. Если дедлайн уже прошёл — сразу отдаёт 0.
+    """
+    last = None
+    while last != 0:
+        left = (deadline - datetime.utcnow()).total_seconds()
+        m = max(0, math.ceil(left / 60) - 1)
+        if last is not None:
+            m = min(m, last - 1)  # sleep мог проснуться чуть раньше отметки — не повторяем минуту
+        await asyncio.sleep(max(0.0, left - m * 60))
+        last = m
+        yield m
+
+
+async def cancel_round_countdowns(event_id: int, round_number: int):
+    t = _round_tickers.pop((event_id, round_number), None)
+    if t and not t.done():
+        t.cancel()
+    # Таймер мог работать в другом процессе: потеряв владение, он остановится на следующем тике
+    await state_backend.backend.release_lock(_ticker_lock(event_id, round_number), force=True)
+    await state_backend.backend.clear_round(event_id, round_number)
+
+
+async def track_round_message(event_id: int, round_number: int, user_id: int, chat_id: int, message_id: int):
+    """Добавить сообщение участника в обновления таймера раунда (например, для опоздавших)."""
+    await state_backend.backend.add_round_targets(event_id, round_number, {user_id: (chat_id, message_id)})
+
+
+async def get_round_target(session_factory, event_id: int, round_number: int, user_id: int) -> typing.Optional[state_backend.Target]:
+    """
+    (chat_id, message_id) сообщения раунда участника: из state_backend, как у таймера;
+    из БД — только если раунд там не отслеживается (например, после clear_round).
+    """
+    target = await state_backend.backend.get_round_target(event_id, round_number, user_id)
+    if target is None:
+        rm = await get_round_message(session_factory, event_id, round_number, user_id)
+        if rm is not None:
+            target = (rm.chat_id, rm.message_id)
+    return target
+
+
+async def set_round_view(event_id: int, round_number: int, user_id: int, view):
+    """Что сейчас видит участник: 'list' | ('writing', about_user_id, about_name) | 'done'."""
+    await state_backend.backend.set_round_views(event_id, round_number, {user_id: view})
 
 
 async def get_active_event(session_factory) -> typing.Optional[Event]:
     """Мероприятие, на которое можно регистрироваться и вести раунды: is_started и не is_ended."""
+    ev = event_cache.active_event
+    if ev is not MISSING:
+        return ev
     async with session_factory() as s:
         r = await s.execute(
             select(Event).where(Event.is_started == True, Event.is_ended == False).order_by(Event.id.desc()).limit(1)
         )
-        return r.scalars().first()
+        ev = r.scalars().first()
+    event_cache.set_active_event(ev)
+    return ev
 
 
 async def get_latest_event(session_factory) -> typing.Optional[Event]:
@@ -37,6 +123,9 @@ async def get_latest_event(session_factory) -> typing.Optional[Event]:
 
 
 async def get_event_by_id(session_factory, event_id: int) -> typing.Optional[Event]:
+    ev = event_cache.active_event
+    if ev is not MISSING and ev is not None and ev.id == event_id:
+        return ev
     async with session_factory() as s:
         r = await s.execute(select(Event).where(Event.id == event_id))
         return r.scalars().first()
@@ -53,12 +142,50 @@ def ensure_registration_open(ev: typing.Optional[Event]) -> typing.Tuple[bool, t
     return True, None
 
 
+async def register_participant(
+    session_factory, event_id: int, user_id: int, full_name: str, telegram: typing.Optional[str] = None,
+) -> typing.Tuple[bool, typing.Optional[str]]:
+    """
+    Зарегистрировать участника одним запросом: INSERT ... SELECT из event, только если регистрация открыта,
+    ON CONFLICT (event_id, user_id) DO NOTHING RETURNING id. (ok, error_message) — как ensure_registration_open.
+    Причину отказа (закрыто или уже зарегистрирован) выясняем отдельно — только когда строка не вставилась.
+    """
+    values = select(
+        literal(event_id), literal(user_id, BigInteger), literal(full_name, String),
+        literal(telegram, String), literal(datetime.utcnow(), DateTime),
+    ).where(Event.id == event_id, Event.is_started == True, Event.is_ended == False)
+    stmt = insert_ignore(session_factory, Participant, ("event_id", "user_id")).from_select(
+        ["event_id", "user_id", "full_name", "telegram", "created_at"], values,
+    ).returning(Participant.id)
+    async with session_factory() as s:
+        try:
+            inserted = (await s.execute(stmt)).scalar_one_or_none()
+            await s.commit()
+        except IntegrityError:
+            await s.rollback()
+            inserted = None
+    if inserted is not None:
+        participant_index.invalidate(event_id)
+        return True, None
+    ok, err = ensure_registration_open(await get_event_by_id(session_factory, event_id))
+    if not ok:
+        return False, err
+    return False, "Вы уже зарегистрированы на это мероприятие."
+
+
 async def get_current_round(session_factory, event_id: int) -> typing.Optional[Round]:
+    cur = event_cache.current_round(event_id)
+    if cur is not MISSING:
+        return cur
     async with session_factory() as s:
         r = await s.execute(
             select(Round).where(Round.event_id == event_id, Round.ended_at.is_(None)).order_by(Round.number.desc()).limit(1)
         )
-        return r.scalars().first()
+        cur = r.scalars().first()
+    ev = event_cache.active_event
+    if ev is not MISSING and ev is not None and ev.id == event_id:
+        event_cache.set_current_round(event_id, cur)
+    return cur
 
 
 async def get_round_by_number(session_factory, event_id: int, number: int) -> typing.Optional[Round]:
@@ -78,13 +205,32 @@ async def get_participants(session_factory, event_id: int, exclude_user_id: typi
         return list(r.scalars().all())
 
 
+async def get_participant_index(session_factory, event_id: int) -> typing.List[Participant]:
+    """Все участники мероприятия, отсортированные по full_name, из кэша (participant_index)."""
+    participants = participant_index.get(event_id)
+    if participants is MISSING:
+        participants = await get_participants(session_factory, event_id)
+        participant_index.set(event_id, participants)
+    return participants
+
+
 async def get_participant(session_factory, event_id: int, user_id: int) -> typing.Optional[Participant]:
     async with session_factory() as s:
         r = await s.execute(select(Participant).where(Participant.event_id == event_id, Participant.user_id == user_id))
         return r.scalars().first()
 
 
+async def find_participant(session_factory, event_id: int, user_id: int) -> typing.Optional[Participant]:
+    """Участник из participant_index; в БД — только если его там ещё нет (зарегистрировался в другом процессе)."""
+    participants = await get_participant_index(session_factory, event_id)
+    part = next((p for p in participants if p.user_id == user_id), None)
+    if part is None:
+        part = await get_participant(session_factory, event_id, user_id)
+    return part
+
+
 async def get_opinions_about(session_factory, event_id: int, about_user_id: int) -> typing.List[Opinion]:
+    await opinion_writer.writer.flush()
     async with session_factory() as s:
         r = await s.execute(
             select(Opinion).where(Opinion.event_id == event_id, Opinion.about_user_id == about_user_id).order_by(Opinion.round_number, Opinion.id)
@@ -92,34 +238,73 @@ async def get_opinions_about(session_factory, event_id: int, about_user_id: int)
         return list(r.scalars().all())
 
 
-async def get_written_opinion_targets(session_factory, event_id: int, round_number: int, from_user_id: int) -> typing.Set[int]:
-    """Получить set user_id тех, о ком пользователь уже написал мнение в этом раунде."""
+async def get_event_opinions(session_factory, event_id: int) -> typing.Dict[int, typing.List[str]]:
+    """Все мнения мероприятия одним запросом: about_user_id -> тексты."""
+    await opinion_writer.writer.flush()
     async with session_factory() as s:
         r = await s.execute(
-            select(Opinion.about_user_id).where(
-                Opinion.event_id == event_id,
-                Opinion.round_number == round_number,
-                Opinion.from_user_id == from_user_id
-            )
+            select(Opinion.about_user_id, Opinion.text).where(Opinion.event_id == event_id).order_by(Opinion.about_user_id, Opinion.id)
         )
-        return set(r.scalars().all())
+        by_user = {}
+        for about_user_id, text in r.all():
+            by_user.setdefault(about_user_id, []).append(text)
+        return by_user
 
 
-async def has_opinion_about(session_factory, event_id: int, round_number: int, from_user_id: int, about_user_id: int) -> bool:
-    """Проверить, написал ли пользователь мнение о другом участнике в этом раунде."""
+async def get_round_opinion_matrix(session_factory, event_id: int, round_number: int, refresh: bool = False) -> typing.Dict[int, typing.Set[int]]:
+    """
+    Все мнения раунда: from_user_id -> set about_user_id.
+    Берётся из opinion_matrix; из БД (одним запросом) — при промахе или refresh=True,
+    вместе с ещё не записанными мнениями из opinion_writer.
+    """
+    matrix = opinion_matrix.get(event_id, round_number)
+    if matrix is not MISSING and not refresh:
+        return matrix
     async with session_factory() as s:
         r = await s.execute(
-            select(Opinion.id).where(
+            select(Opinion.from_user_id, Opinion.about_user_id).where(
                 Opinion.event_id == event_id,
-                Opinion.round_number == round_number,
-                Opinion.from_user_id == from_user_id,
-                Opinion.about_user_id == about_user_id
-            ).limit(1)
+                Opinion.round_number == round_number
+            )
         )
-        return r.scalars().first() is not None
+        matrix = {}
+        for from_user_id, about_user_id in r.all():
+            matrix.setdefault(from_user_id, set()).add(about_user_id)
+    for from_user_id, about_user_id in opinion_writer.writer.pending_for(event_id, round_number):
+        matrix.setdefault(from_user_id, set()).add(about_user_id)
+    opinion_matrix.set(event_id, round_number, matrix)
+    return matrix
+
+
+async def save_opinion(session_factory, event_id: int, round_number: int, from_user_id: int, about_user_id: int, text: str) -> bool:
+    """
+    Сохранить мнение через opinion_writer: сразу видно в матрице раунда, в БД попадёт со следующей пачкой.
+    False — мнение об этом участнике в раунде уже есть: в матрице (при промахе она загружается до проверки)
+    или в state_backend.claim_opinion — мнение, принятое другим процессом и ещё не записанное в БД.
+    """
+    matrix = await get_round_opinion_matrix(session_factory, event_id, round_number)
+    if about_user_id in matrix.get(from_user_id, ()):
+        return False
+    if not await state_backend.backend.claim_opinion(event_id, round_number, from_user_id, about_user_id):
+        opinion_matrix.add(event_id, round_number, from_user_id, about_user_id)
+        return False
+    return opinion_writer.writer.submit(event_id, round_number, from_user_id, about_user_id, text)
+
+
+async def get_written_opinion_targets(session_factory, event_id: int, round_number: int, from_user_id: int) -> typing.Set[int]:
+    """Получить set user_id тех, о ком пользователь уже написал мнение в этом раунде."""
+    matrix = await get_round_opinion_matrix(session_factory, event_id, round_number)
+    return set(matrix.get(from_user_id, ()))
+
+
+async def has_opinion_about(session_factory, event_id: int, round_number: int, from_user_id: int, about_user_id: int) -> bool:
+    """Проверить, написал ли пользователь мнение о другом участнике в этом раунде."""
+    matrix = await get_round_opinion_matrix(session_factory, event_id, round_number)
+    return about_user_id in matrix.get(from_user_id, ())
 
 
 async def get_rounds_with_opinions_for(session_factory, event_id: int, about_user_id: int) -> typing.List[int]:
+    await opinion_writer.writer.flush()
     async with session_factory() as s:
         r = await s.execute(
             select(Opinion.round_number).where(
@@ -131,28 +316,16 @@ async def get_rounds_with_opinions_for(session_factory, event_id: int, about_use
 
 def build_participants_kb(participants: typing.List[Participant], exclude_user_id: int, already_written: typing.Optional[typing.Set[int]] = None):
     """
-    Построить клавиатуру со списком участников.
+    Построить клавиатуру со списком участников (без кэша; в раунде используйте participants_keyboards).
     already_written - set user_id тех, о ком уже написано мнение (они исключаются из списка).
     """
-    from aiogram.utils.keyboard import InlineKeyboardBuilder, InlineKeyboardButton
-    builder = InlineKeyboardBuilder()
     already_written = already_written or set()
-    for p in participants:
-        if p.user_id == exclude_user_id:
-            continue
-        if p.user_id in already_written:
-            continue  # Уже написали мнение об этом участнике
-        builder.row(InlineKeyboardButton(text=p.full_name, callback_data=f"opinion_about_{p.user_id}"))
-    builder.row(InlineKeyboardButton(text="🔄 Обновить", callback_data="refresh_timer"))
-    builder.row(InlineKeyboardButton(text="✅ Я закончил(а)!", callback_data="done_round"))
-    return builder.as_markup()
+    keyboard = [row for uid, row in participant_rows(participants) if uid != exclude_user_id and uid not in already_written]
+    return InlineKeyboardMarkup(inline_keyboard=keyboard + PARTICIPANTS_KB_FOOTER)
 
 
 def build_cancel_kb():
-    from aiogram.utils.keyboard import InlineKeyboardBuilder, InlineKeyboardButton
-    b = InlineKeyboardBuilder()
-    b.row(InlineKeyboardButton(text="Отмена", callback_data="opinion_cancel"))
-    return b.as_markup()
+    return CANCEL_KB
 
 
 async def get_round_messages(session_factory, event_id: int, round_number: int) -> typing.List[RoundMessage]:
@@ -172,11 +345,10 @@ async def get_round_message(session_factory, event_id: int, round_number: int, u
 async def delete_previous_round_messages(bot, session_factory, event_id: int, prev_round_number: int):
     """Удалить сообщения предыдущего раунда у всех участников."""
     rows = await get_round_messages(session_factory, event_id, prev_round_number)
-    for rm in rows:
-        try:
-            await bot.delete_message(chat_id=rm.chat_id, message_id=rm.message_id)
-        except Exception:
-            pass
+    await pipeline.run(
+        (rm.chat_id, functools.partial(bot.delete_message, chat_id=rm.chat_id, message_id=rm.message_id))
+        for rm in rows
+    )
 
 
 async def notify_round_start(bot, session_factory, event_id: int, round_number: int, round_name: str, read_txt) -> int:
@@ -187,77 +359,223 @@ async def notify_round_start(bot, session_factory, event_id: int, round_number:
     
     text_tpl = await read_txt("round_announce")
     text_tpl = text_tpl.format(n=round_number, round_name=round_name)
-    ok = 0
-    async with session_factory() as s:
-        r = await s.execute(
-            select(Participant).where(Participant.event_id == event_id).order_by(Participant.full_name)
-        )
-        participants = list(r.scalars().all())
-        user_ids = [p.user_id for p in participants]
-        logging.info(
-            "notify_round_start: event_id=%s round_number=%s participants=%s user_ids=%s",
-            event_id, round_number, len(participants), user_ids,
-        )
-        for p in participants:
-            try:
-                # Отправляем без кнопок — фаза общения
-                msg = await bot.send_message(chat_id=p.user_id, text=text_tpl)
-                rm = RoundMessage(
-                    event_id=event_id, round_number=round_number,
-                    user_id=p.user_id, chat_id=p.user_id, message_id=msg.message_id,
-                )
-                s.add(rm)
-                ok += 1
-                logging.info("notify_round_start OK: user_id=%s message_id=%s", p.user_id, msg.message_id)
-            except Exception as e:
-                logging.exception("notify_round_start FAIL: user_id=%s error=%s", p.user_id, e)
-        await s.commit()
-    return ok
-
-
-async def _countdown_task(bot, session_factory, event_id: int, round_number: int, user_id: int, chat_id: int, message_id: int, read_txt):
-    key = (event_id, round_number, user_id)
-    for m in (9, 8, 7, 6, 5, 4, 3, 2, 1, 0):
-        await asyncio.sleep(60)
-        if _round_view.get(key) == "done":
-            return
-        view = _round_view.get(key, "list")
-        participants = await get_participants(session_factory, event_id, exclude_user_id=user_id)
-        already_written = await get_written_opinion_targets(session_factory, event_id, round_number, user_id)
-        kb = build_participants_kb(participants, user_id, already_written)
-        if m == 0:
-            t = await read_txt("round_list_timeout")
-            _round_view[key] = "list"
-        elif isinstance(view, tuple) and len(view) == 3 and view[0] == "writing":
-            t = (await read_txt("opinion_prompt_writing")).format(name=view[2], m=m)
-            kb = build_cancel_kb()
-        else:
-            t = (await read_txt("round_list")).format(m=m)
+    participants = await get_participants(session_factory, event_id)
+    user_ids = [p.user_id for p in participants]
+    logging.info(
+        "notify_round_start: event_id=%s round_number=%s participants=%s user_ids=%s",
+        event_id, round_number, len(participants), user_ids,
+    )
+    # Отправляем без кнопок — фаза общения
+    results = await pipeline.run(
+        (uid, functools.partial(bot.send_message, chat_id=uid, text=text_tpl)) for uid in user_ids
+    )
+    rows = []
+    for uid, msg in zip(user_ids, results):
+        if isinstance(msg, Exception):
+            logging.error("notify_round_start FAIL: user_id=%s error=%s", uid, msg)
+            continue
+        rows.append(dict(
+            event_id=event_id, round_number=round_number,
+            user_id=uid, chat_id=uid, message_id=msg.message_id,
+        ))
+    if rows:
+        # Уже записанные строки (повторный анонс, опоздавший участник) пропускаются, а не роняют всю пачку
+        async with session_factory() as s:
+            await s.execute(insert_ignore(session_factory, RoundMessage, ("event_id", "round_number", "user_id")), rows)
+            await s.commit()
+    logging.info("notify_round_start: event_id=%s round_number=%s sent=%s", event_id, round_number, len(rows))
+    return len(rows)
+
+
+async def _round_still_open(session_factory, event_id: int, round_number: int) -> bool:
+    cur = await get_current_round(session_factory, event_id)
+    return cur is not None and cur.number == round_number and cur.list_shown_at is not None
+
+
+async def _ticker_heartbeat(session_factory, event_id: int, round_number: int, owned: typing.List[bool]):
+    """
+    Пока идёт таймер: владелец раз в TICKER_HEARTBEAT_SEC продлевает блокировку, остальные пытаются её взять —
+    если процесс-владелец упал, таймер через TICKER_LOCK_TTL продолжит другой процесс.
+    """
+    lock = _ticker_lock(event_id, round_number)
+    backend = state_backend.backend
+    while True:
+        if owned[0]:
+            owned[0] = await backend.extend_lock(lock, TICKER_LOCK_TTL)
+        elif await _round_still_open(session_factory, event_id, round_number):
+            owned[0] = await backend.acquire_lock(lock, TICKER_LOCK_TTL)
+            if owned[0]:
+                logging.info("round_ticker: event_id=%s round=%s taken over by %s", event_id, round_number, backend.owner)
+        await asyncio.sleep(TICKER_HEARTBEAT_SEC)
+
+
+async def _round_ticker(bot, session_factory, event_id: int, round_number: int, read_txt, deadline: datetime):
+    """
+    На каждой минутной отметке до deadline обновить сообщения всех участников раунда:
+    участники — один запрос на тик, мнения — из opinion_matrix.
+    Таймер раунда запущен в каждом процессе, а правит сообщения только владелец блокировки;
+    остальные ждут наготове и перехватывают её, если владелец пропал.
+    """
+    key = (event_id, round_number)
+    lock = _ticker_lock(event_id, round_number)
+    backend = state_backend.backend
+    edits_before = message_state.tracker.stats()
+    owned = [await backend.acquire_lock(lock, TICKER_LOCK_TTL)]
+    heartbeat = asyncio.create_task(_ticker_heartbeat(session_factory, event_id, round_number, owned))
+    try:
+        async for m in minute_marks(deadline):
+            if not await _round_still_open(session_factory, event_id, round_number):
+                return  # Раунд завершён (возможно, в другом процессе)
+            owned[0] = await (backend.extend_lock if owned[0] else backend.acquire_lock)(lock, TICKER_LOCK_TTL)
+            if not owned[0]:
+                continue  # Таймер ведёт другой процесс
+            targets = await backend.get_round_targets(event_id, round_number)
+            views = await backend.get_round_views(event_id, round_number)
+            targets = {uid: target for uid, target in targets.items() if views.get(uid) != "done"}
+            if not targets:
+                continue
+            participants = await get_participant_index(session_factory, event_id)
+            matrix = await get_round_opinion_matrix(session_factory, event_id, round_number)
+            if m == 0:
+                list_t = await read_txt("round_list_timeout")
+            else:
+                list_t = (await read_txt("round_list")).format(m=m)
+            writing_tpl = await read_txt("opinion_prompt_writing")
+            jobs = []
+            for uid, (chat_id, message_id) in targets.items():
+                view = views.get(uid, "list")
+                if m != 0 and isinstance(view, tuple) and len(view) == 3 and view[0] == "writing":
+                    t = writing_tpl.format(name=view[2], m=m)
+                    kb = CANCEL_KB
+                else:
+                    t = list_t
+                    kb = participants_keyboards.markup(event_id, round_number, participants, uid, matrix.get(uid))
+                job = message_state.edit_job(bot, chat_id, message_id, t, kb)
+                if job is not None:
+                    jobs.append(job)
+            if m == 0:
+                await backend.set_round_views(event_id, round_number, {uid: "list" for uid in targets})
+            await pipeline.run(jobs)
+    finally:
+        heartbeat.cancel()
+        # И при отмене/остановке процесса: иначе другой процесс ждал бы истечения TICKER_LOCK_TTL
         try:
-            await bot.edit_message_text(chat_id=chat_id, message_id=message_id, text=t, reply_markup=kb)
-        except Exception:
-            pass
-    _countdown_tasks.pop(key, None)
+            await backend.release_lock(lock)
+        except Exception as e:
+            logging.warning("round_ticker: release of %s failed: %s", lock, e)
+        message_state.log_stats("round_ticker event_id={} round={}".format(event_id, round_number), edits_before)
+        if _round_tickers.get(key) is asyncio.current_task():
+            del _round_tickers[key]
 
 
-async def start_round_countdowns(bot, session_factory, event_id: int, round_number: int, read_txt):
-    rows = await get_round_messages(session_factory, event_id, round_number)
-    for rm in rows:
-        key = (event_id, round_number, rm.user_id)
-        t = asyncio.create_task(_countdown_task(bot, session_factory, event_id, round_number, rm.user_id, rm.chat_id, rm.message_id, read_txt))
-        _countdown_tasks[key] = t
+async def start_round_countdowns(
+    bot, session_factory, event_id: int, round_number: int, read_txt, deadline: datetime, rows=None, replace: bool = True,
+):
+    """
+    Запустить таймер раунда до deadline. rows — сообщения раунда, если уже загружены (восстановление после рестарта).
+    replace=False — не трогать уже идущий в этом процессе таймер.
+    """
+    if rows is None:
+        rows = await get_round_messages(session_factory, event_id, round_number)
+    await state_backend.backend.add_round_targets(
+        event_id, round_number, {rm.user_id: (rm.chat_id, rm.message_id) for rm in rows}
+    )
+    key = (event_id, round_number)
+    old = _round_tickers.get(key)
+    if old and not old.done():
+        if not replace:
+            return
+        old.cancel()
+    _round_tickers[key] = asyncio.create_task(_round_ticker(bot, session_factory, event_id, round_number, read_txt, deadline))
+
+
+def on_event_changed_restore(bot, session_factory, read_txt) -> typing.Callable[[], None]:
+    """Колбэк для state_backend.on_event_changed: поднять таймеры раундов, начатых в другом процессе."""
+    tasks = set()
+
+    def callback():
+        t = asyncio.create_task(restore_round_countdowns(bot, session_factory, read_txt))
+        tasks.add(t)
+        t.add_done_callback(_restore_done(tasks))
+
+    return callback
+
+
+def _restore_done(tasks: set):
+    def done(t: asyncio.Task):
+        tasks.discard(t)
+        if not t.cancelled() and t.exception() is not None:
+            logging.warning("restore_round_countdowns failed: %s", t.exception())
+    return done
+
 
+async def stop_round_countdowns():
+    """Остановить таймеры раундов этого процесса (при остановке бота); блокировки отпускаются сразу."""
+    tasks = list(_round_tickers.values())
+    for t in tasks:
+        t.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
 
-async def finish_round_show_list(bot, session_factory, event_id: int, round_number: int, read_txt):
+
+async def finish_round_show_list(bot, session_factory, rnd: Round, read_txt):
+    """Показать всем участникам список для мнений (раунд уже с list_shown_at) и запустить таймер до дедлайна."""
+    event_id, round_number = rnd.event_id, rnd.number
     rows = await get_round_messages(session_factory, event_id, round_number)
-    t = (await read_txt("round_list")).format(m=10)
+    t = await round_list_text(rnd, read_txt)
+    # Список участников и мнения раунда грузим один раз на всех
+    participants = await get_participant_index(session_factory, event_id)
+    matrix = await get_round_opinion_matrix(session_factory, event_id, round_number, refresh=True)
+    await state_backend.backend.set_round_views(event_id, round_number, {rm.user_id: "list" for rm in rows})
+    edited, jobs = [], []
     for rm in rows:
-        _round_view[(event_id, round_number, rm.user_id)] = "list"
-        participants = await get_participants(session_factory, event_id, exclude_user_id=rm.user_id)
-        already_written = await get_written_opinion_targets(session_factory, event_id, round_number, rm.user_id)
-        kb = build_participants_kb(participants, rm.user_id, already_written)
-        try:
-            await bot.edit_message_text(chat_id=rm.chat_id, message_id=rm.message_id, text=t, reply_markup=kb)
-        except Exception as e:
-            logging.exception("finish_round_show_list to %s: %s", rm.user_id, e)
-    await start_round_countdowns(bot, session_factory, event_id, round_number, read_txt)
+        kb = participants_keyboards.markup(event_id, round_number, participants, rm.user_id, matrix.get(rm.user_id))
+        job = message_state.edit_job(bot, rm.chat_id, rm.message_id, t, kb)
+        if job is not None:
+            edited.append(rm)
+            jobs.append(job)
+    results = await pipeline.run(jobs)
+    for rm, res in zip(edited, results):
+        if isinstance(res, Exception):
+            logging.error("finish_round_show_list to %s: %s", rm.user_id, res)
+    await start_round_countdowns(bot, session_factory, event_id, round_number, read_txt, round_deadline(rnd), rows)
+
+
+async def restore_round_countdowns(bot, session_factory, read_txt) -> int:
+    """
+    После рестарта поднять таймеры раундов, у которых идёт сбор мнений: раунды и их сообщения — одним запросом.
+    Таймеры ждут ближайшую минутную отметку своего дедлайна, а не правят сообщения сразу при старте,
+    и дальше идут через общий send_pipeline — рестарт не даёт всплеска запросов к Bot API.
+    Раунды с прошедшим дедлайном не поднимаются. Возвращает число запущенных таймеров.
+    Вызывается и по notify_event_changed из других процессов: так каждый процесс держит таймер наготове
+    и может перехватить его блокировку. Таймеры завершённых раундов останавливаются сами на ближайшей отметке.
+    """
+    now = datetime.utcnow()
+    async with session_factory() as s:
+        r = await s.execute(
+            select(Round, RoundMessage)
+            .join(Event, Event.id == Round.event_id)
+            .join(RoundMessage, (RoundMessage.event_id == Round.event_id) & (RoundMessage.round_number == Round.number))
+            .where(
+                Event.is_started == True, Event.is_ended == False,
+                Round.ended_at.is_(None), Round.list_shown_at.isnot(None),
+                Round.list_shown_at > now - timedelta(seconds=ROUND_DURATION_SEC),
+            )
+        )
+        pairs = r.all()
+    rounds = {}
+    for rnd, rm in pairs:
+        rounds.setdefault(rnd.id, (rnd, []))[1].append(rm)
+    started = 0
+    for rnd, rows in rounds.values():
+        if (rnd.event_id, rnd.number) in _round_tickers:
+            continue
+        await start_round_countdowns(
+            bot, session_factory, rnd.event_id, rnd.number, read_txt, round_deadline(rnd), rows, replace=False,
+        )
+        if (rnd.event_id, rnd.number) in _round_tickers:
+            started += 1
+            logging.info(
+                "restore_round_countdowns: event_id=%s round=%s messages=%s remaining=%s min",
+                rnd.event_id, rnd.number, len(rows), remaining_minutes(rnd, now),
+            )
+    return started
@@ -0,0 +1,34 @@
+import json
+import logging
+import typing
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - необязательная зависимость
+    orjson = None
+
+try:
+    import uvloop
+except ImportError:  # pragma: no cover - необязательная зависимость
+    uvloop = None
+
+
+def install_event_loop() -> bool:
+    """Поставить uvloop как политику цикла событий (до asyncio.run). False — uvloop не установлен."""
+    if uvloop is None:
+        logging.warning("FAST_RUNTIME: uvloop is not installed, using the default event loop")
+        return False
+    uvloop.install()
+    return True
+
+
+def _orjson_dumps(value: typing.Any) -> str:
+    return orjson.dumps(value).decode()
+
+
+def json_kwargs() -> typing.Dict[str, typing.Callable]:
+    """json_loads / json_dumps для сессии бота (AiohttpSession(**json_kwargs())): orjson, если установлен."""
+    if orjson is None:
+        logging.warning("FAST_RUNTIME: orjson is not installed, using json")
+        return {"json_loads": json.loads, "json_dumps": json.dumps}
+    return {"json_loads": orjson.loads, "json_dumps": _orjson_dumps}
@@ -0,0 +1,123 @@
+import typing
+
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+
+from bot.models.sql import Participant
+
+Row = typing.Tuple[int, typing.List[InlineKeyboardButton]]
+
+PARTICIPANTS_KB_FOOTER = [
+    [InlineKeyboardButton(text="🔄 Обновить", callback_data="refresh_timer")],
+    [InlineKeyboardButton(text="✅ Я закончил(а)!", callback_data="done_round")],
+]
+
+CANCEL_KB = InlineKeyboardMarkup(inline_keyboard=[
+    [InlineKeyboardButton(text="Отмена", callback_data="opinion_cancel")],
+])
+
+
+PAGE_SIZE = 20
+NOOP_CALLBACK = "noop"  # кнопка-надпись: нажатие только гасит «часики»
+
+
+def paginate(items: typing.Sequence, page: int, size: int = PAGE_SIZE) -> typing.Tuple[typing.Sequence, int, int]:
+    """Срез страницы: (элементы, номер страницы после ограничения диапазоном, всего страниц)."""
+    pages = max(1, (len(items) + size - 1) // size)
+    page = min(max(page, 0), pages - 1)
+    return items[page * size:(page + 1) * size], page, pages
+
+
+def page_nav_row(page: int, pages: int, prefix: str) -> typing.List[InlineKeyboardButton]:
+    """Строка «◀️ 2/5 ▶️» с компактными callback'ами вида '<prefix>:<страница>'."""
+    row = []
+    if page > 0:
+        row.append(InlineKeyboardButton(text="◀️", callback_data="{}:{}".format(prefix, page - 1)))
+    row.append(InlineKeyboardButton(text="{}/{}".format(page + 1, pages), callback_data=NOOP_CALLBACK))
+    if page < pages - 1:
+        row.append(InlineKeyboardButton(text="▶️", callback_data="{}:{}".format(prefix, page + 1)))
+    return row
+
+
+def participant_rows(participants: typing.List[Participant]) -> typing.List[Row]:
+    """Строки клавиатуры (user_id, [кнопка]) для всех участников — строятся один раз на весь список."""
+    return [
+        (p.user_id, [InlineKeyboardButton(text=p.full_name, callback_data=f"opinion_about_{p.user_id}")])
+        for p in participants
+    ]
+
+
+class _RoundKeyboards:
+    def __init__(self, participants: typing.List[Participant], signature: tuple, rows: typing.List[Row]):
+        self.participants = participants
+        self.signature = signature
+        self.rows = rows
+        self.markups: typing.Dict[typing.Tuple[frozenset, int], InlineKeyboardMarkup] = {}
+        self.pages: typing.Dict[int, int] = {}  # user_id -> открытая страница
+
+
+class ParticipantsKeyboardFactory:
+    """
+    Клавиатуры со списком участников раунда.
+    Строки всех участников строятся один раз на раунд (и заново — только если состав участников изменился),
+    клавиатура участника — это базовые строки без исключённых (он сам и те, о ком уже написано),
+    по PAGE_SIZE на страницу; готовая разметка кэшируется по набору исключений и странице
+    (не больше MAX_MARKUPS на раунд, вытесняется давно не использованная).
+    Открытая страница запоминается для каждого участника, чтобы таймер не сбрасывал её.
+    Хранятся только последние MAX_ROUNDS раундов.
+    """
+
+    MAX_ROUNDS = 2
+    MAX_MARKUPS = 2048
+
+    def __init__(self):
+        self._rounds: typing.Dict[typing.Tuple[int, int], _RoundKeyboards] = {}
+
+    def _round(self, event_id: int, round_number: int, participants: typing.List[Participant]) -> _RoundKeyboards:
+        key = (event_id, round_number)
+        cached = self._rounds.get(key)
+        if cached is not None and cached.participants is participants:
+            return cached
+        signature = tuple((p.user_id, p.full_name) for p in participants)
+        if cached is not None and cached.signature == signature:
+            cached.participants = participants
+            return cached
+        fresh = _RoundKeyboards(participants, signature, participant_rows(participants))
+        if cached is not None:
+            fresh.pages = cached.pages
+        self._rounds.pop(key, None)
+        self._rounds[key] = fresh
+        while len(self._rounds) > self.MAX_ROUNDS:
+            del self._rounds[next(iter(self._rounds))]
+        return fresh
+
+    def markup(
+            self,
+            event_id: int,
+            round_number: int,
+            participants: typing.List[Participant],
+            exclude_user_id: int,
+            already_written: typing.Optional[typing.Set[int]] = None,
+            page: typing.Optional[int] = None,
+    ) -> InlineKeyboardMarkup:
+        """page=None — последняя открытая участником страница."""
+        rk = self._round(event_id, round_number, participants)
+        excluded = frozenset(already_written or ()) | {exclude_user_id}
+        if page is None:
+            page = rk.pages.get(exclude_user_id, 0)
+        kb = rk.markups.pop((excluded, page), None)
+        if kb is None:
+            rows = [row for uid, row in rk.rows if uid not in excluded]
+            keyboard, page, pages = paginate(rows, page)
+            keyboard = list(keyboard)
+            if pages > 1:
+                keyboard.append(page_nav_row(page, pages, "pp"))
+            kb = InlineKeyboardMarkup(inline_keyboard=keyboard + PARTICIPANTS_KB_FOOTER)
+        # Заново в конец: порядок словаря — от давно не использованных к недавним
+        rk.markups[(excluded, page)] = kb
+        while len(rk.markups) > self.MAX_MARKUPS:
+            del rk.markups[next(iter(rk.markups))]
+        rk.pages[exclude_user_id] = page
+        return kb
+
+
+participants_keyboards = ParticipantsKeyboardFactory()
@@ -0,0 +1,89 @@
+import asyncio
+import collections
+import logging
+import time
+import typing
+
+from bot.services import event_service, metrics, state_backend
+
+CENSUS_EVERY = 60  # раз во сколько секунд переписывать задачи и состояние раундов
+
+
+def _coro_name(task: asyncio.Task) -> str:
+    coro = task.get_coro()
+    return getattr(coro, "__qualname__", None) or type(coro).__name__
+
+
+def task_census() -> typing.Dict[str, int]:
+    """Живые задачи цикла по имени корутины."""
+    return dict(collections.Counter(_coro_name(t) for t in asyncio.all_tasks() if not t.done()))
+
+
+async def round_census() -> typing.Dict[str, int]:
+    """Таймеры раундов этого процесса и число отслеживаемых участников (view) в их раундах."""
+    views = 0
+    for event_id, round_number in list(event_service._round_tickers):
+        views += len(await state_backend.backend.get_round_views(event_id, round_number))
+    return {"tickers": len(event_service._round_tickers), "views": views}
+
+
+class LoopMonitor:
+    """
+    Фоновый замер задержки цикла событий: насколько позже заказанного просыпается sleep(interval).
+    Задержка выше lag_warn во время раунда (идёт таймер раунда) пишется в лог как warning.
+    Раз в CENSUS_EVERY секунд — перепись задач по корутинам и состояния раундов в лог и метрики.
+    """
+
+    def __init__(self, interval: float = 0.5, lag_warn: float = 0.2):
+        self.interval = interval
+        self.lag_warn = lag_warn
+        self.lag_max = 0.0
+        self._task: typing.Optional[asyncio.Task] = None
+
+    async def _run(self):
+        next_census = time.monotonic() + CENSUS_EVERY
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - started - self.interval)
+            self.lag_max = max(self.lag_max, lag)
+            metrics.loop_lag.observe("main", lag)
+            if lag >= self.lag_warn:
+                if event_service._round_tickers:
+                    logging.warning("Event loop lag %.0f ms during a round (%s tasks)", lag * 1000, len(asyncio.all_tasks()))
+                else:
+                    logging.info("Event loop lag %.0f ms", lag * 1000)
+            if now >= next_census:
+                next_census = now + CENSUS_EVERY
+                await self.census()
+
+    async def census(self):
+        tasks = task_census()
+        metrics.tasks_alive.set_all(tasks)
+        try:
+            rounds = await round_census()
+        except Exception as e:
+            logging.warning("loop_monitor: round census failed: %s", e)
+            rounds = {}
+        for kind, value in rounds.items():
+            metrics.round_state.set(kind, value)
+        top = sorted(tasks.items(), key=lambda x: -x[1])[:10]
+        logging.info(
+            "Loop: lag max %.0f ms, tasks %s (%s), rounds %s",
+            self.lag_max * 1000, sum(tasks.values()), ", ".join("{}={}".format(n, c) for n, c in top), rounds,
+        )
+        self.lag_max = 0.0
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
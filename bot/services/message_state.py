@@ -0,0 +1,95 @@
+import functools
+import logging
+import typing
+
+from aiogram.exceptions import TelegramBadRequest
+
+MAX_MESSAGES = 50000
+
+
+class MessageStateTracker:
+    """
+    Последний текст и клавиатура, отправленные в каждое сообщение (chat_id, message_id).
+    Правка с тем же содержимым не отправляется: Telegram всё равно ответит «message is not modified»,
+    а запрос потратит лимит. Счётчики sent / suppressed / failed показывают, сколько запросов сэкономлено.
+    """
+
+    def __init__(self, max_messages: int = MAX_MESSAGES):
+        self.max_messages = max_messages
+        # (chat_id, message_id) -> (хэш текста, хэш клавиатуры): сами объекты не держим в памяти
+        self._last: typing.Dict[typing.Tuple[int, int], typing.Tuple[int, int]] = {}
+        self.sent = 0
+        self.suppressed = 0
+        self.failed = 0
+
+    def should_edit(self, chat_id: int, message_id: int, text: str, markup=None) -> bool:
+        """
+        False — в сообщении уже этот текст и эта клавиатура.
+        True — запоминает новое содержимое; если правка не удалась, вызовите forget.
+        """
+        key = (chat_id, message_id)
+        state = (hash(text), hash(markup.model_dump_json()) if markup is not None else 0)
+        if self._last.get(key) == state:
+            self.suppressed += 1
+            return False
+        self._last.pop(key, None)
+        self._last[key] = state
+        if len(self._last) > self.max_messages:
+            del self._last[next(iter(self._last))]
+        return True
+
+    def forget(self, chat_id: int, message_id: int):
+        """Сообщение изменено в обход трекера — следующую правку отправить в любом случае."""
+        self._last.pop((chat_id, message_id), None)
+
+    def stats(self) -> typing.Dict[str, int]:
+        return {"sent": self.sent, "suppressed": self.suppressed, "failed": self.failed, "tracked": len(self._last)}
+
+
+tracker = MessageStateTracker()
+
+
+async def _edit(bot, chat_id: int, message_id: int, text: str, reply_markup):
+    try:
+        result = await bot.edit_message_text(chat_id=chat_id, message_id=message_id, text=text, reply_markup=reply_markup)
+    except TelegramBadRequest as e:
+        if "message is not modified" in str(e):
+            tracker.suppressed += 1
+            return None
+        tracker.forget(chat_id, message_id)
+        tracker.failed += 1
+        raise
+    except Exception:
+        tracker.forget(chat_id, message_id)
+        tracker.failed += 1
+        raise
+    tracker.sent += 1
+    return result
+
+
+def edit_job(bot, chat_id: int, message_id: int, text: str, reply_markup=None):
+    """Задание (chat_id, factory) для pipeline.run или None, если в сообщении уже этот текст и клавиатура."""
+    if not tracker.should_edit(chat_id, message_id, text, reply_markup):
+        return None
+    return chat_id, functools.partial(_edit, bot, chat_id, message_id, text, reply_markup)
+
+
+async def edit(bot, chat_id: int, message_id: int, text: str, reply_markup=None) -> bool:
+    """Изменить сообщение; False — в нём уже этот текст и клавиатура, запрос не отправлялся."""
+    if not tracker.should_edit(chat_id, message_id, text, reply_markup):
+        return False
+    await _edit(bot, chat_id, message_id, text, reply_markup)
+    return True
+
+
+def forget(chat_id: int, message_id: int):
+    tracker.forget(chat_id, message_id)
+
+
+def log_stats(scope: str, before: typing.Dict[str, int]):
+    """Записать в лог, сколько правок ушло и сколько подавлено с момента снимка before."""
+    now = tracker.stats()
+    logging.info(
+        "%s: edits sent=%s suppressed=%s failed=%s",
+        scope, now["sent"] - before["sent"], now["suppressed"] - before["suppressed"], now["failed"] - before["failed"],
+    )
@@ -0,0 +1,170 @@
+import bisect
+import logging
+import typing
+
+from aiohttp import web
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34)
+
+
+class Histogram:
+    """Гистограмма в формате Prometheus: накопительные корзины, сумма и число наблюдений по каждому набору меток."""
+
+    def __init__(self, name: str, doc: str, label: str, buckets: typing.Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.doc = doc
+        self.label = label
+        self.buckets = tuple(buckets)
+        self._series: typing.Dict[str, typing.List] = {}  # значение метки -> [counts по корзинам + inf, sum, count]
+
+    def observe(self, label_value: str, value: float):
+        series = self._series.get(label_value)
+        if series is None:
+            series = self._series[label_value] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def quantile(self, label_value: str, q: float) -> float:
+        """Оценка квантиля по корзинам: верхняя граница корзины, в которую он попал."""
+        series = self._series.get(label_value)
+        if not series or not series[2]:
+            return 0.0
+        rank = q * series[2]
+        seen = 0
+        for bound, n in zip(self.buckets + (float("inf"),), series[0]):
+            seen += n
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def stats(self) -> typing.Dict[str, typing.Tuple[int, float]]:
+        """метка -> (число наблюдений, сумма)."""
+        return {label: (series[2], series[1]) for label, series in self._series.items()}
+
+    def render(self) -> typing.List[str]:
+        lines = ["# HELP {} {}".format(self.name, self.doc), "# TYPE {} histogram".format(self.name)]
+        for label, (counts, total, count) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                lines.append('{}_bucket{{{}="{}",le="{}"}} {}'.format(self.name, self.label, label, le, cumulative))
+            lines.append('{}_sum{{{}="{}"}} {}'.format(self.name, self.label, label, total))
+            lines.append('{}_count{{{}="{}"}} {}'.format(self.name, self.label, label, count))
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, doc: str, label: str):
+        self.name = name
+        self.doc = doc
+        self.label = label
+        self._values: typing.Dict[str, float] = {}
+
+    def inc(self, label_value: str, amount: float = 1):
+        self._values[label_value] = self._values.get(label_value, 0) + amount
+
+    def stats(self) -> typing.Dict[str, float]:
+        return dict(self._values)
+
+    def render(self) -> typing.List[str]:
+        lines = ["# HELP {} {}".format(self.name, self.doc), "# TYPE {} counter".format(self.name)]
+        for label, value in sorted(self._values.items()):
+            lines.append('{}{{{}="{}"}} {}'.format(self.name, self.label, label, value))
+        return lines
+
+
+class Gauge:
+    """Текущее значение по метке; set_all заменяет весь набор (например, перепись задач)."""
+
+    def __init__(self, name: str, doc: str, label: str):
+        self.name = name
+        self.doc = doc
+        self.label = label
+        self._values: typing.Dict[str, float] = {}
+
+    def set(self, label_value: str, value: float):
+        self._values[label_value] = value
+
+    def set_all(self, values: typing.Dict[str, float]):
+        self._values = dict(values)
+
+    def stats(self) -> typing.Dict[str, float]:
+        return dict(self._values)
+
+    def render(self) -> typing.List[str]:
+        lines = ["# HELP {} {}".format(self.name, self.doc), "# TYPE {} gauge".format(self.name)]
+        for label, value in sorted(self._values.items()):
+            lines.append('{}{{{}="{}"}} {}'.format(self.name, self.label, label, value))
+        return lines
+
+
+handler_latency = Histogram("bot_handler_seconds", "Handler latency, including middlewares below metrics.", "handler")
+handler_db_queries = Histogram("bot_handler_db_queries", "SQL queries per handled update.", "handler", COUNT_BUCKETS)
+handler_errors = Counter("bot_handler_errors_total", "Handlers that raised.", "handler")
+telegram_latency = Histogram("bot_telegram_request_seconds", "Telegram Bot API request latency.", "method")
+telegram_errors = Counter("bot_telegram_errors_total", "Telegram Bot API requests that raised.", "method")
+throttled = Counter("bot_throttled_total", "Updates rejected by a throttling budget.", "budget")
+
+loop_lag = Histogram("bot_loop_lag_seconds", "Event loop lag: how late a sleep(interval) wakes up.", "loop")
+tasks_alive = Gauge("bot_tasks_alive", "Live asyncio tasks by coroutine.", "coro")
+round_state = Gauge("bot_round_state", "Round tickers and tracked participant views.", "kind")
+
+REGISTRY = [
+    handler_latency, handler_db_queries, handler_errors, telegram_latency, telegram_errors, throttled,
+    loop_lag, tasks_alive, round_state,
+]
+
+# Дополнительные значения (gauge) для /metrics: имя -> функция без аргументов
+_gauges: typing.Dict[str, typing.Callable[[], float]] = {}
+
+
+def register_gauge(name: str, getter: typing.Callable[[], float]):
+    _gauges[name] = getter
+
+
+def render() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    for name, getter in sorted(_gauges.items()):
+        try:
+            value = getter()
+        except Exception as e:
+            logging.warning("metrics: gauge %s failed: %s", name, e)
+            continue
+        lines.append("# TYPE {} gauge".format(name))
+        lines.append("{} {}".format(name, value))
+    return "\n".join(lines) + "\n"
+
+
+def top_handlers(limit: int = 10) -> typing.List[typing.Tuple[str, int, float, float, float]]:
+    """(обработчик, вызовов, p50 с, p95 с, запросов к БД в среднем) — по убыванию суммарного времени."""
+    db = handler_db_queries.stats()
+    rows = []
+    for name, (count, total) in handler_latency.stats().items():
+        db_count, db_total = db.get(name, (0, 0.0))
+        rows.append((
+            total, name, count,
+            handler_latency.quantile(name, 0.5), handler_latency.quantile(name, 0.95),
+            db_total / db_count if db_count else 0.0,
+        ))
+    rows.sort(reverse=True)
+    return [row[1:] for row in rows[:limit]]
+
+
+async def _handle(request: web.Request) -> web.Response:
+    return web.Response(text=render(), content_type="text/plain", charset="utf-8")
+
+
+async def start_server(host: str, port: int) -> web.AppRunner:
+    """HTTP-эндпоинт /metrics для Prometheus."""
+    app = web.Application()
+    app.router.add_get("/metrics", _handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logging.info("Metrics: http://%s:%s/metrics", host, port)
+    return runner
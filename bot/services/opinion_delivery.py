@@ -0,0 +1,114 @@
+import asyncio
+import functools
+import logging
+import random
+import typing
+
+from sqlalchemy import select
+
+from bot.models.sql import OpinionDelivery
+from bot.services import event_service, state_backend
+from bot.services.send_pipeline import pipeline
+from database.manager import insert_ignore
+
+CHUNK_SIZE = 50
+LOCK_TTL = 10 * 60
+NO_OPINIONS_TEXT = "У вас пока нет мнений."
+
+# (done, failed, total, finished) -> отчёт админу
+Progress = typing.Callable[[int, int, int, bool], typing.Awaitable[None]]
+
+_delivery_tasks = {}  # event_id -> asyncio.Task
+
+
+def _lock(event_id: int) -> str:
+    return "opinion_delivery:{}".format(event_id)
+
+
+def render_opinions(intro: str, texts: typing.List[str]) -> str:
+    # Перемешиваем мнения для анонимности
+    texts = list(texts)
+    random.shuffle(texts)
+    lines = [intro, ""]
+    for i, txt in enumerate(texts, 1):
+        lines.append("{}. {}".format(i, txt))
+    return "\n".join(lines)
+
+
+async def get_delivered(session_factory, event_id: int) -> typing.Set[int]:
+    async with session_factory() as s:
+        r = await s.execute(select(OpinionDelivery.user_id).where(OpinionDelivery.event_id == event_id))
+        return set(r.scalars().all())
+
+
+async def mark_delivered(session_factory, event_id: int, user_ids: typing.List[int]):
+    """Отметить доставку; уже отмеченные (например, другим запуском) пропускаются по uq_opinion_delivery."""
+    if not user_ids:
+        return
+    async with session_factory() as s:
+        await s.execute(
+            insert_ignore(session_factory, OpinionDelivery, ("event_id", "user_id")),
+            [dict(event_id=event_id, user_id=uid) for uid in user_ids],
+        )
+        await s.commit()
+
+
+async def _run(bot, session_factory, event_id: int, intro: str, on_progress: Progress):
+    lock = _lock(event_id)
+    try:
+        participants = await event_service.get_participants(session_factory, event_id)
+        opinions = await event_service.get_event_opinions(session_factory, event_id)
+        delivered = await get_delivered(session_factory, event_id)
+        pending = [p.user_id for p in participants if p.user_id not in delivered]
+        total = len(participants)
+        done, failed = total - len(pending), 0
+        await on_progress(done, failed, total, False)
+
+        for i in range(0, len(pending), CHUNK_SIZE):
+            if not await state_backend.backend.extend_lock(lock, LOCK_TTL):
+                # Неотправленные — как недоставленные: отчёт предложит запустить отправку ещё раз
+                logging.warning(
+                    "opinion_delivery: event_id=%s lock lost, stopping: delivered %s/%s, failed %s, not sent %s",
+                    event_id, done, total, failed, len(pending) - i,
+                )
+                await on_progress(done, total - done, total, True)
+                return
+            chunk = pending[i:i + CHUNK_SIZE]
+            results = await pipeline.run(
+                (uid, functools.partial(
+                    bot.send_message, chat_id=uid,
+                    text=render_opinions(intro, opinions[uid]) if opinions.get(uid) else NO_OPINIONS_TEXT,
+                ))
+                for uid in chunk
+            )
+            ok = []
+            for uid, res in zip(chunk, results):
+                if isinstance(res, Exception):
+                    logging.error("send_opinions to %s: %s", uid, res)
+                else:
+                    ok.append(uid)
+            await mark_delivered(session_factory, event_id, ok)
+            done += len(ok)
+            failed += len(chunk) - len(ok)
+            await on_progress(done, failed, total, False)
+
+        await on_progress(done, failed, total, True)
+    except Exception as e:
+        logging.exception("opinion_delivery: event_id=%s failed: %s", event_id, e)
+    finally:
+        await state_backend.backend.release_lock(lock)
+        _delivery_tasks.pop(event_id, None)
+
+
+async def start(bot, session_factory, event_id: int, intro: str, on_progress: Progress) -> bool:
+    """
+    Запустить фоновую отправку мнений участникам. False — отправка уже идёт.
+    Уже получившие мнения пропускаются, поэтому повторный запуск досылает оставшимся.
+    """
+    if not await state_backend.backend.acquire_lock(_lock(event_id), LOCK_TTL):
+        return False
+    task = _delivery_tasks.get(event_id)
+    if task and not task.done():
+        return False
+    _delivery_tasks[event_id] = asyncio.create_task(_run(bot, session_factory, event_id, intro, on_progress))
+    return True
@@ -0,0 +1,134 @@
+import asyncio
+import logging
+import typing
+from datetime import datetime
+
+from bot.models.sql import Opinion
+from bot.services.event_cache import opinion_matrix
+from database.manager import insert_ignore, unique_constraints
+
+OpinionKey = typing.Tuple[int, int, int, int]  # (event_id, round_number, from_user_id, about_user_id)
+
+FLUSH_INTERVAL = 0.25
+BATCH_SIZE = 500
+UNIQUE_COLUMNS = ("event_id", "round_number", "from_user_id", "about_user_id")  # uq_opinion
+UNIQUE_CONSTRAINT = "uq_opinion"
+MAX_FAILED_FLUSHES = 20  # подряд; дальше — CRITICAL в лог и повтор не чаще RETRY_INTERVAL
+RETRY_INTERVAL = 30.0
+
+
+class OpinionWriter:
+    """
+    Отложенная запись мнений: submit() сразу отмечает мнение в opinion_matrix и кладёт его в буфер,
+    а фоновая задача раз в FLUSH_INTERVAL (или при BATCH_SIZE мнениях) пишет буфер одним
+    INSERT ... ON CONFLICT DO NOTHING. Дубликаты отсекаются в буфере и уникальным ключом uq_opinion.
+    Если запись не удалась, мнения остаются в буфере до следующей попытки; после MAX_FAILED_FLUSHES
+    неудач подряд writer считается нездоровым (healthy, метрика bot_opinion_writer_failed_flushes).
+    """
+
+    def __init__(self, flush_interval: float = FLUSH_INTERVAL, batch_size: int = BATCH_SIZE):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.flushed = 0
+        self.failed_flushes = 0  # неудачных записей подряд
+        self._pending: typing.Dict[OpinionKey, dict] = {}
+        self._session_factory = None
+        self._wakeup = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._task: typing.Optional[asyncio.Task] = None
+
+    def submit(self, event_id: int, round_number: int, from_user_id: int, about_user_id: int, text: str) -> bool:
+        """
+        Принять мнение без ожидания БД. False — мнение об этом участнике в раунде уже есть.
+        Матрица раунда должна быть загружена заранее (event_service.save_opinion), иначе проверка — только по буферу.
+        """
+        key = (event_id, round_number, from_user_id, about_user_id)
+        matrix = opinion_matrix.get(event_id, round_number)
+        if key in self._pending or (isinstance(matrix, dict) and about_user_id in matrix.get(from_user_id, ())):
+            return False
+        self._pending[key] = dict(
+            event_id=event_id, round_number=round_number, from_user_id=from_user_id,
+            about_user_id=about_user_id, text=text, created_at=datetime.utcnow(),
+        )
+        opinion_matrix.add(event_id, round_number, from_user_id, about_user_id)
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    def pending_for(self, event_id: int, round_number: int) -> typing.List[typing.Tuple[int, int]]:
+        """Ещё не записанные мнения раунда: (from_user_id, about_user_id)."""
+        return [(k[2], k[3]) for k in self._pending if k[0] == event_id and k[1] == round_number]
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    @property
+    def healthy(self) -> bool:
+        return self.failed_flushes < MAX_FAILED_FLUSHES
+
+    async def flush(self) -> int:
+        """Записать буфер сейчас. Возвращает число мнений в записанной пачке."""
+        async with self._lock:
+            if not self._pending or self._session_factory is None:
+                return 0
+            batch, self._pending = self._pending, {}
+            try:
+                async with self._session_factory() as s:
+                    await s.execute(insert_ignore(self._session_factory, Opinion, UNIQUE_COLUMNS), list(batch.values()))
+                    await s.commit()
+            except BaseException as e:
+                # Вернуть пачку в буфер; повторная запись безопасна благодаря ON CONFLICT DO NOTHING
+                batch.update(self._pending)
+                self._pending = batch
+                if not isinstance(e, Exception):
+                    raise
+                self.failed_flushes += 1
+                if self.failed_flushes == MAX_FAILED_FLUSHES:
+                    logging.critical(
+                        "opinion_writer: %s flushes failed in a row, %s opinions are not saved; retrying every %ss: %s",
+                        self.failed_flushes, len(batch), RETRY_INTERVAL, e,
+                    )
+                else:
+                    logging.error("opinion_writer: flush of %s opinions failed: %s", len(batch), e)
+                return 0
+            if not self.healthy:
+                logging.warning("opinion_writer: flush recovered after %s failures", self.failed_flushes)
+            self.failed_flushes = 0
+            self.flushed += len(batch)
+            return len(batch)
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval if self.healthy else RETRY_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def check_schema(self, session_factory):
+        """Без uq_opinion ON CONFLICT не работает и каждая запись падает — не стартуем, пока не применена миграция."""
+        if UNIQUE_CONSTRAINT not in await unique_constraints(session_factory, Opinion.__tablename__):
+            raise RuntimeError(
+                "opinion_writer: constraint {} is missing, run python -m scripts.run_migrate".format(UNIQUE_CONSTRAINT)
+            )
+
+    def start(self, session_factory):
+        self._session_factory = session_factory
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Остановить фоновую запись и дописать буфер."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+writer = OpinionWriter()
@@ -0,0 +1,100 @@
+import re
+import typing
+
+from sqlalchemy import select, func, or_
+
+from bot.models.sql import Participant
+from bot.services import event_service
+from database.manager import dialect_name
+
+SIMILARITY_THRESHOLD = 0.3  # как pg_trgm.similarity_threshold по умолчанию
+LIMIT = 100
+
+_WORD = re.compile(r"\w+")
+
+
+def trigrams(text: str) -> typing.Set[str]:
+    """Триграммы строки так же, как в pg_trgm: слова в нижнем регистре, дополненные двумя пробелами слева и одним справа."""
+    grams = set()
+    for word in _WORD.findall(text.casefold()):
+        padded = "  {} ".format(word)
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class NgramIndex:
+    """
+    Триграммный индекс по full_name в памяти — для SQLite и тестов, где нет pg_trgm.
+    Ищет как запрос в Postgres: подстрока (ILIKE) или похожесть не ниже SIMILARITY_THRESHOLD,
+    результаты по убыванию похожести.
+    """
+
+    def __init__(self, participants: typing.List[Participant]):
+        self.participants = participants
+        self._names = [p.full_name.casefold() for p in participants]
+        self._grams = [trigrams(p.full_name) for p in participants]
+        self._postings: typing.Dict[str, typing.List[int]] = {}
+        for i, grams in enumerate(self._grams):
+            for g in grams:
+                self._postings.setdefault(g, []).append(i)
+
+    def search(self, query: str, limit: int = LIMIT) -> typing.List[Participant]:
+        needle = query.casefold().strip()
+        if not needle:
+            return []
+        query_grams = trigrams(needle)
+        # Число общих триграмм считаем по спискам вхождений, без пересечения множеств
+        shared: typing.Dict[int, int] = {}
+        for g in query_grams:
+            for i in self._postings.get(g, ()):
+                shared[i] = shared.get(i, 0) + 1
+        if len(needle) < 3:
+            # Слишком короткий запрос для триграмм — подстрока, перебором
+            shared.update((i, shared.get(i, 0)) for i, name in enumerate(self._names) if needle in name)
+        total = len(query_grams)
+        scored = []
+        for i, n in shared.items():
+            score = n / (total + len(self._grams[i]) - n) if n else 0.0
+            if score >= SIMILARITY_THRESHOLD or needle in self._names[i]:
+                scored.append((-score, self._names[i], i))
+        scored.sort()
+        return [self.participants[i] for _, _, i in scored[:limit]]
+
+
+_indexes: typing.Dict[int, NgramIndex] = {}  # event_id -> индекс по текущему participant_index
+
+
+async def _memory_search(session_factory, event_id: int, query: str, limit: int) -> typing.List[Participant]:
+    participants = await event_service.get_participant_index(session_factory, event_id)
+    index = _indexes.get(event_id)
+    if index is None or index.participants is not participants:
+        index = NgramIndex(participants)
+        _indexes.clear()
+        _indexes[event_id] = index
+    return index.search(query, limit)
+
+
+def _contains_pattern(query: str) -> str:
+    """Шаблон ILIKE «содержит query»: %, _ и \\ из запроса ищутся буквально (escape='\\')."""
+    escaped = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return "%{}%".format(escaped)
+
+
+async def search_participants(session_factory, event_id: int, query: str, limit: int = LIMIT) -> typing.List[Participant]:
+    """
+    Участники мероприятия, похожие на query, по убыванию похожести.
+    В Postgres — через GIN-индекс pg_trgm (ix_participant_full_name_trgm), иначе — NgramIndex в памяти.
+    """
+    query = query.strip()
+    if not query:
+        return []
+    if dialect_name(session_factory) != "postgresql":
+        return await _memory_search(session_factory, event_id, query, limit)
+    async with session_factory() as s:
+        r = await s.execute(
+            select(Participant).where(
+                Participant.event_id == event_id,
+                or_(Participant.full_name.op("%")(query), Participant.full_name.ilike(_contains_pattern(query), escape="\\")),
+            ).order_by(func.similarity(Participant.full_name, query).desc(), Participant.full_name).limit(limit)
+        )
+        return list(r.scalars().all())
@@ -0,0 +1,61 @@
+import asyncio
+import time
+
+
+class TokenBucket:
+    """Ведро токенов: в среднем rate операций в секунду, всплеск не больше capacity."""
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._tokens = self.capacity
+        self._ts = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._ts) * self.rate)
+        self._ts = now
+
+    @property
+    def is_full(self) -> bool:
+        self._refill()
+        return self._tokens >= self.capacity
+
+    async def acquire(self):
+        """Дождаться токена. Ожидающие обслуживаются по очереди."""
+        async with self._lock:
+            self._refill()
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
+
+
+class AdaptiveRate(TokenBucket):
+    """
+    Ведро с подстройкой скорости: на флуд-лимит — общая пауза и вдвое меньшая скорость,
+    на каждую успешную операцию — плавный рост (примерно step в секунду) до max_rate.
+    """
+
+    def __init__(self, max_rate: float, min_rate: float = 1.0, step: float = 0.5):
+        super().__init__(max_rate, capacity=1)
+        self.max_rate = max_rate
+        self.min_rate = min_rate
+        self.step = step
+        self._paused_until = 0.0
+
+    async def acquire(self):
+        delay = self._paused_until - time.monotonic()
+        while delay > 0:
+            await asyncio.sleep(delay)
+            delay = self._paused_until - time.monotonic()
+        await super().acquire()
+
+    def backoff(self, retry_after: float):
+        self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+        self.rate = max(self.min_rate, self.rate / 2)
+
+    def success(self):
+        if self.rate < self.max_rate:
+            self.rate = min(self.max_rate, self.rate + self.step / self.rate)
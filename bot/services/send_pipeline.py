@@ -0,0 +1,109 @@
+import asyncio
+import logging
+import time
+import typing
+
+from aiogram.exceptions import TelegramRetryAfter
+
+from bot import config
+from bot.services.rate_limiter import TokenBucket, AdaptiveRate
+
+# Лимиты Telegram: ~30 сообщений в секунду на бота, ~1 в секунду в один чат
+PER_CHAT_RATE = 1
+PER_CHAT_BURST = 3
+MAX_CHAT_BUCKETS = 10_000
+
+Job = typing.Tuple[int, typing.Callable[[], typing.Awaitable[typing.Any]]]
+
+
+class SendPipeline:
+    """
+    Общая очередь вызовов Bot API для массовых рассылок и правок.
+    Ограничивает параллельность, общую частоту и частоту на один чат,
+    а на TelegramRetryAfter приостанавливает все отправки на указанное время.
+    Фоновые рассылки (bulk=True) идут отдельной полосой: не быстрее bulk_rate с адаптивным снижением
+    на флуд-лимит, не занимают больше bulk_concurrency мест и пропускают вперёд ждущие вызовы раундов.
+    """
+
+    def __init__(self, rate: float, concurrency: int, retries: int = 3, bulk_rate: float = None, bulk_concurrency: int = None):
+        self.retries = retries
+        self._bucket = TokenBucket(rate)
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._chat_buckets: typing.Dict[int, TokenBucket] = {}
+        self._paused_until = 0.0
+        self.bulk_rate = AdaptiveRate(bulk_rate if bulk_rate is not None else rate * 0.7)
+        self._bulk_semaphore = asyncio.Semaphore(bulk_concurrency or max(1, concurrency // 2))
+        self._urgent = 0  # вызовы не-bulk, которые ждут или выполняются
+        self._urgent_idle = asyncio.Event()
+        self._urgent_idle.set()
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self._chat_buckets) >= MAX_CHAT_BUCKETS:
+                # Полные вёдра ничего не ограничивают — их можно забыть
+                self._chat_buckets = {k: b for k, b in self._chat_buckets.items() if not b.is_full}
+            bucket = self._chat_buckets[chat_id] = TokenBucket(PER_CHAT_RATE, PER_CHAT_BURST)
+        return bucket
+
+    async def _wait_pause(self):
+        delay = self._paused_until - time.monotonic()
+        while delay > 0:
+            await asyncio.sleep(delay)
+            delay = self._paused_until - time.monotonic()
+
+    async def call(self, chat_id: int, factory: typing.Callable[[], typing.Awaitable[typing.Any]], bulk: bool = False):
+        """
+        Выполнить один вызов API с учётом лимитов. factory создаёт корутину заново на каждую попытку.
+        bulk=True — фоновая рассылка: уступает место анонсам и правкам раундов.
+        """
+        if bulk:
+            async with self._bulk_semaphore:
+                return await self._call(chat_id, factory, bulk=True)
+        self._urgent += 1
+        self._urgent_idle.clear()
+        try:
+            return await self._call(chat_id, factory, bulk=False)
+        finally:
+            self._urgent -= 1
+            if not self._urgent:
+                self._urgent_idle.set()
+
+    async def _call(self, chat_id: int, factory, bulk: bool):
+        for attempt in range(self.retries + 1):
+            if bulk:
+                await self.bulk_rate.acquire()
+                await self._urgent_idle.wait()
+            async with self._semaphore:
+                await self._wait_pause()
+                await self._bucket.acquire()
+                await self._chat_bucket(chat_id).acquire()
+                try:
+                    result = await factory()
+                except TelegramRetryAfter as e:
+                    logging.warning("Target [ID:%s]: Flood limit is exceeded. Sleep %s seconds.", chat_id, e.retry_after)
+                    self._paused_until = max(self._paused_until, time.monotonic() + e.retry_after)
+                    if bulk:
+                        self.bulk_rate.backoff(e.retry_after)
+                    if attempt == self.retries:
+                        raise
+                    continue
+            if bulk:
+                self.bulk_rate.success()
+            return result
+
+    async def run(self, jobs: typing.Iterable[Job]) -> typing.List[typing.Any]:
+        """Выполнить вызовы параллельно. Результаты в порядке jobs; на месте неудачных — исключение."""
+        async def one(chat_id, factory):
+            try:
+                return await self.call(chat_id, factory)
+            except Exception as e:
+                return e
+
+        return list(await asyncio.gather(*(one(chat_id, factory) for chat_id, factory in jobs)))
+
+
+pipeline = SendPipeline(
+    rate=config.SEND_RATE, concurrency=config.SEND_CONCURRENCY,
+    bulk_rate=config.BROADCAST_RATE, bulk_concurrency=config.BROADCAST_WORKERS,
+)
@@ -1,14 +1,20 @@
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.types import Message, InlineKeyboardMarkup, ReplyKeyboardMarkup
+import functools
+import logging
 import typing
 
 
-class CopySender:
-    def __init__(self, message):
-        self.message = message
+class PreparedMessage:
+    """
+    Сообщение для рассылки, разобранное один раз: метод Bot API и его аргументы готовы заранее,
+    на каждого получателя остаётся один вызов. По умолчанию используется copy_message —
+    медиа не пересылаются заново, подпись и разметка сохраняются как есть.
+    """
 
-    async def send_copy(
+    def __init__(
             self,
-            chat_id: typing.Union[str, int],
+            message: Message,
             message_thread_id: typing.Optional[int] = None,
             disable_notification: typing.Optional[bool] = None,
             protect_content: typing.Optional[bool] = None,
@@ -18,101 +24,151 @@ class CopySender:
             reply_markup: typing.Union[
                 InlineKeyboardMarkup, ReplyKeyboardMarkup, None
             ] = None,
-    ) -> Message:
-
-        kwargs = {
-            "chat_id": chat_id,
+            use_copy: bool = True,
+    ):
+        self.message = message
+        self.kwargs = {
             "message_thread_id": message_thread_id,
             "allow_sending_without_reply": allow_sending_without_reply,
-            "reply_markup": reply_markup or self.message.reply_markup,
-            "parse_mode": "HTML",
+            "reply_markup": reply_markup or message.reply_markup,
             "disable_notification": disable_notification,
             "protect_content": protect_content,
             "reply_to_message_id": reply_to_message_id,
         }
-        text = self.message.html_text if (self.message.text or self.message.caption) else None
+        self.disable_web_page_preview = disable_web_page_preview
+        # copy_message не умеет отключать превью ссылок — тогда отправляем текст явно
+        if use_copy and not (message.text and disable_web_page_preview is not None):
+            self._call = self._prepare_copy()
+        else:
+            self._call = self._prepare_send()
+
+    def _prepare_copy(self) -> typing.Callable[..., typing.Awaitable[typing.Any]]:
+        return functools.partial(
+            self.message.bot.copy_message,
+            from_chat_id=self.message.chat.id,
+            message_id=self.message.message_id,
+            **self.kwargs,
+        )
 
-        if self.message.text:
-            kwargs["disable_web_page_preview"] = disable_web_page_preview
-            return await self.message.bot.send_message(text=text, **kwargs)
-        elif self.message.audio:
-            return await self.message.bot.send_audio(
-                audio=self.message.audio.file_id,
+    def _prepare_send(self) -> typing.Callable[..., typing.Awaitable[typing.Any]]:
+        message = self.message
+        bot = message.bot
+        kwargs = dict(self.kwargs, parse_mode="HTML")
+        text = message.html_text if (message.text or message.caption) else None
+
+        if message.text:
+            return functools.partial(
+                bot.send_message, text=text, disable_web_page_preview=self.disable_web_page_preview, **kwargs
+            )
+        elif message.audio:
+            return functools.partial(
+                bot.send_audio,
+                audio=message.audio.file_id,
                 caption=text,
-                title=self.message.audio.title,
-                performer=self.message.audio.performer,
-                duration=self.message.audio.duration,
+                title=message.audio.title,
+                performer=message.audio.performer,
+                duration=message.audio.duration,
                 **kwargs,
             )
-        elif self.message.animation:
-            return await self.message.bot.send_animation(
-                animation=self.message.animation.file_id, caption=text, **kwargs
-            )
-        elif self.message.document:
-            return await self.message.bot.send_document(
-                document=self.message.document.file_id, caption=text, **kwargs
-            )
-        elif self.message.photo:
-            return await self.message.bot.send_photo(
-                photo=self.message.photo[-1].file_id, caption=text, **kwargs
-            )
-        elif self.message.sticker:
+        elif message.animation:
+            return functools.partial(bot.send_animation, animation=message.animation.file_id, caption=text, **kwargs)
+        elif message.document:
+            return functools.partial(bot.send_document, document=message.document.file_id, caption=text, **kwargs)
+        elif message.photo:
+            return functools.partial(bot.send_photo, photo=message.photo[-1].file_id, caption=text, **kwargs)
+        elif message.sticker:
             kwargs.pop("parse_mode")
-            return await self.message.bot.send_sticker(sticker=self.message.sticker.file_id, **kwargs)
-        elif self.message.video:
-            return await self.message.bot.send_video(
-                video=self.message.video.file_id, caption=text, **kwargs
-            )
-        elif self.message.video_note:
+            return functools.partial(bot.send_sticker, sticker=message.sticker.file_id, **kwargs)
+        elif message.video:
+            return functools.partial(bot.send_video, video=message.video.file_id, caption=text, **kwargs)
+        elif message.video_note:
             kwargs.pop("parse_mode")
-            return await self.message.bot.send_video_note(
-                video_note=self.message.video_note.file_id, **kwargs
-            )
-        elif self.message.voice:
-            return await self.message.bot.send_voice(
-                voice=self.message.voice.file_id, caption=text, **kwargs
-            )
-        elif self.message.contact:
+            return functools.partial(bot.send_video_note, video_note=message.video_note.file_id, **kwargs)
+        elif message.voice:
+            return functools.partial(bot.send_voice, voice=message.voice.file_id, caption=text, **kwargs)
+        elif message.contact:
             kwargs.pop("parse_mode")
-            return await self.message.bot.send_contact(
-                phone_number=self.message.contact.phone_number,
-                first_name=self.message.contact.first_name,
-                last_name=self.message.contact.last_name,
-                vcard=self.message.contact.vcard,
+            return functools.partial(
+                bot.send_contact,
+                phone_number=message.contact.phone_number,
+                first_name=message.contact.first_name,
+                last_name=message.contact.last_name,
+                vcard=message.contact.vcard,
                 **kwargs,
             )
-        elif self.message.venue:
+        elif message.venue:
             kwargs.pop("parse_mode")
-            return await self.message.bot.send_venue(
-                latitude=self.message.venue.location.latitude,
-                longitude=self.message.venue.location.longitude,
-                title=self.message.venue.title,
-                address=self.message.venue.address,
-                foursquare_id=self.message.venue.foursquare_id,
-                foursquare_type=self.message.venue.foursquare_type,
+            return functools.partial(
+                bot.send_venue,
+                latitude=message.venue.location.latitude,
+                longitude=message.venue.location.longitude,
+                title=message.venue.title,
+                address=message.venue.address,
+                foursquare_id=message.venue.foursquare_id,
+                foursquare_type=message.venue.foursquare_type,
                 **kwargs,
             )
-        elif self.message.location:
+        elif message.location:
             kwargs.pop("parse_mode")
-            return await self.message.bot.send_location(
-                latitude=self.message.location.latitude,
-                longitude=self.message.location.longitude,
+            return functools.partial(
+                bot.send_location,
+                latitude=message.location.latitude,
+                longitude=message.location.longitude,
                 **kwargs,
             )
-        elif self.message.poll:
+        elif message.poll:
             kwargs.pop("parse_mode")
-            return await self.message.bot.send_poll(
-                question=self.message.poll.question,
-                options=[option.text for option in self.message.poll.options],
-                is_anonymous=self.message.poll.is_anonymous,
-                allows_multiple_answers=self.message.poll.allows_multiple_answers,
+            return functools.partial(
+                bot.send_poll,
+                question=message.poll.question,
+                options=[option.text for option in message.poll.options],
+                is_anonymous=message.poll.is_anonymous,
+                allows_multiple_answers=message.poll.allows_multiple_answers,
                 **kwargs,
             )
-        elif self.message.dice:
+        elif message.dice:
             kwargs.pop("parse_mode")
-            return await self.message.bot.send_dice(
-                emoji=self.message.dice.emoji,
-                **kwargs,
-            )
+            return functools.partial(bot.send_dice, emoji=message.dice.emoji, **kwargs)
         else:
             raise TypeError("This type of message can't be copied.")
+
+    async def send(self, chat_id: typing.Union[str, int]):
+        try:
+            return await self._call(chat_id=chat_id)
+        except TelegramBadRequest as e:
+            if "message to copy not found" not in str(e).lower():
+                raise
+            # Исходное сообщение удалено — дальше отправляем по file_id
+            logging.warning("PreparedMessage: source message is gone, falling back to send_*")
+            self._call = self._prepare_send()
+            return await self._call(chat_id=chat_id)
+
+
+class CopySender:
+    def __init__(self, message):
+        self.message = message
+
+    async def send_copy(
+            self,
+            chat_id: typing.Union[str, int],
+            message_thread_id: typing.Optional[int] = None,
+            disable_notification: typing.Optional[bool] = None,
+            protect_content: typing.Optional[bool] = None,
+            disable_web_page_preview: typing.Optional[bool] = None,
+            reply_to_message_id: typing.Optional[int] = None,
+            allow_sending_without_reply: typing.Optional[bool] = None,
+            reply_markup: typing.Union[
+                InlineKeyboardMarkup, ReplyKeyboardMarkup, None
+            ] = None,
+    ) -> Message:
+        return await PreparedMessage(
+            self.message,
+            message_thread_id=message_thread_id,
+            disable_notification=disable_notification,
+            protect_content=protect_content,
+            disable_web_page_preview=disable_web_page_preview,
+            reply_to_message_id=reply_to_message_id,
+            allow_sending_without_reply=allow_sending_without_reply,
+            reply_markup=reply_markup,
+            use_copy=False,
+        ).send(chat_id)
@@ -0,0 +1,456 @@
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+import typing
+import uuid
+from abc import ABCMeta, abstractmethod
+
+from aiogram.fsm.storage.base import BaseStorage
+from aiogram.fsm.storage.memory import MemoryStorage
+
+# view: 'list' | ('writing', about_user_id, about_name) | 'done'
+View = typing.Union[str, typing.Tuple[str, int, str]]
+Target = typing.Tuple[int, int]  # (chat_id, message_id)
+
+ROUND_KEYS_TTL = 24 * 60 * 60
+BUCKET_SWEEP_SEC = 60  # как часто память чистит полностью восстановившиеся вёдра
+EVENT_STATE_CHANNEL = "event_state"
+OPINION_CHANNEL = "opinion_claimed"
+LISTEN_RETRY_MIN_SEC = 1.0  # пауза перед переподпиской после обрыва, удваивается до LISTEN_RETRY_MAX_SEC
+LISTEN_RETRY_MAX_SEC = 30.0
+
+
+def _encode_view(view: View) -> str:
+    return json.dumps(view, ensure_ascii=False)
+
+
+def _decode_view(raw) -> View:
+    view = json.loads(raw)
+    return tuple(view) if isinstance(view, list) else view
+
+
+def _decode_target(raw) -> Target:
+    chat_id, message_id = (raw.decode() if isinstance(raw, bytes) else raw).split(":")
+    return int(chat_id), int(message_id)
+
+
+class StateBackend(metaclass=ABCMeta):
+    """
+    Общее состояние бота: FSM, экраны участников в раунде, сообщения раунда и владение таймерами.
+    Память — для одного процесса, Redis — для нескольких воркеров на одно мероприятие.
+    """
+
+    def __init__(self):
+        self.owner = "{}:{}:{}".format(socket.gethostname(), os.getpid(), uuid.uuid4().hex[:6])
+        self._on_event_changed: typing.List[typing.Callable[[], None]] = []
+        self._on_opinion_claimed: typing.List[typing.Callable[[int, int, int, int], None]] = []
+        self._on_resubscribed: typing.List[typing.Callable[[], None]] = []
+
+    @abstractmethod
+    def fsm_storage(self) -> BaseStorage:
+        pass
+
+    @abstractmethod
+    async def get_round_views(self, event_id: int, round_number: int) -> typing.Dict[int, View]:
+        pass
+
+    @abstractmethod
+    async def get_round_view(self, event_id: int, round_number: int, user_id: int) -> View:
+        pass
+
+    @abstractmethod
+    async def set_round_views(self, event_id: int, round_number: int, views: typing.Dict[int, View]):
+        pass
+
+    @abstractmethod
+    async def get_round_targets(self, event_id: int, round_number: int) -> typing.Dict[int, Target]:
+        pass
+
+    @abstractmethod
+    async def get_round_target(self, event_id: int, round_number: int, user_id: int) -> typing.Optional[Target]:
+        pass
+
+    @abstractmethod
+    async def add_round_targets(self, event_id: int, round_number: int, targets: typing.Dict[int, Target]):
+        pass
+
+    @abstractmethod
+    async def claim_opinion(self, event_id: int, round_number: int, from_user_id: int, about_user_id: int) -> bool:
+        """Отметить мнение как принятое. False — его уже принял этот или другой процесс."""
+
+    @abstractmethod
+    async def clear_round(self, event_id: int, round_number: int):
+        """Забыть экраны, сообщения и принятые мнения раунда."""
+
+    @abstractmethod
+    async def acquire_lock(self, name: str, ttl: float) -> bool:
+        """Захватить или продлить владение (например, таймером раунда). False — владеет другой процесс."""
+
+    @abstractmethod
+    async def extend_lock(self, name: str, ttl: float) -> bool:
+        """Продлить владение, только если оно всё ещё наше. False — владение снято или перехвачено."""
+
+    @abstractmethod
+    async def release_lock(self, name: str, force: bool = False):
+        """Отпустить владение; force=True — снять чужое (отмена таймера из другого процесса)."""
+
+    @abstractmethod
+    async def take_token(self, name: str, rate: float, burst: int) -> bool:
+        """
+        Взять токен из ведра name: ёмкость burst, пополнение rate токенов в секунду.
+        False — ведро пусто. Полностью восстановившееся ведро не хранится.
+        """
+
+    def on_event_changed(self, callback: typing.Callable[[], None]):
+        """Подписка на изменения мероприятия/раунда, сделанные другими процессами."""
+        self._on_event_changed.append(callback)
+
+    async def notify_event_changed(self):
+        pass
+
+    def on_opinion_claimed(self, callback: typing.Callable[[int, int, int, int], None]):
+        """
+        Подписка на мнения, принятые другими процессами:
+        callback(event_id, round_number, from_user_id, about_user_id) — например, opinion_matrix.add.
+        """
+        self._on_opinion_claimed.append(callback)
+
+    def on_resubscribed(self, callback: typing.Callable[[], None]):
+        """
+        Вызывается после переподписки на каналы: уведомления за время обрыва потеряны,
+        локальные кэши нужно сбросить (например, opinion_matrix.invalidate).
+        """
+        self._on_resubscribed.append(callback)
+
+    async def start(self):
+        pass
+
+    async def close(self):
+        pass
+
+
+class MemoryStateBackend(StateBackend):
+    def __init__(self):
+        super().__init__()
+        self._views: typing.Dict[typing.Tuple[int, int], typing.Dict[int, View]] = {}
+        self._targets: typing.Dict[typing.Tuple[int, int], typing.Dict[int, Target]] = {}
+        self._opinions: typing.Dict[typing.Tuple[int, int], typing.Set[typing.Tuple[int, int]]] = {}
+        self._locks: typing.Dict[str, typing.Tuple[str, float]] = {}
+        self._buckets: typing.Dict[str, typing.Tuple[float, float, float]] = {}  # name -> (токены, когда, когда полное)
+        self._buckets_swept = time.monotonic()
+
+    def fsm_storage(self) -> BaseStorage:
+        return MemoryStorage()
+
+    async def get_round_views(self, event_id, round_number):
+        return dict(self._views.get((event_id, round_number), {}))
+
+    async def get_round_view(self, event_id, round_number, user_id):
+        return self._views.get((event_id, round_number), {}).get(user_id, "list")
+
+    async def set_round_views(self, event_id, round_number, views):
+        self._views.setdefault((event_id, round_number), {}).update(views)
+
+    async def get_round_targets(self, event_id, round_number):
+        return dict(self._targets.get((event_id, round_number), {}))
+
+    async def get_round_target(self, event_id, round_number, user_id):
+        return self._targets.get((event_id, round_number), {}).get(user_id)
+
+    async def add_round_targets(self, event_id, round_number, targets):
+        self._targets.setdefault((event_id, round_number), {}).update(targets)
+
+    async def claim_opinion(self, event_id, round_number, from_user_id, about_user_id):
+        claimed = self._opinions.setdefault((event_id, round_number), set())
+        if (from_user_id, about_user_id) in claimed:
+            return False
+        claimed.add((from_user_id, about_user_id))
+        return True
+
+    async def clear_round(self, event_id, round_number):
+        self._views.pop((event_id, round_number), None)
+        self._targets.pop((event_id, round_number), None)
+        self._opinions.pop((event_id, round_number), None)
+
+    async def acquire_lock(self, name, ttl):
+        now = time.monotonic()
+        holder = self._locks.get(name)
+        if holder and holder[0] != self.owner and holder[1] > now:
+            return False
+        self._locks[name] = (self.owner, now + ttl)
+        return True
+
+    async def extend_lock(self, name, ttl):
+        holder = self._locks.get(name)
+        if not holder or holder[0] != self.owner:
+            return False
+        self._locks[name] = (self.owner, time.monotonic() + ttl)
+        return True
+
+    async def release_lock(self, name, force=False):
+        holder = self._locks.get(name)
+        if holder and (force or holder[0] == self.owner):
+            del self._locks[name]
+
+    async def take_token(self, name, rate, burst):
+        now = time.monotonic()
+        if now - self._buckets_swept >= BUCKET_SWEEP_SEC:
+            self._buckets_swept = now
+            self._buckets = {k: b for k, b in self._buckets.items() if b[2] > now}
+        bucket = self._buckets.get(name)
+        tokens = burst if bucket is None else min(burst, bucket[0] + (now - bucket[1]) * rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self._buckets[name] = (tokens, now, now + (burst - tokens) / rate)
+        return allowed
+
+
+# Захват или продление: ключ свободен или уже наш
+_ACQUIRE_LUA = """
+local cur = redis.call('GET', KEYS[1])
+if cur == false or cur == ARGV[1] then
+    redis.call('SET', KEYS[1], ARGV[1], 'PX', ARGV[2])
+    return 1
+end
+return 0
+"""
+
+_EXTEND_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+_RELEASE_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# Ведро токенов: KEYS[1] — hash {t, ts}; ARGV — rate (токенов/с), burst, now (мс).
+# Ключ живёт, пока ведро не наполнится, — память только под активных пользователей.
+_TAKE_TOKEN_LUA = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local b = redis.call('HMGET', KEYS[1], 't', 'ts')
+local tokens = tonumber(b[1])
+local ts = tonumber(b[2])
+if tokens == nil or ts == nil then
+    tokens = burst
+    ts = now
+end
+now = math.max(now, ts)
+tokens = math.min(burst, tokens + (now - ts) * rate / 1000)
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 't', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.max(1, math.ceil((burst - tokens) * 1000 / rate)))
+return allowed
+"""
+
+
+async def _aclose(client):
+    # redis>=5 — aclose(), в 4.x — close()
+    await (getattr(client, "aclose", None) or client.close)()
+
+
+class RedisStateBackend(StateBackend):
+    """Состояние в Redis (или совместимом сервере): общие для всех воркеров FSM, экраны, таймеры."""
+
+    def __init__(self, redis, prefix: str = "event_bot"):
+        super().__init__()
+        self.redis = redis
+        self.prefix = prefix
+        self._acquire = redis.register_script(_ACQUIRE_LUA)
+        self._extend = redis.register_script(_EXTEND_LUA)
+        self._release = redis.register_script(_RELEASE_LUA)
+        self._take_token = redis.register_script(_TAKE_TOKEN_LUA)
+        self._listener: typing.Optional[asyncio.Task] = None
+        self._pubsub = None
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs) -> "RedisStateBackend":
+        from redis.asyncio import Redis
+        return cls(Redis.from_url(url), **kwargs)
+
+    def _key(self, *parts) -> str:
+        return ":".join(str(p) for p in (self.prefix,) + parts)
+
+    def fsm_storage(self) -> BaseStorage:
+        from aiogram.fsm.storage.redis import RedisStorage, DefaultKeyBuilder
+        return RedisStorage(self.redis, key_builder=DefaultKeyBuilder(prefix=self._key("fsm")))
+
+    async def get_round_views(self, event_id, round_number):
+        raw = await self.redis.hgetall(self._key("round_view", event_id, round_number))
+        return {int(uid): _decode_view(v) for uid, v in raw.items()}
+
+    async def get_round_view(self, event_id, round_number, user_id):
+        raw = await self.redis.hget(self._key("round_view", event_id, round_number), user_id)
+        return _decode_view(raw) if raw is not None else "list"
+
+    async def set_round_views(self, event_id, round_number, views):
+        if not views:
+            return
+        key = self._key("round_view", event_id, round_number)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.hset(key, mapping={uid: _encode_view(v) for uid, v in views.items()})
+            pipe.expire(key, ROUND_KEYS_TTL)
+            await pipe.execute()
+
+    async def get_round_targets(self, event_id, round_number):
+        raw = await self.redis.hgetall(self._key("round_targets", event_id, round_number))
+        return {int(uid): _decode_target(v) for uid, v in raw.items()}
+
+    async def get_round_target(self, event_id, round_number, user_id):
+        raw = await self.redis.hget(self._key("round_targets", event_id, round_number), user_id)
+        return None if raw is None else _decode_target(raw)
+
+    async def add_round_targets(self, event_id, round_number, targets):
+        if not targets:
+            return
+        key = self._key("round_targets", event_id, round_number)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.hset(key, mapping={uid: "{}:{}".format(*t) for uid, t in targets.items()})
+            pipe.expire(key, ROUND_KEYS_TTL)
+            await pipe.execute()
+
+    async def claim_opinion(self, event_id, round_number, from_user_id, about_user_id):
+        key = self._key("round_opinions", event_id, round_number)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.sadd(key, "{}:{}".format(from_user_id, about_user_id))
+            pipe.expire(key, ROUND_KEYS_TTL)
+            added, _ = await pipe.execute()
+        if added:
+            # Матрицы мнений других процессов — иначе их клавиатуры показывают уже оценённых участников
+            await self.redis.publish(
+                self._key(OPINION_CHANNEL),
+                ":".join(str(v) for v in (self.owner, event_id, round_number, from_user_id, about_user_id)),
+            )
+        return bool(added)
+
+    async def clear_round(self, event_id, round_number):
+        await self.redis.delete(
+            self._key("round_view", event_id, round_number),
+            self._key("round_targets", event_id, round_number),
+            self._key("round_opinions", event_id, round_number),
+        )
+
+    async def acquire_lock(self, name, ttl):
+        return bool(await self._acquire(keys=[self._key("lock", name)], args=[self.owner, int(ttl * 1000)]))
+
+    async def extend_lock(self, name, ttl):
+        return bool(await self._extend(keys=[self._key("lock", name)], args=[self.owner, int(ttl * 1000)]))
+
+    async def release_lock(self, name, force=False):
+        if force:
+            await self.redis.delete(self._key("lock", name))
+        else:
+            await self._release(keys=[self._key("lock", name)], args=[self.owner])
+
+    async def take_token(self, name, rate, burst):
+        return bool(await self._take_token(
+            keys=[self._key("bucket", name)], args=[rate, burst, int(time.time() * 1000)],
+        ))
+
+    async def notify_event_changed(self):
+        await self.redis.publish(self._key(EVENT_STATE_CHANNEL), self.owner)
+
+    @staticmethod
+    def _dispatch(callbacks, *args):
+        # Ошибка одного подписчика не должна останавливать слушателя и остальных подписчиков
+        for callback in callbacks:
+            try:
+                callback(*args)
+            except Exception:
+                logging.exception("State backend: pub/sub callback %r failed", callback)
+
+    def _handle(self, message):
+        channel, data = (v.decode() if isinstance(v, bytes) else v for v in (message["channel"], message["data"]))
+        if channel == self._key(OPINION_CHANNEL):
+            sender, *values = data.rsplit(":", 4)
+            if sender != self.owner:
+                self._dispatch(self._on_opinion_claimed, *map(int, values))
+        elif data != self.owner:
+            self._dispatch(self._on_event_changed)
+
+    async def _listen(self, pubsub):
+        async for message in pubsub.listen():
+            if message.get("type") != "message":
+                continue
+            try:
+                self._handle(message)
+            except Exception:
+                logging.exception("State backend: bad pub/sub message %r", message)
+
+    async def _subscribe(self):
+        self._pubsub = self.redis.pubsub()
+        await self._pubsub.subscribe(self._key(EVENT_STATE_CHANNEL), self._key(OPINION_CHANNEL))
+
+    async def _drop_pubsub(self):
+        pubsub, self._pubsub = self._pubsub, None
+        if pubsub is not None:
+            try:
+                await _aclose(pubsub)
+            except Exception:
+                pass
+
+    async def _run_listener(self):
+        """Слушать каналы; при обрыве соединения переподписываться с нарастающей паузой."""
+        delay = LISTEN_RETRY_MIN_SEC
+        while True:
+            try:
+                if self._pubsub is None:
+                    await self._subscribe()
+                    logging.warning("State backend: pub/sub resubscribed")
+                    # Пока соединения не было, уведомления терялись — перечитываем состояние
+                    self._dispatch(self._on_event_changed)
+                    self._dispatch(self._on_resubscribed)
+                delay = LISTEN_RETRY_MIN_SEC
+                await self._listen(self._pubsub)
+                logging.warning("State backend: pub/sub stream ended")
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logging.exception("State backend: pub/sub listener failed, retry in %.0f s", delay)
+            await self._drop_pubsub()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, LISTEN_RETRY_MAX_SEC)
+
+    async def start(self):
+        await self._subscribe()
+        self._listener = asyncio.create_task(self._run_listener())
+
+    async def close(self):
+        if self._listener and not self._listener.done():
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+        self._listener = None
+        if self._pubsub is not None:
+            await self._pubsub.unsubscribe()
+            await _aclose(self._pubsub)
+            self._pubsub = None
+        await _aclose(self.redis)
+
+
+backend: StateBackend = MemoryStateBackend()
+
+
+def setup(redis_url: typing.Optional[str] = None) -> StateBackend:
+    """Выбрать хранилище состояния: Redis, если задан REDIS_URL, иначе память процесса."""
+    global backend
+    if redis_url:
+        backend = RedisStateBackend.from_url(redis_url)
+        logging.info("State backend: redis (owner %s)", backend.owner)
+    else:
+        backend = MemoryStateBackend()
+    return backend
@@ -0,0 +1,111 @@
+import asyncio
+import logging
+import typing
+
+from aiogram import types
+from sqlalchemy import select
+
+from bot.models.sql import User
+from database.manager import insert_or_update, unique_constraints
+
+UserData = typing.Tuple[typing.Optional[str], typing.Optional[str], typing.Optional[str]]  # (username, first_name, last_name)
+
+FLUSH_INTERVAL = 5
+UPDATE_COLUMNS = ("username", "first_name", "last_name")
+UNIQUE_CONSTRAINT = "uq_user_id"
+
+
+class UserTracker:
+    """
+    Аудитория рассылок: каждый увиденный from_user попадает в таблицу user.
+    seen() только сравнивает с уже записанным и кладёт изменения в буфер (последние данные пользователя),
+    фоновая задача раз в FLUSH_INTERVAL пишет буфер одним INSERT ... ON CONFLICT (id) DO UPDATE.
+    Пользователи без изменений в буфер не попадают, поэтому апдейты не добавляют записей в БД.
+    """
+
+    def __init__(self, flush_interval: float = FLUSH_INTERVAL):
+        self.flush_interval = flush_interval
+        self.flushed = 0
+        self._known: typing.Dict[int, UserData] = {}  # что уже записано в БД
+        self._pending: typing.Dict[int, UserData] = {}
+        self._session_factory = None
+        self._lock = asyncio.Lock()
+        self._task: typing.Optional[asyncio.Task] = None
+
+    def seen(self, user: types.User):
+        if user.is_bot:
+            return
+        data = (user.username, user.first_name, user.last_name)
+        if self._known.get(user.id) != data:
+            self._pending[user.id] = data
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    async def load(self):
+        """Запомнить пользователей, уже записанных в БД, — чтобы после рестарта не переписывать их заново."""
+        async with self._session_factory() as s:
+            r = await s.execute(select(User.id, User.username, User.first_name, User.last_name))
+            self._known = {user_id: tuple(data) for user_id, *data in r.all() if user_id is not None}
+
+    async def flush(self) -> int:
+        """Записать буфер сейчас. Возвращает число пользователей в записанной пачке."""
+        async with self._lock:
+            if not self._pending or self._session_factory is None:
+                return 0
+            batch, self._pending = self._pending, {}
+            rows = [
+                dict(id=user_id, username=username, first_name=first_name, last_name=last_name)
+                for user_id, (username, first_name, last_name) in batch.items()
+            ]
+            try:
+                async with self._session_factory() as s:
+                    await s.execute(insert_or_update(self._session_factory, User, ("id",), UPDATE_COLUMNS), rows)
+                    await s.commit()
+            except BaseException as e:
+                # Более свежие данные из буфера важнее тех, что не удалось записать
+                batch.update(self._pending)
+                self._pending = batch
+                if not isinstance(e, Exception):
+                    raise
+                logging.error("user_tracker: flush of %s users failed: %s", len(batch), e)
+                return 0
+            self._known.update(batch)
+            self.flushed += len(batch)
+            return len(batch)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def check_schema(self, session_factory):
+        """Без uq_user_id ON CONFLICT (id) не работает и каждый сброс падает — не стартуем, пока не применена миграция."""
+        if UNIQUE_CONSTRAINT not in await unique_constraints(session_factory, User.__tablename__):
+            raise RuntimeError(
+                "user_tracker: constraint {} is missing, run python -m scripts.run_migrate".format(UNIQUE_CONSTRAINT)
+            )
+
+    async def start(self, session_factory):
+        self._session_factory = session_factory
+        try:
+            await self.load()
+        except Exception as e:
+            logging.warning("user_tracker: could not load known users: %s", e)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Остановить фоновую запись и дописать буфер."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+tracker = UserTracker()
@@ -0,0 +1,119 @@
+import asyncio
+import logging
+import typing
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from aiohttp import web
+
+from bot import config
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+STOP_TIMEOUT = 10
+
+
+class UpdateQueue:
+    """
+    Приём вебхуков: апдейт кладётся в ограниченную очередь, Telegram сразу получает 200,
+    а обработку ведут workers параллельных обработчиков. Переполненная очередь отвечает 503 —
+    Telegram повторит доставку позже. dropped — сколько апдейтов отклонено или брошено при остановке.
+    """
+
+    def __init__(self, dp: Dispatcher, bot: Bot, maxsize: int, workers: int, secret: typing.Optional[str] = None):
+        self.dp = dp
+        self.bot = bot
+        self.secret = secret
+        self.workers = workers
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self._tasks: typing.List[asyncio.Task] = []
+        self.dropped = 0
+
+    async def handle(self, request: web.Request) -> web.Response:
+        if self.secret and request.headers.get(SECRET_HEADER) != self.secret:
+            return web.Response(status=401)
+        try:
+            data = self.bot.session.json_loads(await request.read())
+            update = Update.model_validate(data, context={"bot": self.bot})
+        except Exception as e:
+            logging.warning("Webhook: bad update: %s", e)
+            return web.Response(status=400)
+        try:
+            self._queue.put_nowait(update)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logging.warning("Webhook: queue is full (%s), update %s rejected", self._queue.maxsize, update.update_id)
+            return web.Response(status=503)
+        return web.Response()
+
+    async def _worker(self):
+        while True:
+            update = await self._queue.get()
+            try:
+                await self.dp.feed_update(self.bot, update)
+            except Exception as e:
+                logging.exception("Webhook: update %s failed: %s", update.update_id, e)
+            finally:
+                self._queue.task_done()
+
+    @property
+    def size(self) -> int:
+        return self._queue.qsize()
+
+    def start(self):
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        """Доработать принятые апдейты (не дольше STOP_TIMEOUT) и остановить обработчиков."""
+        try:
+            await asyncio.wait_for(self._queue.join(), STOP_TIMEOUT)
+        except asyncio.TimeoutError:
+            self.dropped += self._queue.qsize()
+            logging.warning("Webhook: %s updates dropped on shutdown", self._queue.qsize())
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+
+queue: typing.Optional[UpdateQueue] = None  # очередь запущенного вебхука — для метрик
+
+
+def check_config():
+    """До запуска: в режиме вебхука без WEBHOOK_URL Telegram некуда слать апдейты — остановиться сразу."""
+    if config.RUN_MODE == "webhook" and not config.WEBHOOK_URL:
+        raise SystemExit("RUN_MODE=webhook requires WEBHOOK_URL (public https address of the webhook)")
+
+
+async def run(dp: Dispatcher, bot: Bot):
+    """Запуск в режиме вебхука: aiohttp-сервер + очередь апдейтов."""
+    global queue
+    queue = UpdateQueue(
+        dp, bot,
+        maxsize=config.WEBHOOK_QUEUE_SIZE,
+        workers=config.WEBHOOK_WORKERS,
+        secret=config.WEBHOOK_SECRET,
+    )
+    app = web.Application()
+    app.router.add_post(config.WEBHOOK_PATH, queue.handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, config.WEBHOOK_HOST, config.WEBHOOK_PORT)
+    await site.start()
+    queue.start()
+    try:
+        await bot.set_webhook(
+            url=config.WEBHOOK_URL,
+            secret_token=config.WEBHOOK_SECRET,
+            allowed_updates=dp.resolve_used_update_types(),
+            max_connections=config.WEBHOOK_MAX_CONNECTIONS,
+            drop_pending_updates=True,
+        )
+        logging.info(
+            "Webhook: listening on %s:%s%s, workers=%s, queue=%s",
+            config.WEBHOOK_HOST, config.WEBHOOK_PORT, config.WEBHOOK_PATH,
+            config.WEBHOOK_WORKERS, config.WEBHOOK_QUEUE_SIZE,
+        )
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+        await queue.stop()
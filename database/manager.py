@@ -1,12 +1,152 @@
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy import create_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy import create_engine, event, exc, insert, inspect, or_
+from sqlalchemy.dialects import postgresql, sqlite
+import contextvars
+import logging
+import time
 import typing
 from . import base
 
+SLOW_CHECKOUT_SEC = 1.0
+
+
+class PoolMetrics:
+    """Сколько ждали соединение из пула: число выдач, суммарное и максимальное ожидание, таймауты."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.timeouts = 0
+        self.pool = None
+
+    def observe(self, wait: float):
+        self.checkouts += 1
+        self.wait_total += wait
+        self.wait_max = max(self.wait_max, wait)
+        if wait >= SLOW_CHECKOUT_SEC:
+            logging.warning("DB pool: waited %.2fs for a connection (%s)", wait, self.pool.status() if self.pool else "")
+
+    def snapshot(self) -> typing.Dict[str, typing.Any]:
+        return {
+            "checkouts": self.checkouts,
+            "wait_avg_ms": self.wait_total / self.checkouts * 1000 if self.checkouts else 0.0,
+            "wait_max_ms": self.wait_max * 1000,
+            "timeouts": self.timeouts,
+            "checked_out": self.pool.checkedout() if self.pool else 0,
+            "size": self.pool.size() if self.pool else 0,
+        }
+
+
+pool_metrics = PoolMetrics()
+
+
+class QueryCounter:
+    """
+    Число SQL-запросов в текущем контексте (например, на один апдейт):
+    with query_counter.scope() as counter: ...; counter[0] — сколько запросов выполнено.
+    """
+
+    def __init__(self):
+        self._current: contextvars.ContextVar[typing.Optional[typing.List[int]]] = contextvars.ContextVar(
+            "db_queries", default=None
+        )
+        self.total = 0
+
+    def install(self, engine):
+        event.listen(engine.sync_engine if hasattr(engine, "sync_engine") else engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args):
+        self.total += 1
+        counter = self._current.get()
+        if counter is not None:
+            counter[0] += 1
+
+    def scope(self) -> "_QueryScope":
+        return _QueryScope(self._current)
+
+
+class _QueryScope:
+    def __init__(self, var: contextvars.ContextVar):
+        self._var = var
+        self._token = None
+
+    def __enter__(self) -> typing.List[int]:
+        counter = [0]
+        self._token = self._var.set(counter)
+        return counter
+
+    def __exit__(self, *exc_info):
+        self._var.reset(self._token)
+
+
+query_counter = QueryCounter()
+
+
+class TimedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """Пул, который замеряет ожидание свободного соединения (включая открытие нового)."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            pool_metrics.timeouts += 1
+            raise
+        finally:
+            pool_metrics.observe(time.perf_counter() - started)
+
+
+def dialect_name(session_factory) -> str:
+    """Имя диалекта движка, к которому привязан session_factory ('postgresql', 'sqlite', ...); '' — без движка."""
+    bind = session_factory.kw.get("bind")
+    return bind.dialect.name if bind is not None else ""
+
+
+async def unique_constraints(session_factory, table_name: str) -> typing.Set[str]:
+    """Имена UNIQUE-ограничений таблицы в БД (а не в моделях) — проверить, что миграции применены."""
+    async with session_factory() as s:
+        conn = await s.connection()
+        return await conn.run_sync(lambda c: {uc["name"] for uc in inspect(c).get_unique_constraints(table_name)})
+
+
+def insert_ignore(session_factory, model, index_elements: typing.Sequence[str]):
+    """
+    INSERT ... ON CONFLICT (index_elements) DO NOTHING для Postgres и SQLite.
+    На других СУБД — обычный INSERT: конфликт придёт как IntegrityError.
+    """
+    dialect = dialect_name(session_factory)
+    if dialect == "postgresql":
+        return postgresql.insert(model).on_conflict_do_nothing(index_elements=list(index_elements))
+    if dialect == "sqlite":
+        return sqlite.insert(model).on_conflict_do_nothing(index_elements=list(index_elements))
+    return insert(model)
+
+
+def insert_or_update(session_factory, model, index_elements: typing.Sequence[str], update_columns: typing.Sequence[str]):
+    """
+    INSERT ... ON CONFLICT (index_elements) DO UPDATE SET update_columns для Postgres и SQLite.
+    Строка обновляется, только если значение хотя бы одной колонки изменилось (IS DISTINCT FROM).
+    На других СУБД — обычный INSERT.
+    """
+    dialect = dialect_name(session_factory)
+    if dialect not in ("postgresql", "sqlite"):
+        return insert(model)
+    stmt = (postgresql if dialect == "postgresql" else sqlite).insert(model)
+    return stmt.on_conflict_do_update(
+        index_elements=list(index_elements),
+        set_={c: stmt.excluded[c] for c in update_columns},
+        where=or_(*(getattr(model, c).is_distinct_from(stmt.excluded[c]) for c in update_columns)),
+    )
+
 
 async def create_async_session(database: base.AsyncDatabase, *, create_tables=False, **kwargs):
     engine = create_async_engine(str(database), **kwargs)
+    if isinstance(engine.pool, TimedAsyncQueuePool):
+        pool_metrics.pool = engine.pool
+    query_counter.install(engine)
     if create_tables:
         from bot.models.sql import Base
         async with engine.begin() as conn:
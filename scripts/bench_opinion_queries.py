@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""Замер горячих запросов к opinion/round на 1М мнений: без индексов, с ix_opinion_event_round_from и после миграции
+(uq_opinion вместо ix_opinion_event_round_from).
+Всё выполняется в одной транзакции, которая откатывается: база остаётся нетронутой.
+Запуск из корня проекта: python -m scripts.bench_opinion_queries [кол-во мнений]
+
+PostgreSQL 16.2, локально, 1 000 000 мнений, среднее из 200 запросов, мс:
+
+    запрос                         без индексов  +round_from  после миграции
+    get_written_opinion_targets         108.969        0.150           0.254
+    has_opinion_about                   120.161        0.147           0.212
+    get_round_opinion_matrix             90.355        1.097           1.561
+    get_opinions_about                   97.720        0.341           0.388
+    get_current_round                     0.529        0.198           0.254
+
+Повтор в обратном порядке (после миграции / +round_from / снова после миграции): get_round_opinion_matrix
+1.452 / 1.526 / 1.491 — разница в первом прогоне от порядка замеров, удаление ix_opinion_event_round_from
+запрос по матрице раунда не замедляет. В обоих вариантах план — Bitmap Heap Scan: строки вставлены в этой же
+транзакции и не прошли VACUUM, поэтому index-only scan здесь не виден.
+"""
+import asyncio
+import sys
+import time
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from bot import config
+import database.implement
+
+
+EVENTS = 200
+ROUNDS = 10
+USERS_PER_EVENT = 300
+REPEAT = 200
+
+# имя -> (создать, удалить); uq_opinion — ограничение, остальные — индексы
+INDEXES = {
+    "uq_opinion": (
+        "ALTER TABLE opinion ADD CONSTRAINT uq_opinion UNIQUE (event_id, round_number, from_user_id, about_user_id)",
+        "ALTER TABLE opinion DROP CONSTRAINT IF EXISTS uq_opinion",
+    ),
+    "ix_opinion_event_round_from": (
+        "CREATE INDEX ix_opinion_event_round_from ON opinion (event_id, round_number, from_user_id) INCLUDE (about_user_id)",
+        "DROP INDEX IF EXISTS ix_opinion_event_round_from",
+    ),
+    "ix_opinion_event_about": (
+        "CREATE INDEX ix_opinion_event_about ON opinion (event_id, about_user_id)",
+        "DROP INDEX IF EXISTS ix_opinion_event_about",
+    ),
+    "ix_round_event_open": (
+        'CREATE INDEX ix_round_event_open ON "round" (event_id, number) WHERE ended_at IS NULL',
+        "DROP INDEX IF EXISTS ix_round_event_open",
+    ),
+}
+
+# Наборы индексов для сравнения: «после миграции» — ix_opinion_event_round_from удалён, его покрывает uq_opinion
+CONFIGS = [
+    ("без индексов", ()),
+    ("+round_from", ("uq_opinion", "ix_opinion_event_round_from", "ix_opinion_event_about", "ix_round_event_open")),
+    ("после миграции", ("uq_opinion", "ix_opinion_event_about", "ix_round_event_open")),
+]
+
+QUERIES = [
+    ("get_written_opinion_targets",
+     "SELECT about_user_id FROM opinion WHERE event_id = :e AND round_number = :r AND from_user_id = :u"),
+    ("has_opinion_about",
+     "SELECT id FROM opinion WHERE event_id = :e AND round_number = :r AND from_user_id = :u AND about_user_id = :a LIMIT 1"),
+    ("get_round_opinion_matrix",
+     "SELECT from_user_id, about_user_id FROM opinion WHERE event_id = :e AND round_number = :r"),
+    ("get_opinions_about",
+     "SELECT * FROM opinion WHERE event_id = :e AND about_user_id = :a ORDER BY round_number, id"),
+    ("get_current_round",
+     'SELECT * FROM "round" WHERE event_id = :e AND ended_at IS NULL ORDER BY number DESC LIMIT 1'),
+]
+
+
+async def _fill(conn, opinions: int):
+    # asyncpg не выводит типы параметров в generate_series и арифметике — отсюда CAST
+    r = await conn.execute(text(
+        "INSERT INTO event (is_started, is_ended, total_rounds, current_round, created_at) "
+        "SELECT true, true, CAST(:rounds AS integer), CAST(:rounds AS integer), NOW() "
+        "FROM generate_series(1, CAST(:n AS integer)) RETURNING id"
+    ), {"n": EVENTS, "rounds": ROUNDS})
+    event_ids = [row[0] for row in r.all()]
+    first, last = min(event_ids), max(event_ids)
+    await conn.execute(text(
+        'INSERT INTO "round" (event_id, number, name, started_at, ended_at) '
+        "SELECT e, n, 'bench', NOW(), CASE WHEN n < CAST(:rounds AS integer) THEN NOW() END "
+        "FROM generate_series(CAST(:first AS integer), CAST(:last AS integer)) e, generate_series(1, CAST(:rounds AS integer)) n"
+    ), {"first": first, "last": last, "rounds": ROUNDS})
+    # Четвёрки (event, round, from, about) не повторяются — иначе не создать uq_opinion:
+    # по k восстанавливаются и from (k % users), и about (k / users + k) % users
+    await conn.execute(text(
+        "INSERT INTO opinion (event_id, round_number, from_user_id, about_user_id, text, created_at) "
+        "SELECT p.first + g % p.events, 1 + (g / p.events) % p.rounds, "
+        "       1 + k % p.users, 1 + (k / p.users + k) % p.users, 'bench', NOW() "
+        "FROM (SELECT CAST(:first AS integer) AS first, CAST(:events AS integer) AS events, "
+        "             CAST(:rounds AS integer) AS rounds, CAST(:users AS integer) AS users) p, "
+        "     generate_series(0, CAST(:n AS integer) - 1) g, "
+        "     LATERAL (SELECT g / (p.events * p.rounds) AS k) x"
+    ), {"first": first, "events": EVENTS, "rounds": ROUNDS, "users": USERS_PER_EVENT, "n": opinions})
+    return event_ids
+
+
+async def _measure(conn, event_ids) -> dict:
+    await conn.execute(text("ANALYZE opinion"))
+    await conn.execute(text('ANALYZE "round"'))
+    result = {}
+    for name, sql in QUERIES:
+        stmt = text(sql)
+        started = time.perf_counter()
+        for i in range(REPEAT):
+            params = {
+                "e": event_ids[i % len(event_ids)],
+                "r": 1 + i % ROUNDS,
+                "u": 1 + i % USERS_PER_EVENT,
+                "a": 1 + (i * 7) % USERS_PER_EVENT,
+            }
+            await conn.execute(stmt, params)
+        result[name] = (time.perf_counter() - started) / REPEAT * 1000
+    return result
+
+
+async def _use_indexes(conn, names):
+    for _, drop in INDEXES.values():
+        await conn.execute(text(drop))
+    for name in names:
+        await conn.execute(text(INDEXES[name][0]))
+
+
+async def _matrix_plan(conn, event_id) -> str:
+    r = await conn.execute(text("EXPLAIN " + dict(QUERIES)["get_round_opinion_matrix"]), {"e": event_id, "r": 1})
+    return r.scalars().first().split("  (")[0]
+
+
+async def main():
+    opinions = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    db = database.implement.AsyncPostgreSQL(
+        database_name=config.PSQL_DB_NAME,
+        username=config.PSQL_USERNAME,
+        password=config.PSQL_PASSWORD,
+        hostname=config.PSQL_HOSTNAME,
+        port=config.PSQL_PORT,
+    )
+    engine = create_async_engine(str(db))
+    results, plans = {}, {}
+    async with engine.connect() as conn:
+        tx = await conn.begin()
+        try:
+            await _use_indexes(conn, ())
+            print("Заполнение: {} мнений, {} мероприятий...".format(opinions, EVENTS))
+            event_ids = await _fill(conn, opinions)
+            for title, names in CONFIGS:
+                await _use_indexes(conn, names)
+                results[title] = await _measure(conn, event_ids)
+                plans[title] = await _matrix_plan(conn, event_ids[0])
+        finally:
+            await tx.rollback()
+    await engine.dispose()
+
+    titles = [title for title, _ in CONFIGS]
+    print(("{:<30}" + " {:>15}" * len(titles)).format("запрос, мс", *titles))
+    for name, _ in QUERIES:
+        print(("{:<30}" + " {:>15.3f}" * len(titles)).format(name, *(results[t][name] for t in titles)))
+    for title in titles:
+        print("get_round_opinion_matrix, {}: {}".format(title, plans[title]))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""Замер поиска участников по имени на 100k участников: ILIKE без индекса, pg_trgm (GIN) и NgramIndex в памяти.
+Postgres: всё в одной транзакции, которая откатывается, — база остаётся нетронутой.
+Без Postgres (--memory) меряется только NgramIndex против перебора подстрокой.
+Запуск из корня проекта: python -m scripts.bench_participant_search [участников] [--memory]
+"""
+import asyncio
+import random
+import sys
+import time
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from bot import config
+from bot.services.participant_search import NgramIndex
+import database.implement
+
+REPEAT = 50
+FIRST = ["Александр", "Мария", "Иван", "Анна", "Дмитрий", "Екатерина", "Сергей", "Ольга", "Никита", "Полина"]
+LAST = ["Иванов", "Смирнова", "Кузнецов", "Попова", "Васильев", "Петрова", "Соколов", "Михайлова", "Новиков", "Фёдорова"]
+QUERIES = ["Иван", "Смирн", "Кузнецов Дмитрий", "Полина Петрова", "ова", "Алексндр"]  # последний — с опечаткой
+
+ILIKE = "SELECT id FROM participant WHERE event_id = :e AND full_name ILIKE :like ORDER BY full_name LIMIT 100"
+TRGM = (
+    "SELECT id FROM participant WHERE event_id = :e AND (full_name % :q OR full_name ILIKE :like) "
+    "ORDER BY similarity(full_name, :q) DESC, full_name LIMIT 100"
+)
+
+
+class _Row:
+    def __init__(self, user_id: int, full_name: str):
+        self.user_id = user_id
+        self.full_name = full_name
+
+
+def _names(n: int):
+    rnd = random.Random(1)
+    return ["{} {} {}".format(rnd.choice(FIRST), rnd.choice(LAST), i) for i in range(n)]
+
+
+def _bench_memory(names):
+    rows = [_Row(i, name) for i, name in enumerate(names)]
+    started = time.perf_counter()
+    index = NgramIndex(rows)
+    print("NgramIndex: построение {:.0f} мс".format((time.perf_counter() - started) * 1000))
+    lowered = [name.casefold() for name in names]
+    print("{:<22} {:>14} {:>12}".format("запрос, мс", "перебор", "NgramIndex"))
+    for q in QUERIES:
+        needle = q.casefold()
+        started = time.perf_counter()
+        for _ in range(REPEAT):
+            sorted(name for name in lowered if needle in name)[:100]
+        scan = (time.perf_counter() - started) / REPEAT * 1000
+        started = time.perf_counter()
+        for _ in range(REPEAT):
+            index.search(q)
+        ngram = (time.perf_counter() - started) / REPEAT * 1000
+        print("{:<22} {:>14.3f} {:>12.3f}".format(q, scan, ngram))
+
+
+async def _measure(conn, sql: str, event_id: int) -> dict:
+    await conn.execute(text("ANALYZE participant"))
+    result = {}
+    for q in QUERIES:
+        started = time.perf_counter()
+        for _ in range(REPEAT):
+            await conn.execute(text(sql), {"e": event_id, "q": q, "like": "%{}%".format(q)})
+        result[q] = (time.perf_counter() - started) / REPEAT * 1000
+    return result
+
+
+async def _bench_postgres(names):
+    db = database.implement.AsyncPostgreSQL(
+        database_name=config.PSQL_DB_NAME,
+        username=config.PSQL_USERNAME,
+        password=config.PSQL_PASSWORD,
+        hostname=config.PSQL_HOSTNAME,
+        port=config.PSQL_PORT,
+    )
+    engine = create_async_engine(str(db))
+    async with engine.connect() as conn:
+        tx = await conn.begin()
+        try:
+            await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            await conn.execute(text("DROP INDEX IF EXISTS ix_participant_full_name_trgm"))
+            r = await conn.execute(text(
+                "INSERT INTO event (is_started, is_ended, total_rounds, current_round, created_at) "
+                "VALUES (true, false, 1, 0, NOW()) RETURNING id"
+            ))
+            event_id = r.scalar()
+            await conn.execute(
+                text("INSERT INTO participant (event_id, user_id, full_name, created_at) VALUES (:e, :u, :n, NOW())"),
+                [{"e": event_id, "u": i, "n": name} for i, name in enumerate(names)],
+            )
+            ilike = await _measure(conn, ILIKE, event_id)
+            await conn.execute(text(
+                "CREATE INDEX ix_participant_full_name_trgm ON participant USING gin (full_name gin_trgm_ops)"
+            ))
+            ilike_gin = await _measure(conn, ILIKE, event_id)
+            trgm = await _measure(conn, TRGM, event_id)
+        finally:
+            await tx.rollback()
+    await engine.dispose()
+
+    print("{:<22} {:>14} {:>12} {:>16}".format("запрос, мс", "ILIKE", "ILIKE + GIN", "similarity + GIN"))
+    for q in QUERIES:
+        print("{:<22} {:>14.3f} {:>12.3f} {:>16.3f}".format(q, ilike[q], ilike_gin[q], trgm[q]))
+
+
+async def main():
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    total = int(args[0]) if args else 100_000
+    names = _names(total)
+    print("Участников: {}".format(total))
+    _bench_memory(names)
+    if "--memory" not in sys.argv:
+        await _bench_postgres(names)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""Микробенчмарк FAST_RUNTIME: разбор апдейтов, сериализация большой клавиатуры (json / orjson)
+и переключения задач в цикле событий (asyncio / uvloop). Сеть и БД не нужны.
+Запуск из корня проекта: python -m scripts.bench_runtime [повторов]
+"""
+import asyncio
+import json
+import sys
+import time
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.methods import EditMessageText
+from aiogram.types import Update
+
+from bot.models.sql import Participant
+from bot.services import event_service, fast_runtime
+
+PARTICIPANTS = 300
+TASKS = 20000
+
+
+def _update(i: int) -> bytes:
+    user = {"id": 100000 + i, "is_bot": False, "first_name": "Участник", "language_code": "ru"}
+    return json.dumps({
+        "update_id": i,
+        "callback_query": {
+            "id": str(i), "from": user, "chat_instance": "bench", "data": "opinion_about_{}".format(i),
+            "message": {
+                "message_id": i, "date": 1700000000, "chat": {"id": user["id"], "type": "private"},
+                "from": {"id": 1, "is_bot": True, "first_name": "Bot"}, "text": "Список участников " * 10,
+            },
+        },
+    }, ensure_ascii=False).encode()
+
+
+def _timeit(fn, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat * 1e6
+
+
+def _bench_json(repeat: int):
+    participants = [Participant(user_id=i, full_name="Участник Номер {}".format(i)) for i in range(PARTICIPANTS)]
+    # Клавиатура без постраничной разбивки — худший случай
+    markup = event_service.build_participants_kb(participants, exclude_user_id=0)
+    method = EditMessageText(chat_id=1, message_id=1, text="Список участников", reply_markup=markup)
+    raw_updates = [_update(i) for i in range(100)]
+
+    sessions = [("json", AiohttpSession())]
+    if fast_runtime.orjson is not None:
+        sessions.append(("orjson", AiohttpSession(**fast_runtime.json_kwargs())))
+    print("{:<36} {}".format("мкс на операцию", " ".join("{:>10}".format(name) for name, _ in sessions)))
+    rows = {"разбор апдейта (loads + Update)": [], "запрос с клавиатурой ({} строк)".format(len(markup.inline_keyboard)): []}
+    for name, session in sessions:
+        bot = Bot("123456:bench", session=session)
+        loads = session.json_loads
+        it = iter(range(10 ** 9))
+        rows["разбор апдейта (loads + Update)"].append(_timeit(
+            lambda: Update.model_validate(loads(raw_updates[next(it) % 100]), context={"bot": bot}), repeat,
+        ))
+        rows["запрос с клавиатурой ({} строк)".format(len(markup.inline_keyboard))].append(_timeit(
+            lambda: session.build_form_data(bot, method), repeat,
+        ))
+    for title, values in rows.items():
+        print("{:<36} {}".format(title, " ".join("{:>10.1f}".format(v) for v in values)))
+    return sessions
+
+
+async def _ping_pong():
+    queue = asyncio.Queue()
+
+    async def consumer():
+        for _ in range(TASKS):
+            await queue.get()
+
+    task = asyncio.create_task(consumer())
+    started = time.perf_counter()
+    for i in range(TASKS):
+        await queue.put(i)
+        await asyncio.sleep(0)
+    await task
+    await asyncio.gather(*(asyncio.sleep(0) for _ in range(TASKS)))
+    return time.perf_counter() - started
+
+
+def _bench_loop():
+    results = [("asyncio", asyncio.run(_ping_pong()))]
+    if fast_runtime.uvloop is not None:
+        results.append(("uvloop", fast_runtime.uvloop.run(_ping_pong()) if hasattr(fast_runtime.uvloop, "run")
+                        else fast_runtime.uvloop.new_event_loop().run_until_complete(_ping_pong())))
+    for name, elapsed in results:
+        print("цикл {:<8} {} переключений + {} задач: {:.1f} мс".format(name, TASKS, TASKS, elapsed * 1000))
+
+
+async def _close(sessions):
+    for _, session in sessions:
+        await session.close()
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    sessions = _bench_json(repeat)
+    asyncio.run(_close(sessions))
+    _bench_loop()
+
+
+if __name__ == "__main__":
+    main()
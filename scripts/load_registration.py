@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""Нагрузочный прогон регистрации: N пользователей одновременно завершают регистрацию (каждый дважды — проверка
+ON CONFLICT), приветствия уходят через очередь допуска. Telegram не вызывается: отправка имитируется sleep'ом.
+Postgres из конфига: создаётся временное мероприятие, после прогона оно удаляется вместе с участниками.
+--sqlite — временный файл SQLite (нужен aiosqlite). --late — идёт сбор мнений, участникам уходит список раунда.
+Частота отправки — SEND_RATE из конфига (по умолчанию 28 в секунду, как у Telegram).
+Запуск из корня проекта: python -m scripts.load_registration [пользователей] [--sqlite] [--late]
+"""
+import asyncio
+import itertools
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from sqlalchemy import delete, select, func
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from bot import config
+from bot.handlers.users import registration
+from bot.models.sql import Base, Event, Participant, Round, RoundMessage
+from bot.services import admission
+from bot.services.event_cache import event_cache
+import database
+
+API_LATENCY = 0.05
+
+
+class _Sent:
+    def __init__(self, message_id: int):
+        self.message_id = message_id
+
+
+class _FakeBot:
+    def __init__(self):
+        self.sent = 0
+        self._ids = itertools.count(1)
+
+    async def send_message(self, chat_id, text, **kwargs):
+        await asyncio.sleep(API_LATENCY)
+        self.sent += 1
+        return _Sent(next(self._ids))
+
+
+class _Chat:
+    def __init__(self, chat_id: int):
+        self.id = chat_id
+
+
+class _Message:
+    def __init__(self, bot: _FakeBot, user_id: int):
+        self.bot = bot
+        self.chat = _Chat(user_id)
+
+    async def answer(self, text, **kwargs):
+        return await self.bot.send_message(self.chat.id, text)
+
+
+async def _session_factory(use_sqlite: bool):
+    if use_sqlite:
+        # Файл, а не :memory: — в памяти все сессии делят одно соединение
+        path = os.path.join(tempfile.mkdtemp(), "load_registration.db")
+        engine = create_async_engine("sqlite+aiosqlite:///" + path, connect_args={"timeout": 30})
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        return sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+    db = database.implement.AsyncPostgreSQL(
+        database_name=config.PSQL_DB_NAME,
+        username=config.PSQL_USERNAME,
+        password=config.PSQL_PASSWORD,
+        hostname=config.PSQL_HOSTNAME,
+        port=config.PSQL_PORT,
+    )
+    return await database.manager.create_async_session(db, pool_size=config.PSQL_POOL_SIZE, max_overflow=config.PSQL_MAX_OVERFLOW)
+
+
+async def _register(storage, session, bot, event_id: int, user_id: int) -> float:
+    state = FSMContext(storage, StorageKey(bot_id=0, chat_id=user_id, user_id=user_id))
+    await state.set_data({"event_id": event_id, "full_name": "Участник {}".format(user_id), "telegram": "@u{}".format(user_id)})
+    started = time.perf_counter()
+    await registration._finish_registration(_Message(bot, user_id), state, session, user_id, bot)
+    return time.perf_counter() - started
+
+
+async def main():
+    users = int(next((a for a in sys.argv[1:] if a.isdigit()), 1000))
+    use_sqlite = "--sqlite" in sys.argv
+    late = "--late" in sys.argv
+    session = await _session_factory(use_sqlite)
+    async with session() as s:
+        ev = Event(is_started=True, is_ended=False, total_rounds=1, current_round=1 if late else 0)
+        s.add(ev)
+        await s.flush()
+        if late:
+            s.add(Round(event_id=ev.id, number=1, name="load", list_shown_at=datetime.utcnow()))
+        await s.commit()
+    event_cache.invalidate()
+
+    bot = _FakeBot()
+    storage = MemoryStorage()
+    user_ids = [900_000_000 + i for i in range(users)]
+    started = time.perf_counter()
+    latencies = await asyncio.gather(*(
+        _register(storage, session, bot, ev.id, uid) for uid in user_ids + user_ids
+    ))
+    handled = time.perf_counter() - started
+    await admission.queue.join()
+    drained = time.perf_counter() - started
+
+    async with session() as s:
+        registered = (await s.execute(select(func.count()).select_from(Participant).where(Participant.event_id == ev.id))).scalar()
+    latencies = sorted(latencies)
+    print("Регистраций: {} (попыток {}), в БД: {}".format(users, len(latencies), registered))
+    print("Обработчик, мс: p50 {:.1f}, p95 {:.1f}, max {:.1f}".format(
+        statistics.median(latencies) * 1000, latencies[int(len(latencies) * 0.95) - 1] * 1000, latencies[-1] * 1000,
+    ))
+    print("Все обработчики: {:.2f} с; очередь допуска разобрана за {:.2f} с, отправлено {} (ошибок {})".format(
+        handled, drained, bot.sent, admission.queue.failed,
+    ))
+
+    async with session() as s:
+        await s.execute(delete(RoundMessage).where(RoundMessage.event_id == ev.id))
+        await s.execute(delete(Round).where(Round.event_id == ev.id))
+        await s.execute(delete(Participant).where(Participant.event_id == ev.id))
+        await s.execute(delete(Event).where(Event.id == ev.id))
+        await s.commit()
+    await admission.queue.stop()
+    await storage.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""Нагрузочный прогон приёма вебхуков: синтетические нажатия «✅ Я закончил(а)!» на локальный сервер.
+Обработчик имитирует работу sleep'ом, Telegram не вызывается.
+Запуск из корня проекта: python -m scripts.load_webhook [апдейтов] [параллельно] [мс на обработку]
+"""
+import asyncio
+import statistics
+import sys
+import time
+
+import aiohttp
+from aiogram import Bot, Dispatcher, F
+from aiohttp import web
+
+from bot.services.webhook import UpdateQueue
+
+HOST = "127.0.0.1"
+PORT = 8099
+PATH = "/webhook"
+QUEUE_SIZE = 1000
+WORKERS = 16
+
+
+def _update(i: int) -> dict:
+    user = {"id": 100000 + i, "is_bot": False, "first_name": "Load"}
+    return {
+        "update_id": i,
+        "callback_query": {
+            "id": str(i),
+            "from": user,
+            "chat_instance": "load",
+            "data": "done_round",
+            "message": {
+                "message_id": i,
+                "date": int(time.time()),
+                "chat": {"id": user["id"], "type": "private"},
+                "text": "load",
+            },
+        },
+    }
+
+
+async def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+    work_ms = float(sys.argv[3]) if len(sys.argv) > 3 else 20
+
+    processed = []
+
+    async def handler(callback):
+        await asyncio.sleep(work_ms / 1000)
+        processed.append(time.perf_counter())
+
+    dp = Dispatcher()
+    dp.callback_query.register(handler, F.data == "done_round")
+    bot = Bot("123456:load-test")
+    queue = UpdateQueue(dp, bot, maxsize=QUEUE_SIZE, workers=WORKERS)
+    app = web.Application()
+    app.router.add_post(PATH, queue.handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, HOST, PORT).start()
+    queue.start()
+
+    latencies = []
+    statuses = {}
+    semaphore = asyncio.Semaphore(concurrency)
+    url = "http://{}:{}{}".format(HOST, PORT, PATH)
+    started = time.perf_counter()
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=concurrency)) as client:
+        async def post(i):
+            async with semaphore:
+                t = time.perf_counter()
+                async with client.post(url, json=_update(i)) as resp:
+                    await resp.read()
+                    statuses[resp.status] = statuses.get(resp.status, 0) + 1
+                latencies.append((time.perf_counter() - t) * 1000)
+
+        await asyncio.gather(*(post(i) for i in range(total)))
+        accepted_in = time.perf_counter() - started
+        await queue.stop()
+    await runner.cleanup()
+    await bot.session.close()
+
+    latencies.sort()
+    print("апдейтов: {}, параллельно: {}, обработка: {} мс, воркеров: {}".format(total, concurrency, work_ms, WORKERS))
+    print("ответы: {}".format(statuses))
+    print("ответ Telegram, мс: p50={:.1f} p95={:.1f} p99={:.1f} max={:.1f}".format(
+        statistics.median(latencies),
+        latencies[int(len(latencies) * 0.95) - 1],
+        latencies[int(len(latencies) * 0.99) - 1],
+        latencies[-1],
+    ))
+    print("приём: {:.2f} с, обработано: {} за {:.2f} с".format(
+        accepted_in, len(processed), (max(processed) - started) if processed else 0,
+    ))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,8 +1,11 @@
 # -*- coding: utf-8 -*-
-"""Применить миграции (round.list_shown_at, round_message, participant UNIQUE).
+"""Применить миграции (round.list_shown_at, round_message, participant UNIQUE, индексы opinion/round, opinion_delivery, broadcast,
+opinion UNIQUE, user UNIQUE).
+Каждая миграция — в своей транзакции (кортеж запросов — в одной общей); на первой ошибке скрипт останавливается с кодом 1.
 Запуск из корня проекта: python -m scripts.run_migrate
 """
 import asyncio
+import sys
 
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import create_async_engine
@@ -28,6 +31,58 @@ MIGRATIONS = [
        USING participant b
        WHERE a.event_id = b.event_id AND a.user_id = b.user_id AND a.id > b.id""",
     'ALTER TABLE participant ADD CONSTRAINT uq_participant_event_user UNIQUE (event_id, user_id)',
+    'CREATE INDEX IF NOT EXISTS ix_opinion_event_round_from ON opinion (event_id, round_number, from_user_id) INCLUDE (about_user_id)',
+    'CREATE INDEX IF NOT EXISTS ix_opinion_event_about ON opinion (event_id, about_user_id)',
+    'CREATE INDEX IF NOT EXISTS ix_round_event_open ON "round" (event_id, number) WHERE ended_at IS NULL',
+    """CREATE TABLE IF NOT EXISTS opinion_delivery (
+        id SERIAL PRIMARY KEY,
+        event_id INTEGER NOT NULL REFERENCES event(id),
+        user_id BIGINT NOT NULL,
+        delivered_at TIMESTAMP,
+        CONSTRAINT uq_opinion_delivery UNIQUE (event_id, user_id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS broadcast (
+        id SERIAL PRIMARY KEY,
+        message TEXT NOT NULL,
+        status VARCHAR(16) NOT NULL,
+        total INTEGER NOT NULL,
+        created_at TIMESTAMP,
+        finished_at TIMESTAMP
+    )""",
+    """CREATE TABLE IF NOT EXISTS broadcast_recipient (
+        id SERIAL PRIMARY KEY,
+        broadcast_id INTEGER NOT NULL REFERENCES broadcast(id),
+        chat_id BIGINT NOT NULL,
+        status VARCHAR(16) NOT NULL,
+        error TEXT,
+        updated_at TIMESTAMP,
+        CONSTRAINT uq_broadcast_recipient UNIQUE (broadcast_id, chat_id)
+    )""",
+    'CREATE INDEX IF NOT EXISTS ix_broadcast_recipient_status ON broadcast_recipient (broadcast_id, status)',
+    # Поиск участников по имени (participant_search): similarity и ILIKE по GIN-индексу
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX IF NOT EXISTS ix_participant_full_name_trgm ON participant USING gin (full_name gin_trgm_ops)',
+    # Одной транзакцией: если ограничение не создастся, старое не останется удалённым
+    (
+        'ALTER TABLE opinion DROP CONSTRAINT IF EXISTS uq_opinion',
+        # Удалить повторные мнения об участнике за раунд, оставить первое (меньший id)
+        """DELETE FROM opinion a
+           USING opinion b
+           WHERE a.event_id = b.event_id AND a.round_number = b.round_number
+             AND a.from_user_id = b.from_user_id AND a.about_user_id = b.about_user_id AND a.id > b.id""",
+        'ALTER TABLE opinion ADD CONSTRAINT uq_opinion UNIQUE (event_id, round_number, from_user_id, about_user_id)',
+    ),
+    # Покрывается uq_opinion
+    'DROP INDEX IF EXISTS ix_opinion_event_round_from',
+    # Одной транзакцией, как uq_opinion: без uq_user_id upsert из user_tracker падает на каждом сбросе
+    (
+        'ALTER TABLE "user" DROP CONSTRAINT IF EXISTS uq_user_id',
+        # Удалить повторы пользователя, оставить последнюю запись (больший index)
+        """DELETE FROM "user" a
+           USING "user" b
+           WHERE a.id = b.id AND a.index < b.index""",
+        'ALTER TABLE "user" ADD CONSTRAINT uq_user_id UNIQUE (id)',
+    ),
 ]
 
 
@@ -37,19 +92,26 @@ async def main():
         username=config.PSQL_USERNAME,
         password=config.PSQL_PASSWORD,
         hostname=config.PSQL_HOSTNAME,
-        port=5432,
+        port=config.PSQL_PORT,
     )
     engine = create_async_engine(str(db))
-    async with engine.begin() as conn:
-        for i, sql in enumerate(MIGRATIONS, 1):
+    try:
+        for i, migration in enumerate(MIGRATIONS, 1):
+            statements = migration if isinstance(migration, tuple) else (migration,)
             try:
-                await conn.execute(text(sql))
-                print("[{}/{}] OK".format(i, len(MIGRATIONS)))
+                async with engine.begin() as conn:
+                    for sql in statements:
+                        await conn.execute(text(sql))
             except Exception as e:
-                print("[{}/{}] Ошибка: {}".format(i, len(MIGRATIONS), e))
-    await engine.dispose()
+                # Следующие миграции могут зависеть от этой — дальше не идём
+                print("[{}/{}] Ошибка: {}".format(i, len(MIGRATIONS), e), file=sys.stderr)
+                return 1
+            print("[{}/{}] OK".format(i, len(MIGRATIONS)))
+    finally:
+        await engine.dispose()
     print("Готово.")
+    return 0
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    sys.exit(asyncio.run(main()))
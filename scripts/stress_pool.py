@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""Нагрузка на пул соединений: N параллельных «обработчиков», каждый делает запросы как refresh_timer_cb.
+Только чтение, настройки пула — из .env (PSQL_POOL_*).
+Запуск из корня проекта: python -m scripts.stress_pool [параллельно] [обработчиков всего]
+"""
+import asyncio
+import sys
+import time
+
+from bot import config
+from bot.services import event_service
+import database
+
+
+async def _handler(session, event_id: int, round_number: int, user_id: int):
+    await event_service.get_round_message(session, event_id, round_number, user_id)
+    await event_service.get_participants(session, event_id)
+    await event_service.get_written_opinion_targets(session, event_id, round_number, user_id)
+
+
+async def main():
+    concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    total = int(sys.argv[2]) if len(sys.argv) > 2 else 3000
+    db = database.implement.AsyncPostgreSQL(
+        database_name=config.PSQL_DB_NAME,
+        username=config.PSQL_USERNAME,
+        password=config.PSQL_PASSWORD,
+        hostname=config.PSQL_HOSTNAME,
+        port=config.PSQL_PORT,
+    )
+    session = await database.manager.create_async_session(
+        db,
+        poolclass=database.manager.TimedAsyncQueuePool,
+        pool_size=config.PSQL_POOL_SIZE,
+        max_overflow=config.PSQL_MAX_OVERFLOW,
+        pool_timeout=config.PSQL_POOL_TIMEOUT,
+        pool_recycle=config.PSQL_POOL_RECYCLE,
+        pool_pre_ping=config.PSQL_POOL_PRE_PING,
+        connect_args={"prepared_statement_cache_size": config.PSQL_STATEMENT_CACHE_SIZE},
+    )
+    ev = await event_service.get_latest_event(session)
+    if ev is None:
+        print("Нет мероприятий — заполните тестовые данные (fill_test_data.py).")
+        return
+    participants = await event_service.get_participants(session, ev.id)
+    user_ids = [p.user_id for p in participants] or [0]
+    round_number = max(ev.current_round or 1, 1)
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async def one(i):
+        nonlocal errors
+        async with semaphore:
+            t = time.perf_counter()
+            try:
+                await _handler(session, ev.id, round_number, user_ids[i % len(user_ids)])
+            except Exception as e:
+                errors += 1
+                print("Ошибка: {}".format(e))
+            latencies.append((time.perf_counter() - t) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    print("пул: size={} overflow={}, параллельно: {}, обработчиков: {}, ошибок: {}".format(
+        config.PSQL_POOL_SIZE, config.PSQL_MAX_OVERFLOW, concurrency, total, errors,
+    ))
+    print("{:.0f} обработчиков/с, p50={:.1f} мс p95={:.1f} мс max={:.1f} мс".format(
+        total / elapsed, latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.95) - 1], latencies[-1],
+    ))
+    print("ожидание соединения: {}".format(database.manager.pool_metrics.snapshot()))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
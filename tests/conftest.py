@@ -0,0 +1,66 @@
+import asyncio
+import itertools
+import os
+
+import pytest
+
+# bot.config читает окружение при импорте
+for _name, _value in dict(
+    BOT_TOKEN="123:abc", BOT_ADMINS="1", THROTTLE_RATE="0.5",
+    PSQL_HOSTNAME="localhost", PSQL_PORT="5432", PSQL_USERNAME="u", PSQL_PASSWORD="p", PSQL_DB_NAME="d",
+).items():
+    os.environ.setdefault(_name, _value)
+
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+from sqlalchemy.pool import NullPool  # noqa: E402
+
+from bot.models.sql import Base  # noqa: E402
+from bot.services import state_backend  # noqa: E402
+from bot.services.event_cache import event_cache, opinion_matrix, participant_index  # noqa: E402
+
+
+class SentMessage:
+    def __init__(self, message_id: int):
+        self.message_id = message_id
+
+
+class FakeBot:
+    """Bot API без сети: запоминает вызовы, send_message возвращает сообщение с новым message_id."""
+
+    def __init__(self):
+        self.calls = []
+        self._ids = itertools.count(1000)
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.calls.append(("send", chat_id, text))
+        return SentMessage(next(self._ids))
+
+    async def edit_message_text(self, chat_id=None, message_id=None, text=None, reply_markup=None, **kwargs):
+        self.calls.append(("edit", chat_id, message_id, text))
+
+    async def delete_message(self, chat_id, message_id):
+        self.calls.append(("delete", chat_id, message_id))
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    """SQLite в файле: NullPool, чтобы соединения не переживали asyncio.run одного теста."""
+    engine = create_async_engine("sqlite+aiosqlite:///{}".format(tmp_path / "test.db"), poolclass=NullPool)
+
+    async def create():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    asyncio.run(create())
+    return sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+
+
+@pytest.fixture(autouse=True)
+def fresh_state():
+    """Кэши и хранилище состояния — модульные синглтоны; каждый тест начинает с чистых."""
+    event_cache.invalidate()
+    opinion_matrix.invalidate()
+    participant_index.invalidate()
+    state_backend.backend = state_backend.MemoryStateBackend()
+    yield
@@ -0,0 +1,40 @@
+import asyncio
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from bot.services.opinion_writer import OpinionWriter
+from bot.services.user_tracker import UserTracker
+
+
+@pytest.fixture
+def old_schema_factory(tmp_path):
+    """Таблицы как до миграции — без uq_opinion и uq_user_id."""
+    engine = create_async_engine("sqlite+aiosqlite:///{}".format(tmp_path / "old.db"), poolclass=NullPool)
+
+    async def create():
+        async with engine.begin() as conn:
+            await conn.execute(text(
+                "CREATE TABLE opinion (id INTEGER PRIMARY KEY, event_id INTEGER, round_number INTEGER, "
+                "from_user_id BIGINT, about_user_id BIGINT, text TEXT, created_at DATETIME)"
+            ))
+            await conn.execute(text(
+                'CREATE TABLE "user" ("index" INTEGER PRIMARY KEY, id BIGINT, username TEXT, first_name TEXT, last_name TEXT)'
+            ))
+
+    asyncio.run(create())
+    return sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+
+
+@pytest.mark.parametrize("service", [OpinionWriter, UserTracker])
+def test_check_schema_passes_after_migration(session_factory, service):
+    asyncio.run(service().check_schema(session_factory))
+
+
+@pytest.mark.parametrize("service, constraint", [(OpinionWriter, "uq_opinion"), (UserTracker, "uq_user_id")])
+def test_check_schema_fails_fast_without_constraint(old_schema_factory, service, constraint):
+    with pytest.raises(RuntimeError, match=constraint):
+        asyncio.run(service().check_schema(old_schema_factory))
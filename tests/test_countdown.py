@@ -0,0 +1,96 @@
+import asyncio
+import types
+from datetime import datetime, timedelta
+
+import pytest
+
+from bot.models.sql import Round
+from bot.services import event_service
+
+START = datetime(2024, 1, 1, 12, 0, 0)
+
+
+class FakeClock:
+    """Подменяет datetime.utcnow и asyncio.sleep в event_service: sleep сдвигает время, а не ждёт."""
+
+    def __init__(self, early: float = 0.0):
+        self.now = START
+        self.early = early  # sleep «просыпается» раньше на столько секунд
+        self.sleeps = []
+
+    async def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += timedelta(seconds=max(0.0, seconds - self.early))
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+
+    class FakeDatetime(datetime):
+        @classmethod
+        def utcnow(cls):
+            return fake.now
+
+    monkeypatch.setattr(event_service, "datetime", FakeDatetime)
+    monkeypatch.setattr(event_service, "asyncio", types.SimpleNamespace(sleep=fake.sleep))
+    return fake
+
+
+def _round(shown_at):
+    return Round(event_id=1, number=1, name="r", list_shown_at=shown_at)
+
+
+def _collect(clock, deadline):
+    async def run():
+        return [(m, (clock.now - START).total_seconds()) async for m in event_service.minute_marks(deadline)]
+
+    return asyncio.run(run())
+
+
+def test_round_deadline():
+    assert event_service.round_deadline(None) is None
+    assert event_service.round_deadline(_round(None)) is None
+    assert event_service.round_deadline(_round(START)) == START + timedelta(seconds=event_service.ROUND_DURATION_SEC)
+
+
+@pytest.mark.parametrize("left, minutes", [
+    (120, 2),
+    (119.5, 2),
+    (120.5, 3),  # неполная минута округляется вверх
+    (1, 1),
+    (0, 0),
+    (-30, 0),  # дедлайн прошёл
+])
+def test_remaining_minutes(left, minutes):
+    shown_at = START + timedelta(seconds=left - event_service.ROUND_DURATION_SEC)
+    assert event_service.remaining_minutes(_round(shown_at), now=START) == minutes
+
+
+def test_remaining_minutes_without_list():
+    assert event_service.remaining_minutes(None, now=START) == 0
+    assert event_service.remaining_minutes(_round(None), now=START) == 0
+
+
+def test_minute_marks_whole_minutes(clock):
+    assert _collect(clock, START + timedelta(minutes=3)) == [(2, 60), (1, 120), (0, 180)]
+
+
+def test_minute_marks_partial_minute(clock):
+    # Отметки считаются от дедлайна: первая — через 30 с, дальше ровно по минуте
+    assert _collect(clock, START + timedelta(seconds=150)) == [(2, 30), (1, 90), (0, 150)]
+
+
+def test_minute_marks_deadline_in_past(clock):
+    assert _collect(clock, START - timedelta(seconds=45)) == [(0, 0)]
+    assert clock.sleeps == [0.0]
+
+
+def test_minute_marks_deadline_now(clock):
+    assert _collect(clock, START) == [(0, 0)]
+
+
+def test_minute_marks_early_wakeup_does_not_repeat(clock):
+    clock.early = 0.01
+    marks = [m for m, _ in _collect(clock, START + timedelta(seconds=150))]
+    assert marks == [2, 1, 0]
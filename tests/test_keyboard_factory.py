@@ -0,0 +1,91 @@
+import pytest
+
+from bot.models.sql import Participant
+from bot.services.keyboard_factory import ParticipantsKeyboardFactory, PAGE_SIZE, NOOP_CALLBACK, PARTICIPANTS_KB_FOOTER
+
+
+def _participants(n: int):
+    return [Participant(event_id=1, user_id=uid, full_name="P{:03}".format(uid)) for uid in range(1, n + 1)]
+
+
+def _opinion_ids(kb):
+    return [
+        int(row[0].callback_data.rsplit("_", 1)[1])
+        for row in kb.inline_keyboard if row[0].callback_data.startswith("opinion_about_")
+    ]
+
+
+def _nav(kb):
+    """Строка листания — перед подвалом; None, если страница одна."""
+    row = kb.inline_keyboard[-len(PARTICIPANTS_KB_FOOTER) - 1]
+    if row[0].callback_data.startswith("opinion_about_"):
+        return None
+    return [(b.text, b.callback_data) for b in row]
+
+
+@pytest.fixture
+def factory():
+    return ParticipantsKeyboardFactory()
+
+
+def test_single_page_has_no_nav(factory):
+    kb = factory.markup(1, 1, _participants(PAGE_SIZE + 1), exclude_user_id=1)
+    assert _opinion_ids(kb) == list(range(2, PAGE_SIZE + 2))
+    assert _nav(kb) is None
+    assert kb.inline_keyboard[-len(PARTICIPANTS_KB_FOOTER):] == PARTICIPANTS_KB_FOOTER
+
+
+def test_pages_and_nav_boundaries(factory):
+    participants = _participants(2 * PAGE_SIZE + 5)  # без себя — 2 полные страницы и 4 на третьей
+    first = factory.markup(1, 1, participants, 1, page=0)
+    middle = factory.markup(1, 1, participants, 1, page=1)
+    last = factory.markup(1, 1, participants, 1, page=2)
+    assert _opinion_ids(first) == list(range(2, PAGE_SIZE + 2))
+    assert len(_opinion_ids(middle)) == PAGE_SIZE
+    assert _opinion_ids(last) == list(range(2 * PAGE_SIZE + 2, 2 * PAGE_SIZE + 6))
+    assert _nav(first) == [("1/3", NOOP_CALLBACK), ("▶️", "pp:1")]
+    assert _nav(middle) == [("◀️", "pp:0"), ("2/3", NOOP_CALLBACK), ("▶️", "pp:2")]
+    assert _nav(last) == [("◀️", "pp:1"), ("3/3", NOOP_CALLBACK)]
+
+
+def test_page_out_of_range_is_clamped(factory):
+    participants = _participants(2 * PAGE_SIZE + 5)
+    assert _nav(factory.markup(1, 1, participants, 1, page=99)) == [("◀️", "pp:1"), ("3/3", NOOP_CALLBACK)]
+    assert _nav(factory.markup(1, 1, participants, 1, page=-1))[0] == ("1/3", NOOP_CALLBACK)
+
+
+def test_open_page_remembered_per_user(factory):
+    participants = _participants(2 * PAGE_SIZE + 5)
+    factory.markup(1, 1, participants, 1, page=2)
+    assert _nav(factory.markup(1, 1, participants, 1))[-1] == ("3/3", NOOP_CALLBACK)
+    assert _nav(factory.markup(1, 1, participants, 2))[0] == ("1/3", NOOP_CALLBACK)
+
+
+def test_exclusion(factory):
+    participants = _participants(5)
+    kb = factory.markup(1, 1, participants, exclude_user_id=3, already_written={1, 5})
+    assert _opinion_ids(kb) == [2, 4]
+    # Тот же набор исключений у другого участника — та же готовая разметка
+    assert factory.markup(1, 1, participants, exclude_user_id=1, already_written={3, 5}) is kb
+
+
+def test_excluded_users_shift_pages(factory):
+    participants = _participants(PAGE_SIZE + 2)
+    assert _nav(factory.markup(1, 1, participants, 1)) == [("1/2", NOOP_CALLBACK), ("▶️", "pp:1")]
+    # Мнение написано — участник выпал из списка, всё помещается на одну страницу
+    kb = factory.markup(1, 1, participants, 1, already_written={2})
+    assert _nav(kb) is None and len(_opinion_ids(kb)) == PAGE_SIZE
+
+
+def test_markups_cache_is_bounded_lru(factory, monkeypatch):
+    monkeypatch.setattr(ParticipantsKeyboardFactory, "MAX_MARKUPS", 3)
+    participants = _participants(10)
+    first = factory.markup(1, 1, participants, 1)
+    for uid in (2, 3):
+        factory.markup(1, 1, participants, uid)
+    assert factory.markup(1, 1, participants, 1) is first  # 1 — снова недавний
+    factory.markup(1, 1, participants, 4)  # вытесняет давно не использованный — 2
+    markups = factory._rounds[(1, 1)].markups
+    assert len(markups) == 3
+    assert [set(excluded) for excluded, _ in markups] == [{3}, {1}, {4}]
+    assert factory.markup(1, 1, participants, 1) is first
@@ -0,0 +1,58 @@
+import asyncio
+
+from sqlalchemy import select
+
+from bot.models.sql import Event, OpinionDelivery, Participant
+from bot.services import opinion_delivery, state_backend
+
+from conftest import FakeBot
+
+
+async def _seed(session_factory, users):
+    async with session_factory() as s:
+        s.add(Event(id=1, is_started=True, is_ended=True))
+        for uid in users:
+            s.add(Participant(event_id=1, user_id=uid, full_name="P{}".format(uid)))
+        await s.commit()
+
+
+async def _delivered_rows(session_factory):
+    async with session_factory() as s:
+        r = await s.execute(select(OpinionDelivery.user_id).order_by(OpinionDelivery.user_id))
+        return list(r.scalars().all())
+
+
+def test_mark_delivered_ignores_duplicates(session_factory):
+    async def run():
+        await opinion_delivery.mark_delivered(session_factory, 1, [5, 6])
+        # Повтор (например, параллельный запуск дослал тем же) — без IntegrityError
+        await opinion_delivery.mark_delivered(session_factory, 1, [6, 7])
+        assert await _delivered_rows(session_factory) == [5, 6, 7]
+
+    asyncio.run(run())
+
+
+def test_lock_lost_reports_partial_progress(session_factory, monkeypatch):
+    monkeypatch.setattr(opinion_delivery, "CHUNK_SIZE", 2)
+
+    async def run():
+        await _seed(session_factory, range(1, 6))
+        other = state_backend.MemoryStateBackend()
+        other._locks = state_backend.backend._locks  # второй процесс с тем же хранилищем
+        reports = []
+
+        async def progress(done, failed, total, finished):
+            reports.append((done, failed, total, finished))
+            if done == 2:
+                # Блокировку перехватил другой процесс после первой пачки
+                await state_backend.backend.release_lock(opinion_delivery._lock(1), force=True)
+                assert await other.acquire_lock(opinion_delivery._lock(1), 60)
+
+        bot = FakeBot()
+        assert await opinion_delivery.start(bot, session_factory, 1, "intro", progress)
+        await asyncio.gather(*opinion_delivery._delivery_tasks.values())
+        assert reports[-1] == (2, 3, 5, True)
+        assert await _delivered_rows(session_factory) == [1, 2]
+        assert len([c for c in bot.calls if c[0] == "send"]) == 2
+
+    asyncio.run(run())
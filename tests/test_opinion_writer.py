@@ -0,0 +1,131 @@
+import asyncio
+
+import pytest
+from sqlalchemy import select
+
+from bot.models.sql import Opinion
+from bot.services import event_service, opinion_writer
+from bot.services.event_cache import opinion_matrix
+from bot.services.opinion_writer import OpinionWriter
+
+
+@pytest.fixture
+def writer(monkeypatch):
+    # Фоновую задачу тесты запускают сами; по умолчанию пишет только явный flush()
+    w = OpinionWriter(flush_interval=60)
+    monkeypatch.setattr(opinion_writer, "writer", w)
+    return w
+
+
+async def _rows(session_factory):
+    async with session_factory() as s:
+        r = await s.execute(select(Opinion.from_user_id, Opinion.about_user_id, Opinion.text).order_by(Opinion.id))
+        return r.all()
+
+
+def _broken_factory():
+    raise ConnectionError("db down")
+
+
+def test_opinion_visible_before_and_after_flush(session_factory, writer):
+    async def run():
+        writer._session_factory = session_factory
+        assert await event_service.save_opinion(session_factory, 1, 1, 5, 6, "a")
+        assert await _rows(session_factory) == []
+        # Матрица из БД (промах кэша) дополняется буфером writer
+        opinion_matrix.invalidate()
+        assert await event_service.get_round_opinion_matrix(session_factory, 1, 1) == {5: {6}}
+        assert not await event_service.save_opinion(session_factory, 1, 1, 5, 6, "again")
+
+        assert await writer.flush() == 1
+        assert await _rows(session_factory) == [(5, 6, "a")]
+        opinion_matrix.invalidate()
+        assert await event_service.get_round_opinion_matrix(session_factory, 1, 1) == {5: {6}}
+
+    asyncio.run(run())
+
+
+def test_duplicates_dropped_by_unique_key(session_factory, writer):
+    async def run():
+        writer._session_factory = session_factory
+        async with session_factory() as s:
+            s.add(Opinion(event_id=1, round_number=1, from_user_id=5, about_user_id=6, text="first"))
+            await s.commit()
+        # Матрица не загружена — submit проверяет только буфер, дубликат отсекает uq_opinion
+        assert writer.submit(1, 1, 5, 6, "second")
+        assert writer.submit(1, 1, 5, 7, "other")
+        assert not writer.submit(1, 1, 5, 7, "other again")
+        await writer.flush()
+        assert await _rows(session_factory) == [(5, 6, "first"), (5, 7, "other")]
+        assert writer.pending == 0 and writer.failed_flushes == 0
+
+    asyncio.run(run())
+
+
+def test_background_flush_by_interval(session_factory, writer):
+    async def run():
+        writer.flush_interval = 0.05
+        writer.start(session_factory)
+        writer.submit(1, 1, 5, 6, "a")
+        await asyncio.sleep(0.2)
+        assert await _rows(session_factory) == [(5, 6, "a")]
+        await writer.stop()
+
+    asyncio.run(run())
+
+
+def test_background_flush_on_batch_size(session_factory, writer):
+    async def run():
+        writer.batch_size = 3
+        writer.start(session_factory)
+        for about in (6, 7):
+            writer.submit(1, 1, 5, about, "a")
+        await asyncio.sleep(0.05)
+        assert await _rows(session_factory) == []  # до интервала и до полной пачки — ждём
+        writer.submit(1, 1, 5, 8, "a")
+        await asyncio.sleep(0.05)
+        assert len(await _rows(session_factory)) == 3
+        await writer.stop()
+
+    asyncio.run(run())
+
+
+def test_failed_flush_requeues(session_factory, writer):
+    async def run():
+        writer._session_factory = _broken_factory
+        writer.submit(1, 1, 5, 6, "a")
+        assert await writer.flush() == 0
+        assert writer.pending == 1 and writer.failed_flushes == 1
+        writer.submit(1, 1, 5, 7, "b")  # пришло, пока БД недоступна
+        assert writer.pending_for(1, 1) == [(5, 6), (5, 7)]
+
+        writer._session_factory = session_factory
+        assert await writer.flush() == 2
+        assert await _rows(session_factory) == [(5, 6, "a"), (5, 7, "b")]
+        assert writer.pending == 0 and writer.failed_flushes == 0
+
+    asyncio.run(run())
+
+
+def test_unhealthy_after_max_failed_flushes(session_factory, writer):
+    async def run():
+        writer._session_factory = _broken_factory
+        writer.submit(1, 1, 5, 6, "a")
+        for _ in range(opinion_writer.MAX_FAILED_FLUSHES):
+            await writer.flush()
+        assert not writer.healthy
+        writer._session_factory = session_factory
+        assert await writer.flush() == 1
+        assert writer.healthy
+
+    asyncio.run(run())
+
+
+def test_stop_flushes_buffer(session_factory, writer):
+    async def run():
+        writer.start(session_factory)
+        writer.submit(1, 1, 5, 6, "a")
+        await writer.stop()
+        assert await _rows(session_factory) == [(5, 6, "a")]
+
+    asyncio.run(run())
@@ -0,0 +1,128 @@
+import asyncio
+import os
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from bot.models.sql import Base, Event, Participant
+from bot.services import participant_search
+from bot.services.participant_search import NgramIndex
+
+# Postgres с pg_trgm для сверки с NgramIndex, например postgresql+asyncpg://postgres@127.0.0.1:5432/search
+TEST_PSQL_URL = os.environ.get("TEST_PSQL_URL")
+
+NAMES = [
+    "Иван Петров", "Иванов Сергей", "Иванова Анна", "Пётр Иванов", "Анна Смирнова",
+    "Ivan Petrov", "Ivanov Sergey", "Anna Smirnova", "Li Na", "Oliver Twist",
+]
+
+QUERIES = [
+    "ив", "li", "a", "ivan", "Иванов", "иванова", "петров иван", "Smirnova Anna", "sergey ivanov", "twist", "zzz",
+]
+
+
+def _participants():
+    return [Participant(event_id=1, user_id=uid, full_name=name) for uid, name in enumerate(NAMES, 1)]
+
+
+def _names(found):
+    return [p.full_name for p in found]
+
+
+@pytest.fixture
+def index():
+    return NgramIndex(_participants())
+
+
+def test_empty_query(index):
+    assert index.search("") == []
+    assert index.search("   ") == []
+
+
+def test_short_query_matches_substring(index):
+    # Короче триграммы: находится по подстроке, в любом месте и любом регистре
+    assert set(_names(index.search("LI"))) == {"Li Na", "Oliver Twist"}
+    assert set(_names(index.search("a"))) == {n for n in NAMES if "a" in n.casefold()}
+
+
+def test_multi_word_query_any_word_order(index):
+    assert _names(index.search("петров иван"))[0] == "Иван Петров"
+    assert _names(index.search("Smirnova Anna"))[0] == "Anna Smirnova"
+
+
+def _similarity(a: str, b: str) -> float:
+    ga, gb = participant_search.trigrams(a), participant_search.trigrams(b)
+    return len(ga & gb) / len(ga | gb)
+
+
+def test_ordered_by_similarity(index):
+    found = _names(index.search("Иванов"))
+    # Целое слово совпало; короче имя — меньше лишних триграмм, выше похожесть
+    assert found[:2] == ["Пётр Иванов", "Иванов Сергей"]
+    assert found.index("Иванов Сергей") < found.index("Иванова Анна")
+    scores = [_similarity(n, "Иванов") for n in found]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_typo_found_by_similarity(index):
+    assert "Oliver Twist" in _names(index.search("twsit oliver"))
+
+
+def test_no_match(index):
+    assert index.search("zzz") == []
+
+
+def test_limit(index):
+    assert len(index.search("a", limit=2)) == 2
+
+
+def test_memory_search_via_participant_index(session_factory):
+    async def run():
+        async with session_factory() as s:
+            s.add(Event(id=1, is_started=True))
+            s.add_all(_participants())
+            await s.commit()
+        found = await participant_search.search_participants(session_factory, 1, " петров иван ")
+        assert _names(found)[0] == "Иван Петров"
+
+    asyncio.run(run())
+
+
+@pytest.fixture
+def pg_session_factory():
+    engine = create_async_engine(TEST_PSQL_URL, poolclass=NullPool)
+
+    async def setup():
+        async with engine.begin() as conn:
+            await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(Base.metadata.create_all)
+
+    async def teardown():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+        await engine.dispose()
+
+    asyncio.run(setup())
+    yield sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+    asyncio.run(teardown())
+
+
+@pytest.mark.skipif(not TEST_PSQL_URL, reason="TEST_PSQL_URL is not set")
+def test_postgres_matches_ngram_index(pg_session_factory):
+    """Запрос с pg_trgm и NgramIndex находят одно и то же в одном порядке."""
+    async def run():
+        async with pg_session_factory() as s:
+            s.add(Event(id=1, is_started=True))
+            await s.flush()
+            s.add_all(_participants())
+            await s.commit()
+        index = NgramIndex(_participants())
+        for query in QUERIES:
+            found = await participant_search.search_participants(pg_session_factory, 1, query)
+            assert _names(found) == _names(index.search(query)), query
+
+    asyncio.run(run())
@@ -0,0 +1,78 @@
+import asyncio
+from datetime import datetime
+
+from sqlalchemy import select
+
+import tools
+from bot.handlers.users import registration
+from bot.models.sql import Event, Participant, Round, RoundMessage
+from bot.services import event_service
+
+from conftest import FakeBot
+
+
+async def _seed(session_factory, list_shown: bool):
+    async with session_factory() as s:
+        s.add(Event(id=1, is_started=True, is_ended=False, total_rounds=2, current_round=1))
+        s.add(Round(event_id=1, number=1, name="r", list_shown_at=datetime.utcnow() if list_shown else None))
+        for uid in (5, 6):
+            s.add(Participant(event_id=1, user_id=uid, full_name="P{}".format(uid)))
+        await s.commit()
+
+
+async def _round_messages(session_factory):
+    async with session_factory() as s:
+        r = await s.execute(select(RoundMessage.user_id, RoundMessage.message_id).order_by(RoundMessage.user_id))
+        return r.all()
+
+
+class SlowLateJoinBot(FakeBot):
+    """Отправка опоздавшему (_admit передаёт reply_markup) дольше анонса — анонс записывает строку первым."""
+
+    async def send_message(self, chat_id, text, **kwargs):
+        if "reply_markup" in kwargs:
+            await asyncio.sleep(0.2)
+        return await super().send_message(chat_id, text, **kwargs)
+
+
+def test_late_join_during_round_announce(session_factory):
+    """Регистрация совпала с анонсом раунда: обе стороны пишут строку (1, 1, 6) — одна остаётся, ошибок нет."""
+    async def run():
+        await _seed(session_factory, list_shown=False)
+        bot = SlowLateJoinBot()
+        await asyncio.gather(
+            event_service.notify_round_start(bot, session_factory, 1, 1, "r", tools.filer.read_txt),
+            registration._admit(None, session_factory, 1, 6, bot),
+        )
+        rows = await _round_messages(session_factory)
+        assert [uid for uid, _ in rows] == [5, 6]
+
+    asyncio.run(run())
+
+
+def test_late_join_keeps_existing_round_message(session_factory):
+    async def run():
+        await _seed(session_factory, list_shown=True)
+        async with session_factory() as s:
+            s.add(RoundMessage(event_id=1, round_number=1, user_id=6, chat_id=6, message_id=42))
+            await s.commit()
+        await event_service.track_round_message(1, 1, 6, 6, 42)
+        bot = FakeBot()
+        await registration._admit(None, session_factory, 1, 6, bot)
+        assert await _round_messages(session_factory) == [(6, 42)]
+        # За таймером остаётся сообщение из round_message, а не второе
+        assert await event_service.get_round_target(session_factory, 1, 1, 6) == (6, 42)
+
+    asyncio.run(run())
+
+
+def test_late_join_tracks_new_message(session_factory):
+    async def run():
+        await _seed(session_factory, list_shown=True)
+        bot = FakeBot()
+        await registration._admit(None, session_factory, 1, 6, bot)
+        [(uid, message_id)] = await _round_messages(session_factory)
+        assert uid == 6
+        assert await event_service.get_round_target(session_factory, 1, 1, 6) == (6, message_id)
+
+    asyncio.run(run())
@@ -0,0 +1,91 @@
+import asyncio
+from datetime import datetime
+
+from bot.handlers.users import rounds_system
+from bot.models.sql import Event, Participant, Round
+from bot.services import event_service, state_backend
+
+from conftest import FakeBot
+
+
+class FakeUser:
+    def __init__(self, user_id: int):
+        self.id = user_id
+
+
+class FakeMessage:
+    def __init__(self):
+        self.answers = []
+
+    async def answer(self, text, **kwargs):
+        self.answers.append(text)
+
+
+class FakeCallback:
+    def __init__(self, bot, user_id: int, data: str):
+        self.bot = bot
+        self.from_user = FakeUser(user_id)
+        self.data = data
+        self.message = FakeMessage()
+
+    async def answer(self, *args, **kwargs):
+        pass
+
+
+class FakeState:
+    def __init__(self):
+        self.data, self.state = {}, None
+
+    async def update_data(self, **kwargs):
+        self.data.update(kwargs)
+
+    async def set_state(self, state):
+        self.state = state
+
+    async def clear(self):
+        self.data, self.state = {}, None
+
+
+async def _seed(session_factory):
+    async with session_factory() as s:
+        s.add(Event(id=1, is_started=True, is_ended=False, total_rounds=2, current_round=1))
+        s.add(Round(event_id=1, number=1, name="r", list_shown_at=datetime.utcnow()))
+        for uid in (5, 6):
+            s.add(Participant(event_id=1, user_id=uid, full_name="P{}".format(uid)))
+        await s.commit()
+    # Сообщение раунда известно только state_backend — строки round_message в БД нет
+    await event_service.track_round_message(1, 1, 5, 5, 77)
+
+
+def _edits(bot):
+    return [c for c in bot.calls if c[0] == "edit"]
+
+
+def test_handlers_edit_tracked_round_message(session_factory):
+    async def run():
+        await _seed(session_factory)
+        bot, state = FakeBot(), FakeState()
+
+        await rounds_system.opinion_about_cb(FakeCallback(bot, 5, "opinion_about_6"), state, session_factory)
+        assert state.data == {"about_user_id": 6, "event_id": 1, "round_number": 1}
+        assert _edits(bot)[-1][1:3] == (5, 77)
+        assert "P6" in _edits(bot)[-1][3]
+
+        await rounds_system.opinion_cancel_cb(FakeCallback(bot, 5, "opinion_cancel"), state, session_factory)
+        await rounds_system.done_round_cb(FakeCallback(bot, 5, "done_round"), state, session_factory)
+        assert [c[1:3] for c in _edits(bot)] == [(5, 77)] * 3
+        assert await state_backend.backend.get_round_view(1, 1, 5) == "done"
+
+    asyncio.run(run())
+
+
+def test_handlers_without_round_message(session_factory):
+    async def run():
+        await _seed(session_factory)
+        bot = FakeBot()
+        callback = FakeCallback(bot, 6, "opinion_about_5")
+        await rounds_system.opinion_about_cb(callback, FakeState(), session_factory)
+        assert callback.message.answers == ["Ошибка: сообщение раунда не найдено."]
+        assert not _edits(bot)
+
+    asyncio.run(run())
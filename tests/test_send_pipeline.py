@@ -0,0 +1,66 @@
+import asyncio
+
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import SendMessage
+
+from bot.services.send_pipeline import SendPipeline
+
+
+def _flood(retry_after: float) -> TelegramRetryAfter:
+    return TelegramRetryAfter(method=SendMessage(chat_id=1, text="x"), message="flood", retry_after=retry_after)
+
+
+def test_round_calls_go_before_bulk():
+    async def run():
+        p = SendPipeline(rate=50, concurrency=4, bulk_rate=50, bulk_concurrency=4)
+        order = []
+
+        def job(tag):
+            async def send():
+                order.append(tag)
+            return send
+
+        bulk = [asyncio.create_task(p.call(1000 + i, job("bulk"), bulk=True)) for i in range(20)]
+        await asyncio.sleep(0.05)  # рассылка уже идёт
+        await asyncio.gather(*(p.call(i, job("round")) for i in range(10)))
+        first = order.index("round")
+        # Пока правки раунда ждали, рассылка не вклинивалась
+        assert order[first:] == ["round"] * 10
+        await asyncio.gather(*bulk)
+        assert order.count("bulk") == 20
+
+    asyncio.run(run())
+
+
+def test_bulk_backs_off_on_flood():
+    async def run():
+        p = SendPipeline(rate=100, concurrency=4, bulk_rate=20)
+        attempts = []
+
+        async def send():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise _flood(0.1)
+
+        await p.call(1, send, bulk=True)
+        assert len(attempts) == 2
+        assert p.bulk_rate.rate < 20  # после флуд-лимита — медленнее, потом плавно обратно
+
+    asyncio.run(run())
+
+
+def test_flood_pauses_round_calls_too():
+    async def run():
+        p = SendPipeline(rate=100, concurrency=4)
+        calls = []
+
+        async def send():
+            calls.append(asyncio.get_running_loop().time())
+            if len(calls) == 1:
+                raise _flood(0.2)
+
+        started = asyncio.get_running_loop().time()
+        await p.call(1, send)
+        assert calls[1] - started >= 0.19
+
+    asyncio.run(run())
@@ -0,0 +1,184 @@
+import asyncio
+
+import pytest
+from fakeredis import FakeServer
+from fakeredis.aioredis import FakeRedis
+
+from bot.services.event_cache import OpinionMatrixCache
+from bot.services import state_backend
+from bot.services.state_backend import RedisStateBackend, MemoryStateBackend
+
+LOCK = "round_ticker:1:1"
+
+
+@pytest.fixture
+def server():
+    return FakeServer()
+
+
+def _backend(server) -> RedisStateBackend:
+    # Два бэкенда на одном сервере — как два воркера бота
+    return RedisStateBackend(FakeRedis(server=server), prefix="test")
+
+
+def test_acquire_and_contention(server):
+    async def run():
+        a, b = _backend(server), _backend(server)
+        assert await a.acquire_lock(LOCK, 5)
+        assert await a.acquire_lock(LOCK, 5)  # повторно владелец берёт свою блокировку
+        assert not await b.acquire_lock(LOCK, 5)
+        assert not await b.extend_lock(LOCK, 5)
+        await b.release_lock(LOCK)  # чужую не отпускает
+        assert not await b.acquire_lock(LOCK, 5)
+        await a.release_lock(LOCK)
+        assert await b.acquire_lock(LOCK, 5)
+        await a.close()
+        await b.close()
+
+    asyncio.run(run())
+
+
+def test_expiry_and_takeover(server):
+    async def run():
+        a, b = _backend(server), _backend(server)
+        assert await a.acquire_lock(LOCK, 0.2)
+        assert await a.extend_lock(LOCK, 0.2)
+        # Владелец «упал» и перестал продлевать — после TTL блокировку перехватывает другой процесс
+        await asyncio.sleep(0.3)
+        assert await b.acquire_lock(LOCK, 5)
+        assert not await a.extend_lock(LOCK, 5)
+        assert not await a.acquire_lock(LOCK, 5)
+        await a.close()
+        await b.close()
+
+    asyncio.run(run())
+
+
+def test_force_release(server):
+    async def run():
+        a, b = _backend(server), _backend(server)
+        assert await a.acquire_lock(LOCK, 5)
+        await b.release_lock(LOCK, force=True)
+        assert await b.acquire_lock(LOCK, 5)
+        await a.close()
+        await b.close()
+
+    asyncio.run(run())
+
+
+def test_claim_opinion_across_workers(server):
+    async def run():
+        a, b = _backend(server), _backend(server)
+        assert await a.claim_opinion(1, 1, 5, 6)
+        assert not await b.claim_opinion(1, 1, 5, 6)
+        assert await b.claim_opinion(1, 1, 5, 7)
+        assert await b.claim_opinion(1, 2, 5, 6)
+        await a.clear_round(1, 1)
+        assert await b.claim_opinion(1, 1, 5, 6)
+        await a.close()
+        await b.close()
+
+    asyncio.run(run())
+
+
+def test_opinion_claim_reaches_other_workers_matrix(server):
+    async def run():
+        a, b = _backend(server), _backend(server)
+        matrix_a, matrix_b = OpinionMatrixCache(), OpinionMatrixCache()
+        matrix_a.set(1, 1, {})
+        matrix_b.set(1, 1, {})
+        a.on_opinion_claimed(matrix_a.add)
+        b.on_opinion_claimed(matrix_b.add)
+        await a.start()
+        await b.start()
+        assert await a.claim_opinion(1, 1, 5, 6)
+        assert not await b.claim_opinion(1, 1, 5, 6)  # повтор не публикуется
+        for _ in range(50):
+            if matrix_b.get(1, 1):
+                break
+            await asyncio.sleep(0.01)
+        assert matrix_b.get(1, 1) == {5: {6}}
+        assert matrix_a.get(1, 1) == {}  # своё сообщение отправитель пропускает
+        await a.close()
+        await b.close()
+
+    asyncio.run(run())
+
+
+async def _wait_for(predicate, timeout=2.0):
+    for _ in range(int(timeout / 0.01)):
+        if predicate():
+            return True
+        await asyncio.sleep(0.01)
+    return False
+
+
+def test_failing_callback_does_not_stop_listener(server):
+    async def run():
+        a, b = _backend(server), _backend(server)
+        calls = []
+
+        def broken():
+            raise RuntimeError("boom")
+
+        b.on_event_changed(broken)
+        b.on_event_changed(lambda: calls.append(1))
+        await b.start()
+        await a.notify_event_changed()
+        assert await _wait_for(lambda: len(calls) == 1)
+        await a.notify_event_changed()
+        assert await _wait_for(lambda: len(calls) == 2)
+        assert not b._listener.done()
+        await a.close()
+        await b.close()
+
+    asyncio.run(run())
+
+
+def test_listener_resubscribes_after_disconnect(server, monkeypatch):
+    monkeypatch.setattr(state_backend, "LISTEN_RETRY_MIN_SEC", 0.01)
+    monkeypatch.setattr(state_backend, "LISTEN_RETRY_MAX_SEC", 0.05)
+
+    async def run():
+        a, b = _backend(server), _backend(server)
+        changed, resubscribed = [], []
+        b.on_event_changed(lambda: changed.append(1))
+        b.on_resubscribed(lambda: resubscribed.append(1))
+        await b.start()
+        server.connected = False
+        await asyncio.sleep(0.1)  # слушатель падает и повторяет подписку, пока сервер недоступен
+        server.connected = True
+        assert await _wait_for(lambda: resubscribed)
+        assert changed  # пропущенные уведомления заменяются полным сбросом
+        changed.clear()
+        await a.notify_event_changed()
+        assert await _wait_for(lambda: changed)
+        await a.close()
+        await b.close()
+
+    asyncio.run(run())
+
+
+def test_memory_backend_expiry_and_takeover():
+    async def run():
+        a, b = MemoryStateBackend(), MemoryStateBackend()
+        b._locks = a._locks  # общий словарь — как общий сервер
+        assert await a.acquire_lock(LOCK, 0.2)
+        assert not await b.acquire_lock(LOCK, 0.2)
+        await asyncio.sleep(0.3)
+        assert await b.acquire_lock(LOCK, 5)
+        assert not await a.extend_lock(LOCK, 5)
+
+    asyncio.run(run())
+
+
+def test_close_unsubscribes(server):
+    async def run():
+        a = _backend(server)
+        await a.start()
+        pubsub = a._pubsub
+        await a.close()
+        assert a._pubsub is None and a._listener is None
+        assert not pubsub.subscribed
+
+    asyncio.run(run())
@@ -0,0 +1,161 @@
+import asyncio
+import importlib
+
+import pytest
+from aiogram import Dispatcher
+from fakeredis import FakeServer
+from fakeredis.aioredis import FakeRedis
+
+from bot import config
+from bot.middlewares import throttling
+from bot.services import state_backend
+from bot.services.state_backend import RedisStateBackend, MemoryStateBackend
+
+
+class FakeClock:
+    """Подменяет модуль time в state_backend: время двигает тест, а не sleep."""
+
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(state_backend, "time", fake)
+    return fake
+
+
+@pytest.fixture(params=["memory", "redis"])
+def backend(request):
+    if request.param == "memory":
+        return MemoryStateBackend()
+    # Ведро в Redis считает Lua-скрипт — fakeredis[lua]
+    return RedisStateBackend(FakeRedis(server=FakeServer()), prefix="test")
+
+
+async def _take(backend, n, name="b", rate=2.0, burst=3):
+    return [await backend.take_token(name, rate, burst) for _ in range(n)]
+
+
+def test_bucket_burst(backend, clock):
+    async def run():
+        assert await _take(backend, 4) == [True, True, True, False]
+        # Другое ведро — свой запас
+        assert await _take(backend, 1, name="other") == [True]
+
+    asyncio.run(run())
+
+
+def test_bucket_refill(backend, clock):
+    async def run():
+        assert await _take(backend, 4) == [True, True, True, False]
+        clock.now += 0.25  # полтокена при rate=2
+        assert await _take(backend, 1) == [False]
+        clock.now += 0.25
+        assert await _take(backend, 2) == [True, False]
+        clock.now += 60  # ведро восстанавливается не больше чем до burst
+        assert await _take(backend, 4) == [True, True, True, False]
+
+    asyncio.run(run())
+
+
+def test_memory_bucket_sweep(clock):
+    async def run():
+        backend = MemoryStateBackend()
+        await _take(backend, 1)
+        assert "b" in backend._buckets
+        clock.now += state_backend.BUCKET_SWEEP_SEC
+        await _take(backend, 1, name="other")
+        assert "b" not in backend._buckets
+
+    asyncio.run(run())
+
+
+class FakeUser:
+    def __init__(self, user_id: int):
+        self.id = user_id
+
+
+class FakeCallback:
+    def __init__(self, user_id: int, data: str):
+        self.from_user = FakeUser(user_id)
+        self.data = data
+        self.alerts = []
+
+    async def answer(self, text=None, show_alert=False, **kwargs):
+        self.alerts.append(text)
+
+
+@pytest.mark.parametrize("data, name", [
+    ("opinion_about_5", "opinion"),
+    ("opinion_cancel", "opinion"),
+    ("pp:2", "pages"),
+    ("refresh_timer", "refresh"),
+    ("done_round", "callback"),
+    (None, "callback"),
+])
+def test_callback_budget_by_prefix(data, name):
+    assert throttling.callback_budget(data, 100)[0] == name
+
+
+def test_admin_budget():
+    admin = next(iter(config.BOT_ADMINS))
+    assert throttling.callback_budget("refresh_timer", admin) == ("admin", throttling.ADMIN_BUDGET)
+
+
+def test_callback_middleware_per_user_buckets(clock):
+    async def run():
+        handled = []
+
+        async def handler(event, data):
+            handled.append(event.from_user.id)
+
+        middleware = throttling.CallbackThrottlingMiddleware()
+        events = [FakeCallback(100, "refresh_timer") for _ in range(4)]
+        for event in events:
+            await middleware(handler, event, {})
+        # refresh_timer: burst 2, дальше отказ и одно предупреждение в секунду
+        assert handled == [100, 100]
+        assert [e.alerts for e in events] == [[], [], ["Don't spam!"], []]
+        # У другого пользователя и у другой кнопки — свои вёдра
+        await middleware(handler, FakeCallback(101, "refresh_timer"), {})
+        await middleware(handler, FakeCallback(100, "pp:1"), {})
+        assert handled == [100, 100, 101, 100]
+
+    asyncio.run(run())
+
+
+@pytest.fixture
+def throttling_disabled(monkeypatch):
+    import bot.middlewares
+    monkeypatch.setattr(config, "THROTTLE_RATE", 0)
+    yield importlib.reload(throttling), importlib.reload(bot.middlewares)
+    monkeypatch.undo()
+    importlib.reload(throttling)
+    importlib.reload(bot.middlewares)
+
+
+def test_throttle_rate_zero_disables_middlewares(throttling_disabled):
+    module, middlewares = throttling_disabled
+    assert not module.ENABLED
+    assert module.DEFAULT_BUDGET.rate == float("inf")
+    dp = Dispatcher()
+    middlewares.setup(dp)
+    registered = [type(m) for m in list(dp.message.middleware) + list(dp.callback_query.middleware)]
+    assert not [m for m in registered if issubclass(m, module.TokenBucketThrottlingMiddleware)]
+
+
+def test_throttle_rate_enables_middlewares():
+    import bot.middlewares
+    dp = Dispatcher()
+    bot.middlewares.setup(dp)
+    assert throttling.ENABLED
+    assert throttling.MessageThrottlingMiddleware in [type(m) for m in dp.message.middleware]
+    assert throttling.CallbackThrottlingMiddleware in [type(m) for m in dp.callback_query.middleware]
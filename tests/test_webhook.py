@@ -0,0 +1,44 @@
+import asyncio
+import json
+import types
+
+from bot.services import metrics, webhook
+
+
+class FakeRequest:
+    def __init__(self, update_id: int):
+        self.headers = {}
+        self._body = json.dumps({"update_id": update_id}).encode()
+
+    async def read(self):
+        return self._body
+
+
+def _bot():
+    return types.SimpleNamespace(session=types.SimpleNamespace(json_loads=json.loads))
+
+
+def test_full_queue_counts_dropped():
+    async def run():
+        queue = webhook.UpdateQueue(dp=None, bot=_bot(), maxsize=2, workers=1)
+        statuses = [(await queue.handle(FakeRequest(i))).status for i in range(4)]
+        assert statuses == [200, 200, 503, 503]
+        assert queue.size == 2 and queue.dropped == 2
+
+    asyncio.run(run())
+
+
+def test_queue_gauges(monkeypatch):
+    async def run():
+        queue = webhook.UpdateQueue(dp=None, bot=_bot(), maxsize=1, workers=1)
+        monkeypatch.setattr(webhook, "queue", queue)
+        monkeypatch.setattr(metrics, "_gauges", {})
+        metrics.register_gauge("bot_webhook_queue", lambda: webhook.queue.size)
+        metrics.register_gauge("bot_webhook_dropped", lambda: webhook.queue.dropped)
+        for i in range(3):
+            await queue.handle(FakeRequest(i))
+        rendered = metrics.render()
+        assert "bot_webhook_queue 1" in rendered
+        assert "bot_webhook_dropped 2" in rendered
+
+    asyncio.run(run())
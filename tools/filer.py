@@ -1,7 +1,94 @@
-import aiofiles
+import logging
+import os
+import string
+import time
+import typing
+
+TEXT_DIR = "bot/data/text"
+
+# Плейсхолдеры, которые код подставляет через .format(); остальные тексты выводятся как есть
+PLACEHOLDERS = {
+    "round_list": {"m"},
+    "round_announce": {"n", "round_name"},
+    "opinion_prompt_writing": {"name", "m"},
+}
+
+
+class TemplateStore:
+    """
+    Тексты из bot/data/text, загруженные в память при старте.
+    hot_reload=True — раз в check_interval секунд сверять mtime файла и перечитывать изменённый.
+    """
+
+    def __init__(self, directory: str = TEXT_DIR, encoding: str = "utf-8"):
+        self.directory = directory
+        self.encoding = encoding
+        self.hot_reload = False
+        self.check_interval = 1.0
+        self._texts: typing.Dict[str, str] = {}
+        self._mtimes: typing.Dict[str, float] = {}
+        self._checked_at: typing.Dict[str, float] = {}
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, "{}.txt".format(name))
+
+    @staticmethod
+    def validate(name: str, text: str):
+        """Проверить, что плейсхолдеры корректны и код умеет их подставить."""
+        try:
+            fields = {field for _, field, _, _ in string.Formatter().parse(text) if field is not None}
+        except ValueError as e:
+            if name in PLACEHOLDERS:
+                raise ValueError("Текст {}: некорректный шаблон ({})".format(name, e))
+            return
+        if name not in PLACEHOLDERS:
+            return
+        unknown = fields - PLACEHOLDERS[name]
+        if unknown:
+            raise ValueError("Текст {}: неизвестные плейсхолдеры {}".format(name, sorted(unknown)))
+
+    def _load_file(self, name: str):
+        path = self._path(name)
+        mtime = os.path.getmtime(path)
+        with open(path, "r", encoding=self.encoding) as file:
+            text = file.read()
+        self.validate(name, text)
+        self._texts[name] = text
+        self._mtimes[name] = mtime
+        self._checked_at[name] = time.monotonic()
+
+    def load(self, hot_reload: bool = False, check_interval: float = 1.0):
+        """Загрузить и проверить все тексты. Ошибка в шаблоне останавливает запуск."""
+        self.hot_reload = hot_reload
+        self.check_interval = check_interval
+        for filename in sorted(os.listdir(self.directory)):
+            name, ext = os.path.splitext(filename)
+            if ext == ".txt":
+                self._load_file(name)
+        logging.info("Загружено текстов: %s (hot reload: %s)", len(self._texts), hot_reload)
+
+    def _maybe_reload(self, name: str):
+        now = time.monotonic()
+        if now - self._checked_at.get(name, 0) < self.check_interval:
+            return
+        self._checked_at[name] = now
+        try:
+            if os.path.getmtime(self._path(name)) != self._mtimes.get(name):
+                self._load_file(name)
+                logging.info("Текст %s перечитан", name)
+        except (OSError, ValueError) as e:
+            logging.error("Текст %s не перечитан, остаётся прежний: %s", name, e)
+
+    def get(self, name: str) -> str:
+        if name not in self._texts:
+            self._load_file(name)
+        elif self.hot_reload:
+            self._maybe_reload(name)
+        return self._texts[name]
+
+
+templates = TemplateStore()
 
 
 async def read_txt(path: str, encoding="utf-8"):
-    async with aiofiles.open("bot/data/text/{}.txt".format(path), "r", encoding=encoding) as file:
-        text = await file.read()
-    return text
+    return templates.get(path)